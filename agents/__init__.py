@@ -1,5 +1,6 @@
 from .base_agent import BaseAgent
 from .unstructured_data_agent import UnstructuredDataAgent
+from .report_part_agent import ReportPartAgent
 from .report_part1_agent import ReportPart1Agent
 from .report_part2_agent import ReportPart2Agent
 from .report_part3_agent import ReportPart3Agent
@@ -1,5 +1,6 @@
 # agents/base_agent.py
 
+import asyncio
 from abc import ABC, abstractmethod
 
 class BaseAgent(ABC):
@@ -23,3 +24,13 @@ class BaseAgent(ABC):
             Any: Response generated by the agent.
         """
         pass
+
+    async def agenerate_response(self, *args, **kwargs):
+        """
+        Async counterpart of generate_response. By default, runs the synchronous
+        implementation in a worker thread; agents with a native async path override it.
+
+        Returns:
+            Any: Response generated by the agent.
+        """
+        return await asyncio.to_thread(self.generate_response, *args, **kwargs)
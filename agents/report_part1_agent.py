@@ -1,31 +1,27 @@
 # agents/report_part1_agent.py
 
 import logging
-from .base_agent import BaseAgent
-from core.edgar_direct_manager import EdgarDirectManager
+from .report_part_agent import ReportPartAgent
 
 logger = logging.getLogger(__name__)
 
-class ReportPart1Agent(BaseAgent):
-    def __init__(self, llm, unstructured_agent, company_name: str, status_placeholder=None):
-        super().__init__(name="ReportPart1Agent", llm=llm)
-        self.goal = "Generate Part I of the report: General Presentation."
-        self.backstory = "You are a financial analyst tasked with compiling general company information."
-        self.unstructured_agent = unstructured_agent
-        self.company_name = company_name
-        self.status_placeholder = status_placeholder
+class ReportPart1Agent(ReportPartAgent):
+    part_label = "Part I"
 
-        self.edgar_manager = EdgarDirectManager(
-            ticker_symbol=self.company_name,
-            user_agent="Vincent Cotella <vincent.cotella@edu.devinci.fr>",
-            report_type="10-K"
+    def __init__(self, llm, unstructured_agent, company_name: str, status_placeholder=None, edgar_manager=None):
+        super().__init__(
+            name="ReportPart1Agent",
+            llm=llm,
+            unstructured_agent=unstructured_agent,
+            company_name=company_name,
+            status_placeholder=status_placeholder,
+            edgar_manager=edgar_manager
         )
+        self.goal = "Generate Part I of the report: General Presentation."
+        self.backstory = "You are a financial analyst tasked with compiling general company information."
 
-    def generate_response(self, use_rag: bool, context_dict: dict) -> dict:
-        if self.status_placeholder:
-            self.status_placeholder.info("ReportPart1Agent: Starting Part I generation...")
-
-        subtasks = {
+    def get_subtasks(self) -> dict:
+        return {
             "Ticker": f"Retrieve the ticker symbol of {self.company_name}.",
             "Name": f"Confirm the full company name for {self.company_name}.",
             "Country": f"Identify the country of domicile for {self.company_name}.",
@@ -36,10 +32,11 @@ class ReportPart1Agent(BaseAgent):
             "Employees": f"Retrieve the number of employees of {self.company_name}."
         }
 
+    def get_item_mapping(self) -> dict:
         # Mapping subtask -> liste d'Items à concaténer
         # Par exemple, on prend seulement 2 ou 3 Items, pas 1..4 en entier, 
         # pour éviter de dépasser les limites du modèle.
-        item_mapping = {
+        return {
             "Ticker":       ["Item 1"],
             "Name":         ["Item 1"],
             "Country":      ["Item 1"],
@@ -50,35 +47,25 @@ class ReportPart1Agent(BaseAgent):
             "Employees":    ["Item 1"]
         }
 
-        results = {}
-
-        for field, query in subtasks.items():
-            if self.status_placeholder:
-                self.status_placeholder.info(f"ReportPart1Agent: Processing {field}...")
-
-            if use_rag:
-                # RAG => base vectorielle
-                chunks = self.unstructured_agent.generate_response(query)
-                context_data = " ".join(chunks)
-            else:
-                # RAW => on concatène les Items spécifiques à ce subtask
-                items_to_join = item_mapping.get(field, [])
-                context_data = self.edgar_manager.get_items_concat(items_to_join)
-
-            logger.debug(f"[DEBUG] Context for '{field}' => {context_data[:300]}...")
-
-            prompt = (
-                f"{self.backstory}\n\n"
-                f"Goal: Extract the {field} of {self.company_name}.\n\n"
-                f"Context:\n{context_data}\n\n"
-                f"Please provide the {field} based on the data above.\n"
-                f"If not available, respond with 'Not Available'."
-            )
-
-            response = self.llm(prompt).strip()
-            results[field] = response
-
-        if self.status_placeholder:
-            self.status_placeholder.success("ReportPart1Agent: Part I generation completed.")
+    def get_rag_item_mapping(self) -> dict:
+        # En RAG, la page de garde ("Cover") porte ticker, raison sociale et adresse,
+        # et l'Item 2 (Properties) le siège : on les cherche en plus de l'Item 1
+        return {
+            "Ticker":       ["Cover", "Item 1"],
+            "Name":         ["Cover", "Item 1"],
+            "Country":      ["Cover", "Item 1", "Item 2"],
+            "Sector":       ["Item 1", "Item 1A"],
+            "Description":  ["Item 1"],
+            "CEO":          ["Item 1", "Item 10"],  # dirigeants : Item 1 ou Item 10
+            "Headquarters": ["Cover", "Item 1", "Item 2"],
+            "Employees":    ["Item 1"]
+        }
 
-        return results
+    def build_prompt(self, field: str, context_data: str) -> str:
+        return (
+            f"{self.backstory}\n\n"
+            f"Goal: Extract the {field} of {self.company_name}.\n\n"
+            f"Context:\n{context_data}\n\n"
+            f"Please provide the {field} based on the data above.\n"
+            f"If not available, respond with 'Not Available'."
+        )
@@ -0,0 +1,371 @@
+# agents/report_part_agent.py
+
+import queue
+import asyncio
+import logging
+from abc import abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .base_agent import BaseAgent
+from .unstructured_data_agent import build_metadata_filter
+from config import SUBTASK_MAX_CONCURRENCY, EXTRACTION_MODE
+from core.concurrency import run_subtasks
+from core.context_budget import build_context, get_context_budget
+from core.edgar_direct_manager import EdgarDirectManager
+from core.structured_output import extract_json_object, validate_fields
+from core.tracing import run_in_context, span
+
+logger = logging.getLogger(__name__)
+
+class ReportPartAgent(BaseAgent):
+    """
+    Common base for the ReportPartNAgent classes.
+
+    Each part defines its subtasks (field -> retrieval query), the 10-K Items to use
+    in RAW mode and its prompt; the base class runs the subtasks concurrently.
+
+    In "multi_field" extraction mode, all fields of the part are requested in a
+    single JSON answer over a shared context, with a per-field fallback.
+    """
+
+    part_label = ""
+    # Consigne ajoutée au prompt multi-champs (ex. unités pour les chiffres financiers)
+    multi_field_instructions = ""
+
+    def __init__(self, name: str, llm, unstructured_agent, company_name: str, status_placeholder=None,
+                 edgar_manager=None, max_concurrency: int = SUBTASK_MAX_CONCURRENCY):
+        super().__init__(name=name, llm=llm)
+        self.unstructured_agent = unstructured_agent
+        self.company_name = company_name
+        self.status_placeholder = status_placeholder
+        self.max_concurrency = max_concurrency
+        self.extraction_mode = EXTRACTION_MODE
+
+        # Manager partagé entre les 5 agents (et donc même cache de filing) si fourni
+        self.edgar_manager = edgar_manager or EdgarDirectManager(
+            ticker_symbol=self.company_name,
+            report_type="10-K"
+        )
+
+    @abstractmethod
+    def get_subtasks(self) -> Dict[str, str]:
+        """
+        Returns the fields of this part, mapped to their retrieval query.
+        """
+        pass
+
+    @abstractmethod
+    def get_item_mapping(self) -> Dict[str, List[str]]:
+        """
+        Returns the 10-K Items to concatenate for each field (RAW mode).
+        """
+        pass
+
+    @abstractmethod
+    def build_prompt(self, field: str, context_data: str) -> str:
+        """
+        Builds the LLM prompt for one field.
+        """
+        pass
+
+    def get_rag_item_mapping(self) -> Dict[str, List[str]]:
+        """
+        Returns the 10-K sections searched for each field (RAG mode). Defaults to the RAW
+        mapping; parts override it where the answer also sits in sections too large to
+        concatenate in RAW mode (e.g. the "Cover" page for the ticker and registrant name).
+        """
+        return self.get_item_mapping()
+
+    def retrieval_filter(self, field: str) -> Optional[dict]:
+        """
+        Metadata filter of the RAG search for one field: only the chunks of the
+        10-K sections mapped to the field (see get_rag_item_mapping) are searched.
+        """
+        return build_metadata_filter(items=self.get_rag_item_mapping().get(field))
+
+    def get_context(self, field: str, query: str, use_rag: bool) -> str:
+        """
+        Retrieves the context for one field, from the vector DB (RAG) or the raw 10-K Items.
+        """
+        with span("context", part=self.part_label, field=field, use_rag=use_rag):
+            if use_rag:
+                # RAG => base vectorielle, restreinte aux Items du champ
+                chunks = self.unstructured_agent.retrieve_many([query], [self.retrieval_filter(field)])[0]
+                return " ".join(chunks)
+            # RAW => on concatène les Items spécifiques à ce subtask
+            items_to_join = self.get_item_mapping().get(field, [])
+            return self.edgar_manager.get_items_concat(items_to_join)
+
+    def get_rag_contexts(self, subtasks: Dict[str, str]) -> Dict[str, str]:
+        """
+        Retrieves the RAG context of every field with a single batched retrieval call.
+        """
+        fields = list(subtasks.keys())
+        with span("context", part=self.part_label, fields=len(fields), use_rag=True):
+            chunks_per_query = self.unstructured_agent.retrieve_many(
+                [subtasks[field] for field in fields],
+                [self.retrieval_filter(field) for field in fields]
+            )
+        return {field: " ".join(chunks) for field, chunks in zip(fields, chunks_per_query)}
+
+    def context_key(self, field: str, query: str, use_rag: bool) -> tuple:
+        """
+        Identifies the context fetched for one field: two fields with the same key
+        share the same context (e.g. several Part II fields built on "Item 7").
+        """
+        if use_rag:
+            return ("rag", query, repr(self.retrieval_filter(field)))
+        return ("raw", tuple(self.get_item_mapping().get(field, [])))
+
+    def prepare_prompt(self, field: str, context_data: str) -> str:
+        """
+        Builds the prompt for one field, after trimming the context to the model's
+        token budget (the paragraphs most relevant to the field are kept).
+        """
+        budget = get_context_budget(getattr(self.llm, "model", None))
+        # Le nom de la société apparaît partout : on le retire de la requête de ranking
+        query = f"{field} {self.get_subtasks().get(field, '')}".replace(self.company_name, " ")
+        context_data = build_context(context_data, query, budget)
+        logger.debug(f"[DEBUG] Context for '{field}' => {context_data[:300]}...")
+        return self.build_prompt(field, context_data)
+
+    def answer(self, field: str, context_data: str) -> str:
+        """
+        Asks the LLM for one field, given its context.
+        """
+        with span("subtask", part=self.part_label, field=field):
+            return self.llm(self.prepare_prompt(field, context_data)).strip()
+
+    def process_field(self, field: str, query: str, use_rag: bool) -> str:
+        """
+        Runs one subtask: context retrieval, then the LLM call.
+        """
+        return self.answer(field, self.get_context(field, query, use_rag))
+
+    def get_shared_context(self, subtasks: Dict[str, str], use_rag: bool) -> str:
+        """
+        Builds one context for all fields of the part: the union of the retrieved
+        chunks (RAG) or of the mapped 10-K Items (RAW), without duplicates.
+        """
+        if use_rag:
+            chunks_per_query = self.unstructured_agent.retrieve_many(
+                list(subtasks.values()),
+                [self.retrieval_filter(field) for field in subtasks]
+            )
+            chunks = dict.fromkeys(chunk for chunks in chunks_per_query for chunk in chunks)
+            return "\n\n".join(chunks)
+        item_mapping = self.get_item_mapping()
+        items = dict.fromkeys(item for field in subtasks for item in item_mapping.get(field, []))
+        return self.edgar_manager.get_items_concat(list(items))
+
+    def build_multi_field_prompt(self, subtasks: Dict[str, str], context_data: str) -> str:
+        """
+        Builds the prompt asking for every field of the part in one JSON object.
+        """
+        fields_description = "\n".join(f'- "{field}": {query}' for field, query in subtasks.items())
+        instructions = f"{self.multi_field_instructions}\n" if self.multi_field_instructions else ""
+        return (
+            f"{self.backstory}\n\n"
+            f"Goal: {self.goal}\n\n"
+            f"Context:\n{context_data}\n\n"
+            f"Based on the data above, fill in the following fields:\n{fields_description}\n\n"
+            f"{instructions}"
+            f"Respond only with a JSON object whose keys are exactly the field names above "
+            f"and whose values are strings. If a field is not available, use 'Not Available'."
+        )
+
+    def generate_multi_field(self, use_rag: bool) -> dict:
+        """
+        Extracts all fields of the part with a single LLM call. Fields missing from the
+        answer, or with an invalid value, fall back to the per-field path.
+        """
+        subtasks = self.get_subtasks()
+        valid, invalid = self.extract_multi_field(use_rag)
+        if invalid:
+            self._status(f"Falling back to per-field extraction for {', '.join(invalid)}...")
+            valid.update(run_subtasks(
+                {
+                    field: (lambda field=field: self.process_field(field, subtasks[field], use_rag))
+                    for field in invalid
+                },
+                max_workers=self.max_concurrency
+            ))
+        return {field: valid[field] for field in subtasks}
+
+    def extract_multi_field(self, use_rag: bool) -> Tuple[dict, List[str]]:
+        """
+        Single-call part of generate_multi_field: returns (valid fields, invalid field names),
+        leaving the per-field fallback of the invalid ones to the caller.
+        """
+        subtasks = self.get_subtasks()
+        with span("context", part=self.part_label, fields=len(subtasks), use_rag=use_rag):
+            context_data = self.get_shared_context(subtasks, use_rag)
+        budget = get_context_budget(getattr(self.llm, "model", None))
+        ranking_query = " ".join(f"{field} {query}" for field, query in subtasks.items()).replace(self.company_name, " ")
+        prompt = self.build_multi_field_prompt(subtasks, build_context(context_data, ranking_query, budget))
+
+        with span("subtask.multi_field", part=self.part_label, fields=len(subtasks)) as s:
+            try:
+                valid, invalid = validate_fields(extract_json_object(self.llm(prompt)), list(subtasks))
+            except Exception as e:
+                logger.warning(f"{self.name}: réponse multi-champs inexploitable ({e}), repli champ par champ.")
+                valid, invalid = {}, list(subtasks)
+            s.set_attribute("invalid_fields", len(invalid))
+        return valid, invalid
+
+    def _status(self, message: str, level: str = "info"):
+        if self.status_placeholder:
+            getattr(self.status_placeholder, level)(f"{self.name}: {message}")
+
+    def generate_response(self, use_rag: bool, context_dict: dict) -> dict:
+        with span("report.part", part=self.part_label, use_rag=use_rag, extraction_mode=self.extraction_mode):
+            return self._generate_response(use_rag, context_dict)
+
+    def _generate_response(self, use_rag: bool, context_dict: dict) -> dict:
+        self._status(f"Starting {self.part_label} generation...")
+
+        if self.extraction_mode == "multi_field":
+            results = self.generate_multi_field(use_rag)
+            self._status(f"{self.part_label} generation completed.", level="success")
+            return results
+
+        subtasks = self.get_subtasks()
+        completed = []
+
+        def on_complete(field, _):
+            completed.append(field)
+            self._status(f"Processed {field} ({len(completed)}/{len(subtasks)})...")
+
+        if use_rag:
+            # Un seul appel de retrieval batché pour tous les champs de la partie
+            contexts = self.get_rag_contexts(subtasks)
+            tasks = {
+                field: (lambda field=field: self.answer(field, contexts[field]))
+                for field in subtasks
+            }
+        else:
+            tasks = {
+                field: (lambda field=field, query=query: self.process_field(field, query, use_rag))
+                for field, query in subtasks.items()
+            }
+
+        # Les subtasks sont indépendants : on les lance en parallèle (max_concurrency en vol),
+        # le temps d'une partie est alors celui de l'appel le plus lent.
+        results = run_subtasks(
+            tasks,
+            max_workers=self.max_concurrency,
+            on_complete=on_complete
+        )
+
+        self._status(f"{self.part_label} generation completed.", level="success")
+        return results
+
+    async def aanswer(self, field: str, context_data: str) -> str:
+        """
+        Async counterpart of answer(), using the LLM's native async path.
+        """
+        with span("subtask", part=self.part_label, field=field):
+            return (await self.llm.ainvoke(self.prepare_prompt(field, context_data))).strip()
+
+    async def agenerate_response(self, use_rag: bool, context_dict: dict,
+                                 semaphore: Optional[asyncio.Semaphore] = None) -> dict:
+        """
+        Async version of generate_response: all LLM calls of the part run on the
+        current event loop, at most `max_concurrency` in flight (or bounded by the
+        shared `semaphore` when several parts run together).
+        Context retrieval (Chroma, EDGAR) stays synchronous and runs in worker threads.
+        """
+        if self.extraction_mode == "multi_field":
+            return await asyncio.to_thread(self.generate_response, use_rag, context_dict)
+
+        with span("report.part", part=self.part_label, use_rag=use_rag, extraction_mode=self.extraction_mode):
+            return await self._agenerate_fields(use_rag, semaphore or asyncio.Semaphore(self.max_concurrency))
+
+    async def _agenerate_fields(self, use_rag: bool, semaphore: asyncio.Semaphore) -> dict:
+        self._status(f"Starting {self.part_label} generation...")
+        subtasks = self.get_subtasks()
+
+        if use_rag:
+            contexts = await asyncio.to_thread(self.get_rag_contexts, subtasks)
+        else:
+            # Une seule récupération par ensemble d'Items distinct
+            keys = {field: self.context_key(field, query, use_rag) for field, query in subtasks.items()}
+            unique = {}
+            for field, key in keys.items():
+                unique.setdefault(key, field)
+            fetched = await asyncio.gather(*[
+                asyncio.to_thread(self.get_context, field, subtasks[field], use_rag)
+                for field in unique.values()
+            ])
+            by_key = dict(zip(unique.keys(), fetched))
+            contexts = {field: by_key[key] for field, key in keys.items()}
+
+        async def run_field(field):
+            async with semaphore:
+                return await self.aanswer(field, contexts[field])
+
+        answers = await asyncio.gather(*[run_field(field) for field in subtasks], return_exceptions=True)
+        results = {}
+        for field, answer in zip(subtasks, answers):
+            if isinstance(answer, Exception):
+                logger.error(f"{self.name}: échec pour '{field}': {answer}")
+                answer = "Not Available"
+            results[field] = answer
+
+        self._status(f"{self.part_label} generation completed.", level="success")
+        return results
+
+    def stream_answer(self, field: str, context_data: str) -> Iterator[str]:
+        """
+        Streams the LLM answer for one field, token by token.
+        """
+        for token in self.llm.stream(self.prepare_prompt(field, context_data)):
+            yield token
+
+    def stream_response(self, use_rag: bool, context_dict: dict) -> Iterator[Tuple[str, str, bool]]:
+        """
+        Same as generate_response, but yields (field, text, done) events as tokens arrive:
+        `text` is a token delta while done is False, then the final stripped answer.
+        Fields are generated concurrently; events are yielded in the calling thread.
+        """
+        if self.extraction_mode == "multi_field":
+            # Une seule réponse JSON : pas de streaming champ par champ
+            for field, value in self.generate_response(use_rag, context_dict).items():
+                yield field, value, True
+            return
+
+        self._status(f"Starting {self.part_label} generation (streaming)...")
+        subtasks = self.get_subtasks()
+        if not subtasks:
+            return
+        contexts = self.get_rag_contexts(subtasks) if use_rag else {}
+        events: "queue.Queue[Tuple[str, str, bool]]" = queue.Queue()
+
+        def run_field(field, query):
+            parts = []
+            try:
+                context_data = contexts[field] if use_rag else self.get_context(field, query, use_rag)
+                with span("subtask", part=self.part_label, field=field, streaming=True):
+                    for token in self.stream_answer(field, context_data):
+                        parts.append(token)
+                        events.put((field, token, False))
+                value = "".join(parts).strip()
+            except Exception as e:
+                logger.error(f"{self.name}: échec pour '{field}': {e}")
+                value = "Not Available"
+            events.put((field, value, True))
+
+        workers = max(1, min(self.max_concurrency, len(subtasks)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for field, query in subtasks.items():
+                executor.submit(run_in_context(run_field), field, query)
+            remaining = len(subtasks)
+            while remaining:
+                field, text, done = events.get()
+                if done:
+                    remaining -= 1
+                    self._status(f"Processed {field} ({len(subtasks) - remaining}/{len(subtasks)})...")
+                yield field, text, done
+
+        self._status(f"{self.part_label} generation completed.", level="success")
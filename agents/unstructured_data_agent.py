@@ -1,28 +1,230 @@
 # agents/unstructured_data_agent.py
 
+import re
 from .base_agent import BaseAgent
-from langchain.vectorstores import Chroma
-from typing import List
-from config import CHROMA_PATH, TOP_K
+from typing import Any, Dict, List, Optional, Sequence
+from config import (
+    TOP_K,
+    EMBEDDING_MODEL_NAME,
+    QUERY_EMBEDDING_CACHE_SIZE,
+    RETRIEVAL_CACHE_SIZE,
+    RETRIEVAL_CACHE_PERSIST,
+    RETRIEVAL_CACHE_PATH,
+    HYBRID_RETRIEVAL,
+    BM25_INDEX_PATH,
+    HYBRID_CANDIDATES,
+    RRF_K
+)
+from core.bm25 import get_bm25_index, reciprocal_rank_fusion
+from core.cache import LRUCache, SQLiteCache, TieredCache
+from core.data_management import get_collection_version
+from core.tracing import span
+from core.vector_store import get_vector_store
 from embedding import get_embedding_function
 
+def normalize_query(query: str) -> str:
+    """
+    Normalizes a query for cache lookups (case and whitespace insensitive).
+    """
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+def build_metadata_filter(ticker: Optional[str] = None, fiscal_year: Optional[int] = None,
+                          items: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Builds a Chroma `where` filter on the chunk metadata set by the 10-K chunker,
+    e.g. build_metadata_filter("AAPL", 2024, ["Item 7"]). Returns None when no criterion is given.
+    """
+    conditions = []
+    if ticker:
+        conditions.append({"ticker": ticker.upper()})
+    if fiscal_year:
+        conditions.append({"fiscal_year": int(fiscal_year)})
+    if items:
+        items = list(items)
+        conditions.append({"item": items[0]} if len(items) == 1 else {"item": {"$in": items}})
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
 class UnstructuredDataAgent(BaseAgent):
-    def __init__(self):
+    def __init__(self, company_name: Optional[str] = None):
         """
         Initialize the agent for unstructured data retrieval (RAG).
+        When `company_name` (a ticker) is given, every search is scoped to the chunks
+        tagged with that ticker at ingestion.
         """
         super().__init__(name="UnstructuredDataAgent", llm=None)
         self.goal = "Retrieve relevant unstructured financial document chunks."
         self.backstory = "You are an expert in financial document retrieval, specializing in extracting relevant information from 10-K filings."
-        self.db = Chroma(persist_directory=CHROMA_PATH, embedding_function=get_embedding_function())
+        self.embedding_function = get_embedding_function()
         self.top_k = TOP_K
+        self.hybrid = HYBRID_RETRIEVAL
+        self.ticker = company_name.upper() if company_name else None
+        # collection version -> whether the ticker has tagged chunks in the index
+        self._ticker_indexed = LRUCache(16, name="ticker_indexed")
+
+        # normalized query -> embedding ; (normalized query, filter, collection version, k, hybrid) -> chunk IDs.
+        # The collection version changes on every add/reset, which invalidates the results.
+        disk_embeddings = disk_results = None
+        if RETRIEVAL_CACHE_PERSIST:
+            disk_embeddings = SQLiteCache(RETRIEVAL_CACHE_PATH, max_size=QUERY_EMBEDDING_CACHE_SIZE * 10, name="query_embeddings_disk")
+            disk_results = SQLiteCache(RETRIEVAL_CACHE_PATH, max_size=RETRIEVAL_CACHE_SIZE * 10, name="retrieval_results_disk")
+        self.embedding_cache = TieredCache(LRUCache(QUERY_EMBEDDING_CACHE_SIZE, name="query_embeddings"), disk_embeddings)
+        self.result_cache = TieredCache(LRUCache(RETRIEVAL_CACHE_SIZE, name="retrieval_results"), disk_results)
+
+    @property
+    def store(self):
+        """
+        Chroma or the quantized store, depending on VECTOR_STORE_BACKEND. Resolved on each
+        access, so that an agent created before a database reset uses the new store.
+        """
+        return get_vector_store()
 
     def retrieve_relevant_chunks(self, query: str) -> List[str]:
         """
-        Retrieve relevant document chunks based on the query using similarity search in Chroma.
+        Retrieve relevant document chunks based on the query using similarity search in the vector store.
+        """
+        return self.retrieve_many([query])[0]
+
+    def _embed_queries(self, normalized_queries: List[str]) -> List[List[float]]:
+        """
+        Returns the embedding of each query, computing the missing ones in one batch.
+        """
+        embeddings = [self.embedding_cache.get((EMBEDDING_MODEL_NAME, q)) for q in normalized_queries]
+        missing = [i for i, emb in enumerate(embeddings) if emb is None]
+        if missing:
+            with span("embedding.embed", n_texts=len(missing)):
+                computed = self.embedding_function.embed_documents([normalized_queries[i] for i in missing])
+            for i, emb in zip(missing, computed):
+                embeddings[i] = emb
+                self.embedding_cache.set((EMBEDDING_MODEL_NAME, normalized_queries[i]), emb)
+        return embeddings
+
+    def _scope_filter(self, where: Optional[Dict[str, Any]], version: str) -> Optional[Dict[str, Any]]:
+        """
+        Adds the company scope to a metadata filter. The vector store then restricts the search to
+        the chunks of this ticker, so its cost follows one company's filings rather than
+        the whole index. If no chunk carries the ticker (index built before the 10-K
+        chunker, or an unrecognized cover page), the search is left unscoped.
+        """
+        conditions = where.get("$and", [where]) if where else []
+        if not self.ticker or any("ticker" in condition for condition in conditions):
+            return where
+        indexed = self._ticker_indexed.get_or_set(
+            version,
+            lambda: bool(self.store.get(where={"ticker": self.ticker}, limit=1, include=[])["ids"])
+        )
+        if not indexed:
+            return where
+        scope = {"ticker": self.ticker}
+        if where is None:
+            return scope
+        if "$and" in where:
+            return {"$and": [scope] + where["$and"]}
+        return {"$and": [scope, where]}
+
+    def _search(self, normalized_queries: List[str], where: Optional[Dict[str, Any]]) -> List[List[str]]:
+        """
+        Top-k chunk IDs of each query, restricted to the chunks matching `where`.
+        In hybrid mode, the dense candidates and the BM25 candidates are merged
+        with Reciprocal Rank Fusion: keyword-heavy questions ("total revenue",
+        "operating cash flow") also reach the table rows the embedding misses.
+        """
+        if self.store.count() == 0:
+            return [[] for _ in normalized_queries]
+        n_candidates = max(self.top_k, HYBRID_CANDIDATES) if self.hybrid else self.top_k
+        query_embeddings = self._embed_queries(normalized_queries)
+        with span("retrieval.dense", n_queries=len(normalized_queries), k=n_candidates, filtered=where is not None):
+            dense_ids = self.store.query(query_embeddings, n_candidates, where)
+        if not self.hybrid:
+            return dense_ids
+
+        bm25_index = get_bm25_index(BM25_INDEX_PATH)
+        fused = []
+        with span("retrieval.lexical", n_queries=len(normalized_queries), k=n_candidates):
+            for q, ids in zip(normalized_queries, dense_ids):
+                lexical_ids = [doc_id for doc_id, _ in bm25_index.search(q, n_candidates, where)]
+                fused.append(reciprocal_rank_fusion([ids, lexical_ids], k=RRF_K)[:self.top_k])
+        return fused
+
+    def retrieve_many(self, queries: List[str],
+                      filters: Optional[List[Optional[Dict[str, Any]]]] = None) -> List[List[str]]:
+        """
+        Retrieve the relevant chunks for several queries at once: all queries are
+        embedded in a single batched forward pass, then searched with one
+        multi-vector query per distinct metadata filter against the vector store.
+        `filters[i]` (see build_metadata_filter) restricts the search of `queries[i]`;
+        a filtered search with no match falls back to the company scope alone
+        (e.g. chunks indexed before the 10-K chunker had no item metadata).
+        Query embeddings and result chunk IDs are cached; only cache misses are searched.
+        Returns one list of chunks per query, in the order of `queries`.
+        """
+        if not queries:
+            return []
+        version = get_collection_version()
+        filters = filters or [None] * len(queries)
+        scope = self._scope_filter(None, version)
+
+        requests = [(normalize_query(q), self._scope_filter(where, version)) for q, where in zip(queries, filters)]
+        ids_per_request: Dict[tuple, List[str]] = {}
+        to_search: Dict[str, tuple] = {}
+        for q, where in requests:
+            cache_key = (q, repr(where), version, self.top_k, self.hybrid)
+            if cache_key in ids_per_request:
+                continue
+            cached_ids = self.result_cache.get(cache_key)
+            if cached_ids is None:
+                # Regroupement par filtre : une requête multi-vecteurs par filtre distinct
+                to_search.setdefault(repr(where), (where, []))[1].append(q)
+                ids_per_request[cache_key] = None
+            else:
+                ids_per_request[cache_key] = cached_ids
+
+        searched = sum(len(set(group)) for _, group in to_search.values())
+        with span("retrieval.search", n_queries=len(queries), searched=searched, hybrid=self.hybrid):
+            for where, group in to_search.values():
+                group = list(dict.fromkeys(group))
+                for q, ids in zip(group, self._search(group, where)):
+                    if not ids and where != scope:
+                        ids = self._search([q], scope)[0]
+                    ids_per_request[(q, repr(where), version, self.top_k, self.hybrid)] = ids
+                    self.result_cache.set((q, repr(where), version, self.top_k, self.hybrid), ids)
+
+        # Un seul fetch des documents pour toutes les requêtes
+        all_ids = list(dict.fromkeys(i for ids in ids_per_request.values() for i in ids))
+        documents: Dict[str, str] = {}
+        if all_ids:
+            with span("retrieval.fetch", n_ids=len(all_ids)):
+                fetched = self.store.get(ids=all_ids, include=["documents"])
+            documents = dict(zip(fetched["ids"], fetched["documents"]))
+        return [
+            [documents[i] for i in ids_per_request[(q, repr(where), version, self.top_k, self.hybrid)] if i in documents]
+            for q, where in requests
+        ]
+
+    def search(self, query: str, ticker: Optional[str] = None, fiscal_year: Optional[int] = None,
+               items: Optional[Sequence[str]] = None) -> List[str]:
+        """
+        Metadata-prefiltered search, e.g. search("revenue growth", "AAPL", 2024, ["Item 7"]).
+        """
+        return self.retrieve_many([query], [build_metadata_filter(ticker, fiscal_year, items)])[0]
+
+    def clear_caches(self):
+        """
+        Empties the retrieval caches (query embeddings, results, ticker scope).
+        """
+        self.embedding_cache.clear()
+        self.result_cache.clear()
+        self._ticker_indexed.clear()
+
+    def get_cache_stats(self) -> dict:
+        """
+        Returns the hit/miss counters of the retrieval caches.
         """
-        results = self.db.similarity_search(query, k=self.top_k)
-        return [doc.page_content for doc in results]
+        return {
+            "query_embeddings": self.embedding_cache.stats(),
+            "retrieval_results": self.result_cache.stats()
+        }
 
     def generate_response(self, query: str) -> List[str]:
         """
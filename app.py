@@ -6,12 +6,28 @@ import json
 import logging
 import traceback
 import streamlit as st
-import pandas as pd
-import requests
 
-from config import GROQ_API_KEY, MODEL_NAME
+from config import (
+    GROQ_API_KEY, MODEL_NAME, EMBEDDING_PRELOAD, GROQ_MAX_RETRIES, EXTRACTION_MODE, METRICS_PORT,
+    CSV_CACHE_MAX_ENTRIES, CSV_LARGE_FILE_BYTES, CSV_MAX_ROWS, CSV_PREVIEW_ROWS,
+    CSV_PLOT_MAX_PAYLOAD_BYTES
+)
+from core.csv_data import (
+    content_hash,
+    read_csv_compact,
+    read_csv_header,
+    read_csv_preview,
+    read_csv_columns,
+    downsample_dataframe,
+    downsample_figure,
+    estimate_payload_bytes
+)
+from core.groq_clients import get_groq_client
+from core.rate_limiter import GroqLangChainRateLimiter, call_with_retry, estimate_tokens, get_rate_limiter
 from core.groq_llm import GROQLLM
+from embedding import get_embedding_function, get_embedding_stats
 from core.multi_agentic_rag import MultiAgenticRAG
+from core.tracing import get_span_collector, span, start_metrics_server
 
 # Pour la partie DataFrame & Plot
 import plotly.express as px
@@ -23,26 +39,137 @@ from langchain_groq import ChatGroq
 from langchain.agents import AgentType
 from langchain.tools import Tool
 from langchain_experimental.agents.agent_toolkits import create_pandas_dataframe_agent
-from groq import Groq  # si nécessaire
-import pandas as pd
 
 # RAG data_management: base Chroma
 from core.data_management import (
     clear_database,
     list_chroma_documents,
+    get_source_counts,
     add_custom_documents
 )
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+REPORT_PART_TITLES = {
+    "Part I": "General Presentation",
+    "Part II": "Key Financial Figures",
+    "Part III": "Annual Performance Analysis",
+    "Part IV": "Market Position and Competitors",
+    "Part V": "Risks and Challenges",
+}
+
+@st.cache_resource(show_spinner="Loading the embedding model...")
+def load_embedding_model():
+    """Charge le modèle d'embedding une seule fois, partagé entre toutes les sessions."""
+    return get_embedding_function()
+
+@st.cache_resource
+def start_metrics_endpoint():
+    """Démarre l'endpoint Prometheus (/metrics) une seule fois par process Streamlit."""
+    return start_metrics_server(METRICS_PORT)
+
+def render_trace_waterfall(trace_id):
+    """
+    Waterfall d'une trace : une barre par span, décalée de son début par rapport au span racine.
+    """
+    spans = get_span_collector().get_trace_spans(trace_id)
+    if not spans:
+        st.info("No spans recorded for this trace.")
+        return
+    origin = spans[0]["start"]
+    labels = []
+    for s in spans:
+        detail = s["attributes"].get("field") or s["attributes"].get("part") or ""
+        labels.append(f"{s['name']} {detail}".strip())
+    fig = go.Figure(go.Bar(
+        base=[(s["start"] - origin) * 1000 for s in spans],
+        x=[s["duration_s"] * 1000 for s in spans],
+        y=[f"{i:03d} {label}" for i, label in enumerate(labels)],
+        orientation="h",
+        marker_color=["crimson" if s["error"] else "steelblue" for s in spans],
+        hovertext=[json.dumps(s["attributes"], default=str) for s in spans],
+    ))
+    fig.update_layout(
+        xaxis_title="ms since trace start",
+        yaxis=dict(autorange="reversed"),
+        height=max(300, 22 * len(spans)),
+        margin=dict(l=10, r=10, t=30, b=10),
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+def run_report_part(rag, part_number, use_rag, stream_output):
+    """
+    Génère une partie du rapport. En mode streaming, chaque champ est affiché
+    au fil des tokens reçus, puis l'affichage temporaire est effacé.
+    """
+    if not stream_output:
+        return getattr(rag, f"generate_report_part{part_number}")(use_rag=use_rag)
+
+    fields = rag.get_report_agents()[part_number - 1].get_subtasks()
+    live_view = st.empty()
+    with live_view.container():
+        placeholders = {field: st.empty() for field in fields}
+    texts = {field: "" for field in fields}
+    results = {}
+    part_label = rag.get_report_agents()[part_number - 1].part_label
+    with span("report.part", part=part_label, use_rag=use_rag, streaming=True):
+        for field, text, done in rag.stream_report_part(part_number, use_rag=use_rag):
+            if done:
+                texts[field] = text
+                results[field] = text
+            else:
+                texts[field] += text
+            placeholders[field].markdown(f"**{field}**: {texts[field]}")
+    live_view.empty()
+    return {field: results.get(field, "Not Available") for field in fields}
+
 # --------------------------------------------------------------------------------
 # FONCTIONS SPÉCIFIQUES À LA PARTIE CSV / PLOT
 # --------------------------------------------------------------------------------
 
-def load_dataframe(uploaded_file):
-    """Charge un fichier CSV dans un DataFrame Pandas."""
-    return pd.read_csv(uploaded_file)
+@st.cache_resource(max_entries=CSV_CACHE_MAX_ENTRIES, show_spinner="Parsing the CSV...")
+def load_dataframe(file_hash, _uploaded_file):
+    """
+    Charge un CSV dans un DataFrame compact (dates parsées, types réduits).
+    Mis en cache par hash du contenu : un rerun ne reparse ni ne recopie le fichier.
+    Le frame est partagé entre sessions : lecture seule (les agents en reçoivent une copie).
+    """
+    return read_csv_compact(_uploaded_file.getvalue())
+
+@st.cache_resource(max_entries=CSV_CACHE_MAX_ENTRIES, show_spinner="Loading the selected columns...")
+def load_large_dataframe(file_hash, columns, _uploaded_file):
+    """
+    Mode gros fichier : lecture par chunks des seules colonnes `columns`,
+    limitée à CSV_MAX_ROWS lignes. Renvoie (DataFrame en lecture seule, tronqué ?).
+    """
+    return read_csv_columns(_uploaded_file, columns)
+
+def load_large_csv(uploaded_file, file_hash):
+    """
+    Lit l'en-tête du CSV, fait choisir les colonnes, puis ne charge que celles-ci.
+    Tant qu'aucune colonne n'est choisie, seul un aperçu de CSV_PREVIEW_ROWS lignes
+    est lu, et None est renvoyé.
+    """
+    size_mb = uploaded_file.size / (1024 * 1024)
+    st.info(f"Large file ({size_mb:.0f} MB): only the selected columns are loaded, plots are downsampled.")
+    selected_columns = st.multiselect("Sélectionnez les colonnes à charger", read_csv_header(uploaded_file))
+    if not selected_columns:
+        st.write("### Aperçu de vos données")
+        st.write(read_csv_preview(uploaded_file, CSV_PREVIEW_ROWS))
+        return None
+    df, truncated = load_large_dataframe(file_hash, tuple(selected_columns), uploaded_file)
+    if truncated:
+        st.warning(f"Only the first {CSV_MAX_ROWS:,} rows were loaded (CSV_MAX_ROWS).")
+    return df
+
+def get_upload_hash(uploaded_file):
+    """Hash du contenu d'un upload, calculé une seule fois par fichier et par session."""
+    hashes = st.session_state.setdefault("csv_hashes", {})
+    key = getattr(uploaded_file, "file_id", None) or (uploaded_file.name, uploaded_file.size)
+    if key not in hashes:
+        hashes[key] = content_hash(uploaded_file.getvalue())
+    return hashes[key]
 
 def display_dataframe_info(df):
     """Affiche un aperçu du DataFrame."""
@@ -56,6 +183,68 @@ def filter_dataframe_columns(df):
     selected_columns = st.multiselect("Sélectionnez les colonnes à inclure", df.columns.tolist())
     return df[selected_columns] if selected_columns else df
 
+def get_csv_agents(file_hash, columns, max_tokens, filtered_df):
+    """
+    Renvoie les agents pandas de la session, gardés par (hash du fichier, colonnes
+    sélectionnées, max_tokens) entre les reruns. Ils sont propres à la session et
+    travaillent sur une copie du frame : le code généré (allow_dangerous_code) peut
+    modifier son `df` sans toucher au frame en cache ni aux autres sessions.
+    """
+    key = (file_hash, columns, max_tokens)
+    if st.session_state.get("csv_agents_key") != key:
+        with st.spinner("Creating the CSV agents..."):
+            st.session_state["csv_agents"] = build_csv_agents(max_tokens, filtered_df.copy())
+        st.session_state["csv_agents_key"] = key
+    return st.session_state["csv_agents"]
+
+def build_csv_agents(max_tokens, agent_df):
+    """
+    Crée le client ChatGroq et les deux agents pandas (données récentes / historiques).
+    """
+    model_name_csv = "llama-3.1-8b-instant"  # ou un autre
+    llm_csv = ChatGroq(
+        groq_api_key=GROQ_API_KEY,
+        model=model_name_csv,
+        temperature=0.3,
+        max_tokens=max_tokens,
+        max_retries=GROQ_MAX_RETRIES,
+        rate_limiter=GroqLangChainRateLimiter(model_name_csv),
+    )
+
+    # Création d'agents pour data analysis
+    recent_data_tool = Tool(
+        name="Generate Plot (Recent Data)",
+        func=lambda query: generate_plot_tool(query, agent_df),
+        description=get_recent_data_prompt()
+    )
+    historical_data_tool = Tool(
+        name="Generate Plot (Historical Data)",
+        func=lambda query: generate_plot_tool(query, agent_df),
+        description=get_historical_data_prompt()
+    )
+
+    pandas_df_recent_agent = create_pandas_dataframe_agent(
+        llm_csv,
+        agent_df,
+        extra_tools=[recent_data_tool],
+        verbose=True,
+        max_iterations=20,
+        agent_type=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+        allow_dangerous_code=True,
+        handle_parsing_errors=True,
+    )
+    pandas_df_historical_agent = create_pandas_dataframe_agent(
+        llm_csv,
+        agent_df,
+        extra_tools=[historical_data_tool],
+        verbose=True,
+        agent_type=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+        allow_dangerous_code=True,
+        handle_parsing_errors=True,
+        max_iterations=20,
+    )
+    return pandas_df_recent_agent, pandas_df_historical_agent
+
 def extract_python_code(text):
     """Extrait le bloc de code python encapsulé entre ```python ...```."""
     pattern = r'```python\s(.*?)```'
@@ -67,7 +256,7 @@ def extract_python_code(text):
 
 def generate_plot_tool(query, df):
     """Tool pour générer un plot en utilisant Plotly, basé sur la requête utilisateur."""
-    client = Groq()
+    client = get_groq_client(GROQ_API_KEY)
     code_prompt = (
         "You are an AI assistant specialized in analyzing financial data. "
         "Your task is to generate clear and insightful plots based on the user query. "
@@ -77,12 +266,18 @@ def generate_plot_tool(query, df):
         "No other plotting library allowed."
     )
 
-    # On appelle le modèle
-    response = client.chat.completions.create(
-        model='llama-3.1-8b-instant',
-        messages=[{"role": "user", "content": code_prompt + query}],
-        temperature=0.3,
-    )
+    # On appelle le modèle (sous le limiteur partagé, avec retries sur les 429)
+    limiter = get_rate_limiter('llama-3.1-8b-instant')
+
+    def create():
+        limiter.acquire(estimate_tokens(code_prompt + query))
+        return client.chat.completions.create(
+            model='llama-3.1-8b-instant',
+            messages=[{"role": "user", "content": code_prompt + query}],
+            temperature=0.3,
+        )
+
+    response = call_with_retry(create)
     # Extraction du code
     code = extract_python_code(response.choices[0].message.content)
     if code is None:
@@ -90,15 +285,38 @@ def generate_plot_tool(query, df):
 
     # Supprime un éventuel fig.show() car on va l'afficher via st.plotly_chart
     code = code.replace("fig.show()", "")
-    code += "\nst.plotly_chart(fig, theme='streamlit', use_container_width=True)"
+
+    # Séries temporelles denses : réduites avant la construction de la figure,
+    # pour que Plotly ne manipule jamais des millions de points
+    plot_df = downsample_dataframe(df)
 
     # On exécute le code
     try:
-        local_vars = {"df": df, "st": st, "px": px, "go": go}
+        local_vars = {"df": plot_df, "st": st, "px": px, "go": go}
         exec(code, local_vars)
-        return "Plot generated successfully."
     except Exception as e:
         return f"Erreur lors de l'exécution du code généré: {e}"
+    fig = local_vars.get("fig")
+    if fig is None:
+        return "Le code généré ne définit pas de figure `fig`."
+    return render_plot(fig, downsampled=len(plot_df) < len(df))
+
+def render_plot(fig, downsampled=False):
+    """
+    Affiche une figure Plotly. Les traces encore trop denses (figure construite
+    autrement qu'à partir des séries réduites) sont sous-échantillonnées, et une figure
+    dont la taille estimée dépasse CSV_PLOT_MAX_PAYLOAD_BYTES n'est pas rendue.
+    """
+    if downsample_figure(fig) or downsampled:
+        st.caption("Dense series were downsampled for display (shape-preserving).")
+    payload = estimate_payload_bytes(fig)
+    if payload > CSV_PLOT_MAX_PAYLOAD_BYTES:
+        return (
+            f"Le graphique (~{payload / (1024 * 1024):.0f} MB) dépasse la limite de "
+            f"{CSV_PLOT_MAX_PAYLOAD_BYTES / (1024 * 1024):.0f} MB : agrégez ou filtrez les données."
+        )
+    st.plotly_chart(fig, theme='streamlit', use_container_width=True)
+    return "Plot generated successfully."
 
 def get_recent_data_prompt():
     """Prompt pour analyser uniquement les données récentes."""
@@ -130,6 +348,12 @@ def main():
 
     st.title("10-K Report Generator (Unstructured Data) + CSV Analysis")
 
+    # Warm-load du modèle d'embedding (sinon chargé au premier usage)
+    if EMBEDDING_PRELOAD:
+        load_embedding_model()
+
+    start_metrics_endpoint()
+
     # =========================
     # SIDEBAR: Chroma DB options
     # =========================
@@ -145,16 +369,46 @@ def main():
                 logger.error(traceback.format_exc())
                 st.stop()
 
+    with st.sidebar.expander("Embedding model"):
+        st.json(get_embedding_stats())
+
     if st.sidebar.button("List Chroma Documents"):
-        docs_info = list_chroma_documents()
-        if not docs_info:
+        st.session_state["docs_listing"] = True
+        st.session_state["docs_page"] = 0
+
+    if st.session_state.get("docs_listing"):
+        source_counts = get_source_counts()
+        if not source_counts:
             st.sidebar.info("No documents found in Chroma DB.")
         else:
-            st.sidebar.write(f"Found {len(docs_info)} documents/chunks:")
-            for doc in docs_info:
-                st.sidebar.write(f"- ID: {doc['id']}")
-                st.sidebar.write(f"  Source: {doc['metadata']['source']}")
-                st.sidebar.write(f"  Snippet: {doc['content_snippet']}")
+            st.sidebar.write(f"Found {sum(source_counts.values())} chunks in {len(source_counts)} source(s).")
+            source = st.sidebar.selectbox(
+                "Source",
+                ["All sources"] + list(source_counts.keys()),
+                format_func=lambda s: s if s == "All sources" else f"{s} ({source_counts[s]})",
+                on_change=lambda: st.session_state.update(docs_page=0)
+            )
+            source = None if source == "All sources" else source
+            total = source_counts[source] if source else sum(source_counts.values())
+            page_size = 20
+            page_count = max(1, -(-total // page_size))
+            page = min(st.session_state.get("docs_page", 0), page_count - 1)
+
+            prev_col, next_col = st.sidebar.columns(2)
+            if prev_col.button("Previous", disabled=page == 0):
+                page -= 1
+            if next_col.button("Next", disabled=page >= page_count - 1):
+                page += 1
+            st.session_state["docs_page"] = page
+
+            st.sidebar.caption(f"Page {page + 1}/{page_count}")
+            for doc in list_chroma_documents(offset=page * page_size, limit=page_size, source=source):
+                st.sidebar.markdown(
+                    f"**{doc['metadata'].get('source', 'unknown')}** · `{doc['id'][:12]}`  \n{doc['content_snippet']}"
+                )
+            if st.sidebar.button("Hide documents"):
+                st.session_state["docs_listing"] = False
+                st.rerun()
 
     # Upload custom docs to Chroma
     st.sidebar.write("## Add Custom Documents")
@@ -175,8 +429,19 @@ def main():
                         f.write(uf.getvalue())
                     file_paths.append(temp_path)
 
-                add_custom_documents(file_paths)
-                st.sidebar.success(f"Successfully added {len(file_paths)} file(s) to Chroma DB!")
+                progress_bar = st.sidebar.progress(0.0)
+                stats = add_custom_documents(
+                    file_paths,
+                    progress=lambda s: progress_bar.progress(
+                        min(1.0, (s["files_indexed"] + s["files_unchanged"]) / len(file_paths)),
+                        text=f"{s['last_source']} ({s['chunks_per_s']} chunks/s)"
+                    )
+                )
+                progress_bar.empty()
+                st.sidebar.success(
+                    f"Indexed {stats['files_indexed']} file(s) ({stats['files_unchanged']} unchanged): "
+                    f"{stats['chunks_added']} new chunks, {stats['chunks_deleted']} removed."
+                )
             except Exception as e:
                 st.sidebar.error(f"Error while adding files to DB: {e}")
                 logger.error(traceback.format_exc())
@@ -210,12 +475,42 @@ def main():
         )
         use_rag = (context_choice == "Use RAG (vector DB)")
 
+        # Regénération forcée : ignore les réponses LLM en cache (les nouvelles sont mises en cache)
+        rag.llm.bypass_cache = st.checkbox("Force refresh (ignore cached LLM responses)", value=False)
+
+        with st.sidebar.expander("Cache statistics"):
+            st.json(rag.get_cache_stats())
+
         st.subheader("Generate Report Parts")
+        stream_output = st.checkbox("Stream fields as they are generated", value=True)
+        multi_field = st.checkbox(
+            "Extract all fields of a part in one LLM call (JSON)",
+            value=(EXTRACTION_MODE == "multi_field")
+        )
+        rag.set_extraction_mode("multi_field" if multi_field else "per_field")
+
+        if st.button("Generate Full Report"):
+            try:
+                # Un conteneur par partie, rempli dès que la partie est terminée
+                part_containers = {label: st.container() for label in REPORT_PART_TITLES}
+
+                def render_part(part_label, part_results):
+                    with part_containers[part_label]:
+                        st.subheader(f"{part_label}: {REPORT_PART_TITLES[part_label]}")
+                        st.json(part_results)
+
+                with st.spinner("Generating the full report (Parts I to V)..."):
+                    full_report = rag.generate_full_report(use_rag=use_rag, on_part_complete=render_part)
+                json_str = json.dumps(full_report, indent=4)
+                st.download_button("Download Full Report JSON", data=json_str, file_name="full_report.json")
+            except Exception as e:
+                st.error(f"Error generating the full report: {e}")
+                logger.error(traceback.format_exc())
 
         if st.button("Generate Part I"):
             try:
                 with st.spinner("Generating Part I..."):
-                    part1 = rag.generate_report_part1(use_rag=use_rag)
+                    part1 = run_report_part(rag, 1, use_rag, stream_output)
                     st.subheader("Part I: General Presentation")
                     st.json(part1)
                     json_str = json.dumps(part1, indent=4)
@@ -227,7 +522,7 @@ def main():
         if st.button("Generate Part II"):
             try:
                 with st.spinner("Generating Part II..."):
-                    part2 = rag.generate_report_part2(use_rag=use_rag)
+                    part2 = run_report_part(rag, 2, use_rag, stream_output)
                     st.subheader("Part II: Key Financial Figures")
                     st.json(part2)
                     json_str = json.dumps(part2, indent=4)
@@ -239,7 +534,7 @@ def main():
         if st.button("Generate Part III"):
             try:
                 with st.spinner("Generating Part III..."):
-                    part3 = rag.generate_report_part3(use_rag=use_rag)
+                    part3 = run_report_part(rag, 3, use_rag, stream_output)
                     st.subheader("Part III: Annual Performance Analysis")
                     st.json(part3)
                     json_str = json.dumps(part3, indent=4)
@@ -251,7 +546,7 @@ def main():
         if st.button("Generate Part IV"):
             try:
                 with st.spinner("Generating Part IV..."):
-                    part4 = rag.generate_report_part4(use_rag=use_rag)
+                    part4 = run_report_part(rag, 4, use_rag, stream_output)
                     st.subheader("Part IV: Market Position and Competitors")
                     st.json(part4)
                     json_str = json.dumps(part4, indent=4)
@@ -263,7 +558,7 @@ def main():
         if st.button("Generate Part V"):
             try:
                 with st.spinner("Generating Part V..."):
-                    part5 = rag.generate_report_part5(use_rag=use_rag)
+                    part5 = run_report_part(rag, 5, use_rag, stream_output)
                     st.subheader("Part V: Risks and Challenges")
                     st.json(part5)
                     json_str = json.dumps(part5, indent=4)
@@ -271,6 +566,21 @@ def main():
             except Exception as e:
                 st.error(f"Error generating Part V: {e}")
                 logger.error(traceback.format_exc())
+
+        with st.expander("Report traces"):
+            traces = get_span_collector().get_traces()
+            if not traces:
+                st.info("No report generated yet.")
+            else:
+                trace = st.selectbox(
+                    "Trace",
+                    traces,
+                    format_func=lambda t: (
+                        f"{t['name']} {t['attributes'].get('part', '')} "
+                        f"({t['duration_s']:.2f}s, {'RAG' if t['attributes'].get('use_rag') else 'RAW'})"
+                    )
+                )
+                render_trace_waterfall(trace["trace_id"])
     else:
         st.info("Please initialize the system first (enter ticker & click 'Initialize System').")
 
@@ -283,77 +593,47 @@ def main():
     uploaded_csv = st.file_uploader("Upload a CSV for financial data analysis", type=["csv"])
 
     if uploaded_csv:
-        df = load_dataframe(uploaded_csv)
-        display_dataframe_info(df)
-        filtered_df = filter_dataframe_columns(df)
-
-        # Configuration du LLM Groq
-        st.sidebar.header("Configuration du LLM pour CSV Analysis")
-        model_name_csv = "llama-3.1-8b-instant"  # ou un autre
-        max_tokens_csv = st.sidebar.slider("Max tokens (CSV LLM)", min_value=100, max_value=2000, value=500)
-
-        llm_csv = ChatGroq(
-            groq_api_key=GROQ_API_KEY,
-            model=model_name_csv,
-            temperature=0.3,
-            max_tokens=max_tokens_csv,
-        )
-
-        # Création d'agents pour data analysis
-        recent_prompt = get_recent_data_prompt()
-        historical_prompt = get_historical_data_prompt()
-
-        recent_data_tool = Tool(
-            name="Generate Plot (Recent Data)",
-            func=lambda query: generate_plot_tool(query, filtered_df),
-            description=recent_prompt
-        )
-        historical_data_tool = Tool(
-            name="Generate Plot (Historical Data)",
-            func=lambda query: generate_plot_tool(query, filtered_df),
-            description=historical_prompt
-        )
-
-        pandas_df_recent_agent = create_pandas_dataframe_agent(
-            llm_csv,
-            filtered_df,
-            extra_tools=[recent_data_tool],
-            verbose=True,
-            max_iterations=20,
-            agent_type=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
-            allow_dangerous_code=True,
-            handle_parsing_errors=True,
-        )
-        pandas_df_historical_agent = create_pandas_dataframe_agent(
-            llm_csv,
-            filtered_df,
-            extra_tools=[historical_data_tool],
-            verbose=True,
-            agent_type=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
-            allow_dangerous_code=True,
-            handle_parsing_errors=True,
-            max_iterations=20,
-        )
-
-        st.write("### Agents disponibles pour générer des graphes à partir de votre CSV")
-        agent_option = st.selectbox(
-            "Choisissez un agent",
-            ["Analyse de données récentes", "Analyse des données historiques"]
-        )
-
-        query = st.text_input("Entrez une requête pour générer un plot à partir du CSV :")
+        file_hash = get_upload_hash(uploaded_csv)
+        if uploaded_csv.size > CSV_LARGE_FILE_BYTES:
+            # Les colonnes sont choisies avant le chargement (None tant qu'aucune ne l'est)
+            filtered_df = load_large_csv(uploaded_csv, file_hash)
+            if filtered_df is not None:
+                display_dataframe_info(filtered_df)
+        else:
+            df = load_dataframe(file_hash, uploaded_csv)
+            display_dataframe_info(df)
+            filtered_df = filter_dataframe_columns(df)
 
-        if query:
-            if agent_option == "Analyse de données récentes":
-                with st.spinner("Génération du plot (données récentes)..."):
-                    response = pandas_df_recent_agent.invoke(query)
-                    st.write("### Résultat / Plot")
-                    st.write(response)
-            else:
-                with st.spinner("Génération du plot (données historiques)..."):
-                    response = pandas_df_historical_agent.invoke(query)
-                    st.write("### Résultat / Plot")
-                    st.write(response)
+        if filtered_df is None:
+            st.info("Select at least one column to load the data and enable the CSV agents.")
+        else:
+            # Configuration du LLM Groq
+            st.sidebar.header("Configuration du LLM pour CSV Analysis")
+            max_tokens_csv = st.sidebar.slider("Max tokens (CSV LLM)", min_value=100, max_value=2000, value=500)
+
+            pandas_df_recent_agent, pandas_df_historical_agent = get_csv_agents(
+                file_hash, tuple(filtered_df.columns), max_tokens_csv, filtered_df
+            )
+
+            st.write("### Agents disponibles pour générer des graphes à partir de votre CSV")
+            agent_option = st.selectbox(
+                "Choisissez un agent",
+                ["Analyse de données récentes", "Analyse des données historiques"]
+            )
+
+            query = st.text_input("Entrez une requête pour générer un plot à partir du CSV :")
+
+            if query:
+                if agent_option == "Analyse de données récentes":
+                    with st.spinner("Génération du plot (données récentes)..."):
+                        response = pandas_df_recent_agent.invoke(query)
+                        st.write("### Résultat / Plot")
+                        st.write(response)
+                else:
+                    with st.spinner("Génération du plot (données historiques)..."):
+                        response = pandas_df_historical_agent.invoke(query)
+                        st.write("### Résultat / Plot")
+                        st.write(response)
 
 
     # =========================
@@ -362,14 +642,8 @@ def main():
     st.header("Other Actions")
     if st.button("Test GROQ API"):
         try:
-            url = "https://api.groq.com/openai/v1/models"
-            headers = {
-                "Authorization": f"Bearer {GROQ_API_KEY}",
-                "Content-Type": "application/json"
-            }
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-            models = response.json()
+            # Même client (et même pool HTTP) que les appels LLM
+            models = get_groq_client(GROQ_API_KEY).models.list().model_dump()
             st.success("GROQ API is working correctly.")
             st.write(models)
         except Exception as e:
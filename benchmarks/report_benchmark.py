@@ -0,0 +1,367 @@
+# benchmarks/report_benchmark.py
+
+import os
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import resource
+import tempfile
+import argparse
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+from langchain.llms.base import LLM
+from langchain_core.embeddings import Embeddings
+from langchain_core.outputs import GenerationChunk
+
+import embedding
+from config import BM25_INDEX_PATH, EMBEDDING_MODEL_NAME
+from core.bm25 import get_bm25_index, reset_bm25_indexes
+from core.edgar_direct_manager import clear_filing_caches
+from core.filing_store import FilingStore, import_text_filing
+from core.ingestion import ingest_documents
+from core.multi_agentic_rag import MultiAgenticRAG
+from core.tracing import get_span_collector
+from core.vector_store import reset_vector_stores
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CORPUS = os.path.join(REPO_ROOT, "PDF", "aapl.txt")
+PART_LABELS = ["Part I", "Part II", "Part III", "Part IV", "Part V"]
+
+
+class StageTimer:
+    """
+    Collecte les durées (en secondes) par étape, depuis plusieurs threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.durations: Dict[str, List[float]] = defaultdict(list)
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            self.durations[stage].append(seconds)
+
+    def wrap(self, obj, attr: str, stage: str):
+        """
+        Remplace la méthode `attr` de l'instance `obj` par une version chronométrée.
+        """
+        method = getattr(obj, attr)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - start)
+
+        setattr(obj, attr, timed)
+
+    def reset(self):
+        with self._lock:
+            self.durations = defaultdict(list)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            durations = {stage: list(values) for stage, values in self.durations.items()}
+        return {stage: percentiles(values) for stage, values in sorted(durations.items())}
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """
+    Nombre d'appels, total et percentiles (en millisecondes).
+    """
+    if not values:
+        return {"count": 0}
+    ms = np.asarray(values) * 1000
+    return {
+        "count": len(values),
+        "total_ms": round(float(ms.sum()), 3),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+    }
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Embeddings déterministes sans modèle (hashing des mots) : même interface que
+    HuggingFaceEmbeddings, pour mesurer le pipeline sans télécharger bge-large.
+    Les latences d'embedding mesurées avec ce stub sont synthétiques.
+    """
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in text.lower().split():
+            digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dim
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class TimedEmbeddings(Embeddings):
+    """
+    Chronomètre (étape "embed") les appels d'un modèle d'embedding, réel ou factice.
+    """
+
+    def __init__(self, embeddings: Embeddings, timer: StageTimer):
+        self.embeddings = embeddings
+        self.timer = timer
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        start = time.perf_counter()
+        try:
+            return self.embeddings.embed_documents(texts)
+        finally:
+            self.timer.record("embed", time.perf_counter() - start)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def load_local_embeddings() -> Embeddings:
+    """
+    Modèle d'embedding réel (singleton de embedding.py), seulement s'il est déjà
+    dans le cache Hugging Face local : le benchmark ne télécharge rien.
+    """
+    from huggingface_hub import try_to_load_from_cache
+
+    if not isinstance(try_to_load_from_cache(EMBEDDING_MODEL_NAME, "config.json"), str):
+        raise RuntimeError(
+            f"Modèle {EMBEDDING_MODEL_NAME} absent du cache local : "
+            "lancez l'application une fois ou utilisez --embeddings hashing."
+        )
+    return embedding.get_embedding_function()
+
+
+class FakeLLM(LLM):
+    """
+    LLM local et déterministe à la place de GROQLLM : latence fixe plus un débit
+    de tokens configurable. Répond en JSON aux prompts multi-champs.
+    """
+
+    model: str = "fake-llm"
+    latency_s: float = 0.05
+    tokens_per_s: float = 500.0
+    completion_tokens: int = 32
+    timer: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "FakeLLM"
+
+    def _answer(self, prompt: str) -> str:
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+        if "Respond only with a JSON object" in prompt:
+            fields = [line.split('"')[1] for line in prompt.splitlines() if line.startswith('- "')]
+            return json.dumps({field: f"{field} {digest}" for field in fields})
+        return f"Answer {digest}"
+
+    def _generation_time(self) -> float:
+        return self.latency_s + self.completion_tokens / self.tokens_per_s
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> str:
+        start = time.perf_counter()
+        time.sleep(self._generation_time())
+        if self.timer:
+            self.timer.record("llm", time.perf_counter() - start)
+        return self._answer(prompt)
+
+    async def _acall(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> str:
+        start = time.perf_counter()
+        await asyncio.sleep(self._generation_time())
+        if self.timer:
+            self.timer.record("llm", time.perf_counter() - start)
+        return self._answer(prompt)
+
+    def _stream(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None,
+                **kwargs: Any) -> Iterator[GenerationChunk]:
+        start = time.perf_counter()
+        time.sleep(self.latency_s)
+        for word in self._answer(prompt).split(" "):
+            time.sleep(1 / self.tokens_per_s)
+            yield GenerationChunk(text=word + " ")
+        if self.timer:
+            self.timer.record("llm", time.perf_counter() - start)
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss est en Ko sous Linux, en octets sous macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 ** 2 if sys.platform == "darwin" else 1024), 1)
+
+
+def _clear_caches(rag):
+    # Tous les caches traversés par une génération : retrieval (dont le scope ticker),
+    # candidats et pages mmap du store vectoriel, dernier filing et filings parsés
+    rag.unstructured_agent.clear_caches()
+    rag.unstructured_agent.store.clear_caches()
+    clear_filing_caches()
+
+
+def run_report_benchmark(corpus: str = DEFAULT_CORPUS, ticker: str = "AAPL", iterations: int = 3,
+                         modes: List[str] = ("rag", "raw"), runner: str = "parts", warm: bool = False,
+                         llm_latency_s: float = 0.05, llm_tokens_per_s: float = 500.0,
+                         workdir: Optional[str] = None, embeddings: str = "hashing",
+                         embed_workers: int = 0) -> Dict[str, Any]:
+    """
+    Génère les Parts I à V hors ligne (corpus local, LLM factice, filing EDGAR importé
+    depuis le corpus) et renvoie les latences par étape, le débit et le pic de RSS.
+    Tous les fichiers (Chroma, store de filings, caches) sont créés dans `workdir`.
+    `embeddings` : "hashing" (stub synthétique) ou "model" (modèle réel, déjà en cache local).
+    Le répertoire courant, le modèle d'embedding et l'export des spans de l'appelant
+    sont restaurés en sortie, et les stores ouverts dans `workdir` sont fermés.
+    """
+    if embeddings not in ("hashing", "model"):
+        raise ValueError(f"Embeddings inconnus: {embeddings}")
+    if embed_workers and embeddings == "hashing":
+        # Les workers (spawn) chargent le modèle réel : le stub ne les atteint pas
+        raise ValueError("--embed-workers nécessite --embeddings model.")
+    corpus = os.path.abspath(corpus)
+    workdir = os.path.abspath(workdir) if workdir else tempfile.mkdtemp(prefix="report_bench_")
+    os.makedirs(workdir, exist_ok=True)
+
+    collector = get_span_collector()
+    previous_cwd, previous_export_path = os.getcwd(), collector.export_path
+    previous_embeddings = embedding._embeddings
+    timer = StageTimer()
+    inner = load_local_embeddings() if embeddings == "model" else HashingEmbeddings()
+    collector.flush()
+    try:
+        # Les chemins relatifs de config (chroma/, filings/, cache/) sont lus à l'import par
+        # chaque module : on se place dans workdir plutôt que de les repatcher un par un
+        os.chdir(workdir)
+        # Les spans du benchmark restent dans workdir (chemin absolu, indépendant du cwd)
+        collector.export_path = os.path.join(workdir, "traces", "spans.jsonl")
+        embedding._embeddings = TimedEmbeddings(inner, timer)
+        return _run_benchmark(corpus, ticker, iterations, modes, runner, warm, llm_latency_s,
+                              llm_tokens_per_s, workdir, embeddings, embed_workers, timer)
+    finally:
+        collector.flush()
+        collector.export_path = previous_export_path
+        embedding._embeddings = previous_embeddings
+        # Stores ouverts sur les chemins relatifs de workdir : l'appelant repart des siens
+        reset_vector_stores()
+        reset_bm25_indexes()
+        clear_filing_caches()
+        os.chdir(previous_cwd)
+
+
+def _run_benchmark(corpus: str, ticker: str, iterations: int, modes: List[str], runner: str, warm: bool,
+                   llm_latency_s: float, llm_tokens_per_s: float, workdir: str, embeddings: str,
+                   embed_workers: int, timer: StageTimer) -> Dict[str, Any]:
+    start = time.perf_counter()
+    ingestion_stats = ingest_documents([corpus], embed_workers=embed_workers)
+    ingestion = {"seconds": round(time.perf_counter() - start, 3), **ingestion_stats, "stages": timer.summary()}
+
+    # EDGAR factice : le 10-K du corpus importé dans un store local
+    filing_store = FilingStore(os.path.abspath("filings"))
+    import_text_filing(ticker, corpus, store=filing_store)
+
+    llm = FakeLLM(latency_s=llm_latency_s, tokens_per_s=llm_tokens_per_s, timer=timer)
+    rag = MultiAgenticRAG(llm=llm, company_name=ticker)
+    rag.edgar_manager.store = filing_store
+
+    timer.wrap(rag.unstructured_agent.store, "query", "search")
+    timer.wrap(get_bm25_index(BM25_INDEX_PATH), "search", "lexical_search")
+    timer.wrap(rag.edgar_manager, "get_items_concat", "filing_fetch")
+    for agent in rag.get_report_agents():
+        timer.wrap(agent, "prepare_prompt", "prompt_build")
+        timer.wrap(agent, "build_multi_field_prompt", "prompt_build")
+
+    results: Dict[str, Any] = {}
+    for mode in modes:
+        use_rag = mode == "rag"
+        timer.reset()
+        wall_times, fields = [], 0
+        for _ in range(iterations):
+            if not warm:
+                _clear_caches(rag)
+            start = time.perf_counter()
+            if runner == "full":
+                report = rag.generate_full_report(use_rag=use_rag)
+            else:
+                report = {
+                    label: getattr(rag, f"generate_report_part{i}")(use_rag=use_rag)
+                    for i, label in enumerate(PART_LABELS, start=1)
+                }
+            wall_times.append(time.perf_counter() - start)
+            fields += sum(len(part) for part in report.values())
+        results[mode] = {
+            "report": percentiles(wall_times),
+            "fields_per_s": round(fields / sum(wall_times), 2),
+            "stages": timer.summary(),
+        }
+
+    return {
+        "config": {
+            "corpus": os.path.basename(corpus), "ticker": ticker, "iterations": iterations, "workdir": workdir,
+            "runner": runner, "warm_caches": warm,
+            "llm_latency_s": llm_latency_s, "llm_tokens_per_s": llm_tokens_per_s,
+            # "synthetic" : l'étape embed mesure le stub de hashing, pas le modèle réel
+            "embeddings": "synthetic" if embeddings == "hashing" else EMBEDDING_MODEL_NAME,
+            "embed_workers": embed_workers,
+        },
+        "ingestion": ingestion,
+        "modes": results,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hors ligne des Parts I à V (RAG et RAW).")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--ticker", default="AAPL")
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--modes", nargs="+", choices=["rag", "raw"], default=["rag", "raw"])
+    parser.add_argument("--runner", choices=["parts", "full"], default="parts",
+                        help="parts : generate_report_part1..5 ; full : scheduler du rapport complet")
+    parser.add_argument("--warm", action="store_true", help="Garde les caches entre les itérations")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Latence fixe du LLM factice (s)")
+    parser.add_argument("--llm-tokens-per-s", type=float, default=500.0)
+    parser.add_argument("--workdir", help="Répertoire de travail (défaut : répertoire temporaire)")
+    parser.add_argument("--embeddings", choices=["hashing", "model"], default="hashing",
+                        help="hashing : stub synthétique ; model : modèle réel, s'il est déjà en cache local")
+    parser.add_argument("--embed-workers", type=int, default=0,
+                        help="Process d'embedding à l'ingestion (avec --embeddings model)")
+    parser.add_argument("--json", dest="json_path", help="Écrit les résultats dans ce fichier JSON")
+    args = parser.parse_args()
+
+    json_path = os.path.abspath(args.json_path) if args.json_path else None
+    results = run_report_benchmark(
+        corpus=args.corpus,
+        ticker=args.ticker,
+        iterations=args.iterations,
+        modes=args.modes,
+        runner=args.runner,
+        warm=args.warm,
+        llm_latency_s=args.llm_latency,
+        llm_tokens_per_s=args.llm_tokens_per_s,
+        workdir=args.workdir,
+        embeddings=args.embeddings,
+        embed_workers=args.embed_workers
+    )
+    output = json.dumps(results, indent=2)
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# benchmarks/vector_store_benchmark.py
+
+import sys
+import json
+import time
+import shutil
+import tempfile
+import argparse
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from core.vector_store import ChromaVectorStore, QuantizedVectorStore
+
+# (dtype, dim, listes IVF) des configurations du store quantifié comparées
+DEFAULT_CONFIGS = [
+    ("float32", None, 0),
+    ("float16", None, 0),
+    ("int8", None, 0),
+    ("float16", 512, 0),
+    ("float16", None, -1),  # -1 : nombre de listes IVF ~ 4 x sqrt(N)
+    ("int8", None, -1),
+]
+
+
+def synthetic_vectors(n: int, dim: int, n_clusters: int = 64, seed: int = 0) -> np.ndarray:
+    """
+    Vecteurs regroupés en clusters, plus proches d'embeddings réels qu'un bruit uniforme.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dim))
+    vectors = centers[rng.integers(0, n_clusters, n)] + 0.35 * rng.normal(size=(n, dim))
+    return vectors.astype(np.float32)
+
+
+def chroma_vectors(page_size: int = 5000) -> Tuple[List[str], np.ndarray]:
+    store = ChromaVectorStore()
+    ids, parts = [], []
+    for offset in range(0, store.count(), page_size):
+        page = store.collection.get(limit=page_size, offset=offset, include=["embeddings"])
+        ids.extend(page["ids"])
+        parts.append(np.asarray(page["embeddings"], dtype=np.float32))
+    return ids, np.concatenate(parts) if parts else np.zeros((0, 0), dtype=np.float32)
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> List[List[int]]:
+    """
+    Vérité terrain : top-k exact en similarité cosinus, en float32.
+    """
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    scores = queries @ vectors.T
+    return [list(np.argsort(-row)[:k]) for row in scores]
+
+
+def _measure(search, queries: np.ndarray, truth: List[set], k: int) -> Dict[str, Any]:
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        found = search(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(len(set(found[:k]) & expected) / k)
+    return {
+        "recall_at_k": round(float(np.mean(recalls)), 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+    }
+
+
+def run_benchmark(vectors: np.ndarray, ids: List[str], n_queries: int = 200, k: int = 5,
+                  configs=DEFAULT_CONFIGS, nprobe: int = 8, include_chroma: bool = False,
+                  seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Construit chaque configuration du store quantifié sur `vectors` et mesure
+    recall@k (contre le top-k exact float32), latence par requête et taille des vecteurs.
+    Les requêtes sont des vecteurs du corpus légèrement bruités.
+    """
+    rng = np.random.default_rng(seed)
+    queries = vectors[rng.choice(len(vectors), n_queries, replace=False)]
+    queries = queries + 0.05 * np.abs(queries).mean() * rng.normal(size=queries.shape).astype(np.float32)
+    truth = [{ids[i] for i in row} for row in exact_top_k(vectors, queries, k)]
+    float32_bytes = vectors.shape[0] * vectors.shape[1] * 4
+
+    results = []
+    if include_chroma:
+        store = ChromaVectorStore()
+        row = {"backend": "chroma", "dtype": "float32", "dim": vectors.shape[1], "ivf_lists": 0,
+               "vector_bytes": float32_bytes}
+        row.update(_measure(lambda q: store.query([q.tolist()], k)[0], queries, truth, k))
+        results.append(row)
+
+    for dtype, dim, n_lists in configs:
+        path = tempfile.mkdtemp(prefix="vector_store_bench_")
+        try:
+            store = QuantizedVectorStore(path, dtype=dtype, dim=dim, nprobe=nprobe)
+            for start in range(0, len(vectors), 10000):
+                batch = slice(start, start + 10000)
+                store.add(ids[batch], vectors[batch], [""] * len(ids[batch]), [{}] * len(ids[batch]))
+            store.compact()
+            if n_lists:
+                n_lists = n_lists if n_lists > 0 else int(4 * np.sqrt(len(vectors)))
+                store.build_ivf(n_lists)
+            store.query(queries[:1].tolist(), k)  # préchauffage (mmap, cache des candidats)
+            row = {"backend": "quantized", "dtype": dtype, "dim": min(dim or vectors.shape[1], vectors.shape[1]),
+                   "ivf_lists": n_lists, "nprobe": nprobe if n_lists else None,
+                   "vector_bytes": store.memory_bytes()}
+            row.update(_measure(lambda q: store.query([q.tolist()], k)[0], queries, truth, k))
+            row["compression"] = round(float32_bytes / row["vector_bytes"], 2)
+            results.append(row)
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall / latence du store quantifié, comparé à Chroma.")
+    parser.add_argument("--source", choices=["synthetic", "chroma"], default="synthetic",
+                        help="Vecteurs synthétiques, ou ceux de la collection Chroma existante")
+    parser.add_argument("--n", type=int, default=20000, help="Nombre de vecteurs synthétiques")
+    parser.add_argument("--dim", type=int, default=1024, help="Dimension des vecteurs synthétiques")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--json", dest="json_path", help="Écrit les résultats dans ce fichier JSON")
+    args = parser.parse_args()
+
+    if args.source == "chroma":
+        ids, vectors = chroma_vectors()
+        if not len(ids):
+            sys.exit("La collection Chroma est vide.")
+    else:
+        vectors = synthetic_vectors(args.n, args.dim)
+        ids = [f"v{i}" for i in range(len(vectors))]
+
+    results = run_benchmark(vectors, ids, n_queries=min(args.queries, len(ids)), k=args.k,
+                            nprobe=args.nprobe, include_chroma=args.source == "chroma")
+    columns = ["backend", "dtype", "dim", "ivf_lists", "recall_at_k", "p50_ms", "p95_ms", "vector_bytes", "compression"]
+    print(" | ".join(columns))
+    for row in results:
+        print(" | ".join(str(row.get(column, "")) for column in columns))
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
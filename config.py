@@ -12,3 +12,108 @@ CHROMA_PATH = "chroma"
 DATA_PATH = "10K"
 
 TOP_K = 5
+
+# Cache process-wide des 10-K parsés (EdgarDirectManager)
+FILING_CACHE_MAX_SIZE = 8
+FILING_CACHE_TTL = 6 * 60 * 60  # secondes
+
+# Store disque des Items de 10-K (cold-start sans réseau)
+FILING_STORE_PATH = "filings"
+FILING_STORE_LATEST_TTL = 24 * 60 * 60  # secondes avant de revérifier le dernier filing sur EDGAR
+
+# Nombre max de subtasks (retrieval + appel LLM) exécutés en parallèle par partie du rapport
+SUBTASK_MAX_CONCURRENCY = 4
+
+# Rapport complet (Parts I..V planifiées ensemble) : retrievals et appels LLM en vol au total
+CONTEXT_MAX_CONCURRENCY = 4
+LLM_MAX_CONCURRENCY = 4
+
+# Modèle d'embedding, chargé une seule fois par process
+EMBEDDING_MODEL_NAME = "BAAI/bge-large-en-v1.5"
+# True : chargé au démarrage de l'app ; False : chargé au premier usage
+EMBEDDING_PRELOAD = os.getenv("EMBEDDING_PRELOAD", "true").lower() == "true"
+
+# Caches de retrieval (UnstructuredDataAgent) : embeddings de requêtes et résultats top-k
+QUERY_EMBEDDING_CACHE_SIZE = 1024
+RETRIEVAL_CACHE_SIZE = 1024
+RETRIEVAL_CACHE_PERSIST = os.getenv("RETRIEVAL_CACHE_PERSIST", "false").lower() == "true"
+RETRIEVAL_CACHE_PATH = os.path.join("cache", "retrieval.sqlite")
+
+# Cache des réponses LLM (GROQLLM) : "memory", "sqlite" ou "none"
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "memory")
+LLM_CACHE_PATH = os.path.join("cache", "llm_responses.sqlite")
+LLM_CACHE_TTL = 7 * 24 * 60 * 60  # secondes
+LLM_CACHE_MAX_SIZE = 5000
+
+# Pool HTTP partagé des clients Groq (sync et async)
+GROQ_HTTP_MAX_CONNECTIONS = 32
+GROQ_HTTP_MAX_KEEPALIVE = 16
+GROQ_HTTP_TIMEOUT = 120.0  # secondes
+
+# Limites client des appels Groq (par modèle, "default" sinon) et retries
+GROQ_RATE_LIMITS = {
+    "default": {"requests_per_minute": 30, "tokens_per_minute": 6000},
+    "llama-3.1-8b-instant": {"requests_per_minute": 30, "tokens_per_minute": 20000},
+}
+GROQ_MAX_RETRIES = 5
+GROQ_BACKOFF_BASE = 1.0  # secondes
+GROQ_BACKOFF_MAX = 60.0  # secondes
+GROQ_EXPECTED_COMPLETION_TOKENS = 512  # estimation de la réponse pour le budget tokens/min
+
+# Budget de contexte des prompts (mode RAW notamment) : fenêtre par modèle, en tokens
+MODEL_CONTEXT_WINDOWS = {
+    "llama3-70b-8192": 8192,
+    "llama3-8b-8192": 8192,
+    "llama-3.1-8b-instant": 131072,
+    "llama-3.3-70b-versatile": 131072,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+PROMPT_RESERVE_TOKENS = 1024  # instructions du prompt + réponse
+CONTEXT_MAX_TOKENS = 6000  # plafond, même pour les modèles à grande fenêtre
+
+# Extraction des champs d'une partie : "per_field" (un appel LLM par champ)
+# ou "multi_field" (un seul appel par partie, réponse JSON)
+EXTRACTION_MODE = os.getenv("EXTRACTION_MODE", "per_field")
+
+# Ingestion en lots (core/ingestion.py) : nombre de chunks embeddés et écrits par lot
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "256"))
+# Process d'embedding parallèles pour l'ingestion en masse (0 : embedding dans le process courant)
+INGEST_EMBED_WORKERS = int(os.getenv("INGEST_EMBED_WORKERS", "0"))
+
+# Retrieval hybride : BM25 (index inversé local, à côté de Chroma) + dense, fusion RRF
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "true").lower() == "true"
+BM25_INDEX_PATH = os.path.join(CHROMA_PATH, "bm25.sqlite")
+HYBRID_CANDIDATES = 20  # candidats de chaque côté avant fusion
+RRF_K = 60
+
+# Base vectorielle : "chroma" ou "quantized" (vecteurs float16/int8 en mmap, voir core/vector_store.py)
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "chroma")
+QUANTIZED_STORE_PATH = os.path.join(CHROMA_PATH, "quantized")
+QUANTIZED_STORE_DTYPE = os.getenv("QUANTIZED_STORE_DTYPE", "int8")  # "int8" (4x plus compact que float32) ou "float16"
+QUANTIZED_STORE_DIM = int(os.getenv("QUANTIZED_STORE_DIM", "0")) or None  # troncature des dimensions (None : 1024)
+QUANTIZED_STORE_NPROBE = 8  # listes IVF parcourues par requête (si l'index IVF est construit)
+
+# Tracing des chemins critiques (core/tracing.py) : spans exportés en JSON-lines,
+# métriques Prometheus sur METRICS_HOST:METRICS_PORT (0 : désactivé, par défaut)
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+# Chemin absolu résolu au démarrage : un os.chdir ultérieur ne déplace pas l'export
+TRACE_EXPORT_PATH = os.path.abspath(os.getenv("TRACE_EXPORT_PATH", os.path.join("traces", "spans.jsonl")))
+TRACE_MAX_BYTES = 50 * 1024 * 1024  # rotation de spans.jsonl au-delà (spans.jsonl.1, .2...)
+TRACE_BACKUP_COUNT = 3  # fichiers de rotation conservés
+TRACE_FLUSH_EVERY = 200  # spans écrits par lot (et à la fin de chaque trace)
+TRACE_BUFFER_SIZE = 5000  # spans récents gardés en mémoire (panneau waterfall)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # ex. 9464
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")  # "0.0.0.0" pour exposer à un scraper distant
+
+# Analyse CSV : frames parsés gardés en cache entre les reruns Streamlit (agents : par session)
+CSV_CACHE_MAX_ENTRIES = 4  # CSV parsés (clé : hash du contenu)
+CSV_CATEGORY_MAX_RATIO = 0.5  # colonne texte en `category` si nb de valeurs distinctes <= ratio * nb de lignes
+
+# Mode "gros CSV" : lecture par chunks des seules colonnes choisies, sous-échantillonnage des graphes
+CSV_LARGE_FILE_BYTES = int(os.getenv("CSV_LARGE_FILE_BYTES", str(50 * 1024 * 1024)))  # au-delà : mode gros fichier
+CSV_CHUNK_ROWS = 200_000  # lignes lues par chunk
+CSV_MAX_ROWS = int(os.getenv("CSV_MAX_ROWS", "5000000"))  # lignes chargées au plus (le reste est ignoré)
+CSV_PREVIEW_ROWS = 100  # aperçu lu tant qu'aucune colonne n'est choisie
+CSV_PLOT_MAX_POINTS = 5000  # points par trace envoyés au navigateur
+CSV_PLOT_DOWNSAMPLER = os.getenv("CSV_PLOT_DOWNSAMPLER", "lttb")  # "lttb" ou "minmax"
+CSV_PLOT_MAX_PAYLOAD_BYTES = 20 * 1024 * 1024  # figure plus lourde (taille estimée) : pas de rendu
@@ -4,5 +4,7 @@
 from .data_management import (
     clear_database,
     list_chroma_documents,
-    add_custom_documents
+    get_source_counts,
+    add_custom_documents,
+    get_collection_version
 )
\ No newline at end of file
@@ -0,0 +1,234 @@
+# core/bm25.py
+
+import os
+import re
+import math
+import heapq
+import sqlite3
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.,][0-9]+)*")
+
+# Mots-outils anglais courants, sans intérêt pour le score lexical
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the this to was were will with
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Tokenisation lexicale simple : minuscules, mots et nombres (ex. "394,328" ou "2.5").
+    """
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25:
+    """
+    Score BM25 (Okapi) d'une requête contre un petit corpus de documents tokenisés.
+    """
+
+    def __init__(self, documents: List[List[str]], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.term_freqs = [Counter(doc) for doc in documents]
+        self.doc_lengths = [len(doc) for doc in documents]
+        self.avg_doc_length = (sum(self.doc_lengths) / len(documents)) if documents else 0.0
+        self.doc_freqs: Dict[str, int] = Counter()
+        for tf in self.term_freqs:
+            self.doc_freqs.update(tf.keys())
+
+    def idf(self, term: str) -> float:
+        n = len(self.term_freqs)
+        df = self.doc_freqs.get(term, 0)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def get_scores(self, query_tokens: List[str]) -> List[float]:
+        scores = [0.0] * len(self.term_freqs)
+        if not self.avg_doc_length:
+            return scores
+        for term in set(query_tokens):
+            idf = self.idf(term)
+            for i, tf in enumerate(self.term_freqs):
+                freq = tf.get(term)
+                if not freq:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[i] / self.avg_doc_length)
+                scores[i] += idf * freq * (self.k1 + 1) / (freq + norm)
+        return scores
+
+
+def where_to_sql(where: Optional[Dict[str, Any]], columns: Sequence[str]) -> Tuple[str, list]:
+    """
+    Traduit un filtre de métadonnées au format Chroma (égalité, "$in", "$and")
+    en clause SQL sur la table des documents.
+    """
+    if not where:
+        return "1", []
+    if "$and" in where:
+        clauses, params = zip(*[where_to_sql(condition, columns) for condition in where["$and"]])
+        return " AND ".join(f"({c})" for c in clauses), [p for group in params for p in group]
+    (field, condition), = where.items()
+    if field not in columns:
+        raise ValueError(f"Filtre non supporté par l'index BM25: {field}")
+    if isinstance(condition, dict):
+        values = list(condition["$in"])
+        return f"{field} IN ({', '.join('?' * len(values))})", values
+    return f"{field} = ?", [condition]
+
+
+class BM25Index:
+    """
+    Index inversé BM25 persistant (SQLite), tenu à jour à l'ingestion à côté de la
+    collection Chroma : postings (terme, chunk, fréquence) et longueur de chaque chunk.
+    Les ajouts et suppressions sont incrémentaux ; les statistiques du corpus
+    (nombre de chunks, longueur moyenne, df) sont lues au moment de la recherche.
+    """
+
+    METADATA_COLUMNS = ("source", "ticker", "fiscal_year", "item")
+
+    def __init__(self, path: str, k1: float = 1.5, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            "id TEXT PRIMARY KEY, length INTEGER NOT NULL, "
+            "source TEXT, ticker TEXT, fiscal_year INTEGER, item TEXT);"
+            "CREATE TABLE IF NOT EXISTS postings ("
+            "term TEXT NOT NULL, doc_id TEXT NOT NULL, tf INTEGER NOT NULL, "
+            "PRIMARY KEY (term, doc_id)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id);"
+        )
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _metadata_row(self, metadata: Optional[dict]) -> list:
+        metadata = metadata or {}
+        return [metadata.get(column) for column in self.METADATA_COLUMNS]
+
+    def add(self, ids: List[str], texts: List[str], metadatas: Optional[List[dict]] = None):
+        """
+        Indexe (ou ré-indexe) des chunks.
+        """
+        metadatas = metadatas or [None] * len(ids)
+        with self._lock:
+            self._delete(ids)
+            for doc_id, text, metadata in zip(ids, texts, metadatas):
+                tokens = tokenize(text)
+                self._conn.execute(
+                    f"INSERT INTO docs (id, length, {', '.join(self.METADATA_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?)",
+                    [doc_id, len(tokens)] + self._metadata_row(metadata)
+                )
+                self._conn.executemany(
+                    "INSERT INTO postings (term, doc_id, tf) VALUES (?, ?, ?)",
+                    [(term, doc_id, tf) for term, tf in Counter(tokens).items()]
+                )
+            self._conn.commit()
+
+    def update_metadata(self, ids: List[str], metadatas: List[dict]):
+        with self._lock:
+            self._conn.executemany(
+                f"UPDATE docs SET {', '.join(f'{c} = ?' for c in self.METADATA_COLUMNS)} WHERE id = ?",
+                [self._metadata_row(metadata) + [doc_id] for doc_id, metadata in zip(ids, metadatas)]
+            )
+            self._conn.commit()
+
+    def _delete(self, ids: List[str]):
+        for doc_id in ids:
+            self._conn.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+            self._conn.execute("DELETE FROM docs WHERE id = ?", (doc_id,))
+
+    def delete(self, ids: List[str]):
+        with self._lock:
+            self._delete(ids)
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM postings")
+            self._conn.execute("DELETE FROM docs")
+            self._conn.commit()
+
+    def search(self, query: str, k: int, where: Optional[Dict[str, Any]] = None) -> List[Tuple[str, float]]:
+        """
+        Renvoie les `k` meilleurs (chunk_id, score BM25) pour la requête,
+        parmi les chunks qui satisfont le filtre de métadonnées `where`.
+        """
+        terms = sorted(set(tokenize(query)))
+        if not terms:
+            return []
+        placeholders = ", ".join("?" * len(terms))
+        clause, params = where_to_sql(where, self.METADATA_COLUMNS)
+        with self._lock:
+            n_docs, avg_length = self._conn.execute("SELECT COUNT(*), AVG(length) FROM docs").fetchone()
+            if not n_docs or not avg_length:
+                return []
+            doc_freqs = dict(self._conn.execute(
+                f"SELECT term, COUNT(*) FROM postings WHERE term IN ({placeholders}) GROUP BY term", terms
+            ).fetchall())
+            rows = self._conn.execute(
+                f"SELECT p.term, p.doc_id, p.tf, d.length FROM postings p JOIN docs d ON d.id = p.doc_id "
+                f"WHERE p.term IN ({placeholders}) AND {clause}",
+                terms + params
+            ).fetchall()
+
+        scores: Dict[str, float] = {}
+        for term, doc_id, tf, length in rows:
+            df = doc_freqs[term]
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+            scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[str]:
+    """
+    Fusionne plusieurs classements (listes d'IDs, du meilleur au moins bon) par
+    Reciprocal Rank Fusion : score(d) = somme des 1 / (k + rang).
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda doc_id: scores[doc_id], reverse=True)
+
+
+_indexes: Dict[str, BM25Index] = {}
+_indexes_lock = threading.Lock()
+
+
+def reset_bm25_indexes():
+    """
+    Oublie (et ferme) les index ouverts, avant la suppression de la base.
+    """
+    with _indexes_lock:
+        for index in _indexes.values():
+            index.close()
+        _indexes.clear()
+
+
+def get_bm25_index(path: str) -> BM25Index:
+    """
+    Renvoie l'index BM25 partagé par tout le process pour ce fichier.
+    Si le fichier a été supprimé (reset de la base Chroma), l'index est recréé.
+    """
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is None or not os.path.exists(path):
+            index = BM25Index(path)
+            _indexes[path] = index
+        return index
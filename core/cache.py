@@ -0,0 +1,264 @@
+# core/cache.py
+
+import os
+import re
+import time
+import pickle
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Cache LRU en mémoire, thread-safe, avec TTL optionnel et compteurs hit/miss.
+    Partagé entre threads (Streamlit, agents exécutés en parallèle, etc.).
+    """
+
+    def __init__(self, max_size: int = 128, ttl: Optional[float] = None, name: str = "cache"):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.name = name
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.RLock()
+        # Un verrou par clé en cours de chargement, pour éviter de charger deux fois la même entrée
+        self._loading: Dict[Hashable, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _is_expired(self, stored_at: float) -> bool:
+        return self.ttl is not None and (time.monotonic() - stored_at) > self.ttl
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Renvoie la valeur associée à la clé (et la marque comme récemment utilisée),
+        ou `default` si elle est absente ou expirée.
+        """
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING or self._is_expired(entry[1]):
+                if entry is not _MISSING:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_set(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """
+        Renvoie la valeur en cache, ou la calcule via `factory()` et la stocke.
+        Si plusieurs threads demandent la même clé, un seul appelle `factory`.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        with self._lock:
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # Un autre thread a pu remplir l'entrée pendant qu'on attendait
+            with self._lock:
+                entry = self._data.get(key, _MISSING)
+                if entry is not _MISSING and not self._is_expired(entry[1]):
+                    self._data.move_to_end(key)
+                    return entry[0]
+            try:
+                value = factory()
+                self.set(key, value)
+                return value
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            return entry is not _MISSING and not self._is_expired(entry[1])
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Renvoie les compteurs du cache (hits, misses, taux de hit, taille...).
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "name": self.name,
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / total) if total else 0.0,
+            }
+
+
+def _key_to_str(key: Hashable) -> str:
+    return hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+
+
+class SQLiteCache:
+    """
+    Cache persistant sur disque (SQLite), même interface que LRUCache.
+    Les valeurs sont sérialisées avec pickle ; au-delà de `max_size` entrées,
+    les moins récemment utilisées sont supprimées.
+    """
+
+    def __init__(self, path: str, max_size: int = 10000, ttl: Optional[float] = None, name: str = "sqlite_cache"):
+        # Une table par cache : plusieurs caches peuvent partager le même fichier
+        self.table = re.sub(r"[^A-Za-z0-9_]", "_", name)
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self.name = name
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        key_str = _key_to_str(key)
+        with self._lock:
+            row = self._conn.execute(f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key_str,)).fetchone()
+            if row is None or (self.ttl is not None and time.time() - row[1] > self.ttl):
+                if row is not None:
+                    self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key_str,))
+                    self._conn.commit()
+                self.misses += 1
+                return default
+            self._conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (time.time(), key_str))
+            self._conn.commit()
+            self.hits += 1
+        return pickle.loads(row[0])
+
+    def set(self, key: Hashable, value: Any):
+        now = time.time()
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (_key_to_str(key), payload, now, now)
+            )
+            size = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            if size > self.max_size:
+                excess = size - self.max_size
+                self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN (SELECT key FROM {self.table} ORDER BY accessed_at ASC LIMIT ?)",
+                    (excess,)
+                )
+                self.evictions += excess
+            self._conn.commit()
+
+    def get_or_set(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (_key_to_str(key),))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            row = self._conn.execute(f"SELECT created_at FROM {self.table} WHERE key = ?", (_key_to_str(key),)).fetchone()
+        return row is not None and (self.ttl is None or time.time() - row[0] <= self.ttl)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "name": self.name,
+            "path": self.path,
+            "size": len(self),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits / total) if total else 0.0,
+        }
+
+
+class TieredCache:
+    """
+    Cache à deux niveaux : LRU en mémoire devant un cache disque optionnel.
+    Une entrée trouvée sur disque est remontée en mémoire.
+    """
+
+    def __init__(self, memory: LRUCache, disk: Optional[SQLiteCache] = None):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        value = self.memory.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if self.disk is not None:
+            value = self.disk.get(key, _MISSING)
+            if value is not _MISSING:
+                self.memory.set(key, value)
+                return value
+        return default
+
+    def set(self, key: Hashable, value: Any):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {"memory": self.memory.stats()}
+        if self.disk is not None:
+            stats["disk"] = self.disk.stats()
+        return stats
@@ -0,0 +1,43 @@
+# core/concurrency.py
+
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Optional
+
+from config import SUBTASK_MAX_CONCURRENCY
+from core.tracing import run_in_context
+
+logger = logging.getLogger(__name__)
+
+
+def run_subtasks(subtasks: Dict[str, Callable[[], Any]],
+                 max_workers: int = SUBTASK_MAX_CONCURRENCY,
+                 on_complete: Optional[Callable[[str, Any], None]] = None,
+                 default: Any = "Not Available") -> Dict[str, Any]:
+    """
+    Exécute des sous-tâches indépendantes en parallèle (au plus `max_workers` en vol).
+
+    - Le dict renvoyé conserve l'ordre des clés de `subtasks`.
+    - Une sous-tâche qui lève une exception n'affecte pas les autres : sa valeur vaut `default`.
+    - `on_complete(key, value)` est appelé dans le thread appelant à chaque fin de sous-tâche
+      (utile pour mettre à jour un placeholder Streamlit, qui n'accepte pas les autres threads).
+    """
+    if not subtasks:
+        return {}
+
+    results: Dict[str, Any] = {}
+    workers = max(1, min(max_workers, len(subtasks)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # Les sous-tâches restent rattachées à la trace (span) du thread appelant
+        futures = {executor.submit(run_in_context(func)): key for key, func in subtasks.items()}
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                logger.error(f"Sous-tâche '{key}' en échec: {e}")
+                results[key] = default
+            if on_complete:
+                on_complete(key, results[key])
+
+    return {key: results[key] for key in subtasks}
@@ -0,0 +1,84 @@
+# core/context_budget.py
+
+import re
+import logging
+from typing import List, Optional
+
+from config import (
+    MODEL_CONTEXT_WINDOWS,
+    DEFAULT_CONTEXT_WINDOW,
+    PROMPT_RESERVE_TOKENS,
+    CONTEXT_MAX_TOKENS
+)
+from core.bm25 import BM25, tokenize
+
+logger = logging.getLogger(__name__)
+
+_PARAGRAPH_SPLIT_RE = re.compile(r"\n\s*\n")
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def count_tokens(text: str) -> int:
+    """
+    Estimation rapide du nombre de tokens (~4 caractères par token pour de l'anglais).
+    """
+    return (len(text) + 3) // 4
+
+
+def get_context_budget(model: Optional[str]) -> int:
+    """
+    Nombre de tokens de contexte autorisés pour ce modèle : fenêtre du modèle moins
+    la réserve (instructions + réponse), plafonnée par CONTEXT_MAX_TOKENS.
+    """
+    window = MODEL_CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW)
+    return max(0, min(window - PROMPT_RESERVE_TOKENS, CONTEXT_MAX_TOKENS))
+
+
+def split_paragraphs(text: str, max_paragraph_tokens: int = 200) -> List[str]:
+    """
+    Découpe un texte en paragraphes ; les paragraphes trop longs sont redécoupés
+    par lignes puis par phrases pour rester sous `max_paragraph_tokens`.
+    """
+    paragraphs = []
+    for block in _PARAGRAPH_SPLIT_RE.split(text):
+        block = block.strip()
+        if not block:
+            continue
+        if count_tokens(block) <= max_paragraph_tokens:
+            paragraphs.append(block)
+            continue
+        current = ""
+        for piece in (p for line in block.split("\n") for p in _SENTENCE_SPLIT_RE.split(line)):
+            if current and count_tokens(current) + count_tokens(piece) > max_paragraph_tokens:
+                paragraphs.append(current)
+                current = ""
+            current = f"{current} {piece}".strip()
+        if current:
+            paragraphs.append(current)
+    return paragraphs
+
+
+def build_context(text: str, query: str, max_tokens: int) -> str:
+    """
+    Réduit `text` à au plus `max_tokens` tokens en gardant les paragraphes les plus
+    pertinents pour `query` (score BM25), remis dans l'ordre du document.
+    Un texte qui tient déjà dans le budget est renvoyé tel quel.
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    paragraphs = split_paragraphs(text)
+    scores = BM25([tokenize(p) for p in paragraphs]).get_scores(tokenize(query))
+    ranked = sorted(range(len(paragraphs)), key=lambda i: scores[i], reverse=True)
+
+    selected = []
+    used = 0
+    for i in ranked:
+        cost = count_tokens(paragraphs[i]) + 1
+        if used + cost > max_tokens:
+            continue
+        selected.append(i)
+        used += cost
+
+    logger.debug(f"Contexte réduit de {count_tokens(text)} à {used} tokens ({len(selected)}/{len(paragraphs)} paragraphes).")
+    return "\n\n".join(paragraphs[i] for i in sorted(selected))
@@ -0,0 +1,289 @@
+# core/csv_data.py
+
+import hashlib
+import logging
+from io import BytesIO
+from typing import IO, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    CSV_CATEGORY_MAX_RATIO,
+    CSV_CHUNK_ROWS,
+    CSV_MAX_ROWS,
+    CSV_PLOT_MAX_POINTS,
+    CSV_PLOT_DOWNSAMPLER
+)
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(data: bytes) -> str:
+    """
+    Empreinte du contenu d'un fichier : clé de cache indépendante du nom de l'upload.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def find_date_column(df: pd.DataFrame) -> Optional[str]:
+    for column in df.columns:
+        if str(column).strip().lower() == "date":
+            return column
+    return None
+
+
+def compact_dataframe(df: pd.DataFrame, category_max_ratio: float = CSV_CATEGORY_MAX_RATIO) -> pd.DataFrame:
+    """
+    Réduit l'empreinte mémoire d'un DataFrame :
+    - colonne `Date` parsée en datetime64 ;
+    - entiers réduits au plus petit type signé/non signé suffisant ;
+    - colonnes texte peu variées (tickers, secteurs...) en `category`.
+    Les flottants restent en float64 : un float32 afficherait 150.119995 au lieu de 150.12.
+    """
+    df = df.copy()
+    date_column = find_date_column(df)
+    if date_column is not None and not pd.api.types.is_datetime64_any_dtype(df[date_column]):
+        parsed = pd.to_datetime(df[date_column], errors="coerce")
+        # Colonne "Date" qui n'en est pas une : on la laisse telle quelle
+        if parsed.notna().sum() >= df[date_column].notna().sum():
+            df[date_column] = parsed
+
+    for column in df.columns:
+        series = df[column]
+        if pd.api.types.is_bool_dtype(series):
+            continue
+        if pd.api.types.is_integer_dtype(series):
+            downcast = "unsigned" if len(series) and series.min() >= 0 else "integer"
+            df[column] = pd.to_numeric(series, downcast=downcast)
+        elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            if len(series) and series.nunique(dropna=True) <= category_max_ratio * len(series):
+                df[column] = series.astype("category")
+    return df
+
+
+def read_csv_compact(data: bytes) -> pd.DataFrame:
+    """
+    Parse un CSV avec le moteur multi-thread de pyarrow (repli sur le moteur C
+    si pyarrow est absent ou refuse le fichier), puis compacte les types.
+    """
+    try:
+        df = pd.read_csv(BytesIO(data), engine="pyarrow")
+    except ImportError:
+        df = pd.read_csv(BytesIO(data))
+    except Exception as e:
+        logger.info(f"Parsing pyarrow impossible ({e}), repli sur le moteur C.")
+        df = pd.read_csv(BytesIO(data))
+    return compact_dataframe(df)
+
+
+def _as_buffer(source: Union[bytes, IO]) -> IO:
+    if isinstance(source, (bytes, bytearray)):
+        return BytesIO(source)
+    source.seek(0)
+    return source
+
+
+def read_csv_header(source: Union[bytes, IO]) -> List[str]:
+    """
+    Noms de colonnes d'un CSV, sans lire ses lignes.
+    """
+    return pd.read_csv(_as_buffer(source), nrows=0).columns.tolist()
+
+
+def read_csv_preview(source: Union[bytes, IO], nrows: int) -> pd.DataFrame:
+    """
+    Premières lignes d'un CSV, sans lire le reste du fichier.
+    """
+    return pd.read_csv(_as_buffer(source), nrows=nrows)
+
+
+def read_csv_columns(source: Union[bytes, IO], columns: Optional[Sequence[str]] = None,
+                     chunk_rows: int = CSV_CHUNK_ROWS, max_rows: int = CSV_MAX_ROWS) -> Tuple[pd.DataFrame, bool]:
+    """
+    Lit un gros CSV par chunks de `chunk_rows` lignes, en ne parsant que `columns`
+    (toutes si None), et s'arrête après `max_rows` lignes.
+    Chaque chunk est compacté dès sa lecture, pour que le pic mémoire suive le
+    frame final et non le texte brut. Renvoie (DataFrame, tronqué ?).
+    """
+    reader = pd.read_csv(_as_buffer(source), usecols=list(columns) if columns else None, chunksize=chunk_rows)
+    chunks, rows, truncated = [], 0, False
+    with reader:
+        for chunk in reader:
+            if rows + len(chunk) > max_rows:
+                chunk = chunk.iloc[:max_rows - rows]
+                truncated = True
+            # Pas de `category` par chunk : des catégories différentes repasseraient en object au concat
+            chunks.append(compact_dataframe(chunk, category_max_ratio=0))
+            rows += len(chunk)
+            if truncated:
+                break
+    if not chunks:
+        return pd.DataFrame(columns=list(columns) if columns else read_csv_header(source)), False
+    return compact_dataframe(pd.concat(chunks, ignore_index=True)), truncated
+
+
+def _numeric_axis(values) -> Optional[np.ndarray]:
+    """
+    Axe en float64 (dates en nanosecondes), ou None s'il n'est pas numérique.
+    """
+    array = np.asarray(values)
+    if np.issubdtype(array.dtype, np.datetime64):
+        return array.astype("datetime64[ns]").astype(np.int64).astype(np.float64)
+    if np.issubdtype(array.dtype, np.number):
+        return array.astype(np.float64)
+    try:
+        return pd.to_datetime(pd.Series(array)).to_numpy("datetime64[ns]").astype(np.int64).astype(np.float64)
+    except (ValueError, TypeError):
+        return None
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets : garde `n_out` points dont la forme visuelle
+    (pics, creux, tendances) est la plus proche de la série complète.
+    Le premier et le dernier point sont toujours conservés.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    y = np.where(np.isnan(y), 0.0, y)
+    # n_out - 2 buckets entre le premier et le dernier point
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        if i == n_out - 3:
+            next_x, next_y = x[n - 1], y[n - 1]
+        else:
+            next_x, next_y = x[end:edges[i + 2]].mean(), y[end:edges[i + 2]].mean()
+        # Aire du triangle (point retenu, candidat, moyenne du bucket suivant)
+        areas = np.abs((x[a] - next_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (next_y - y[a]))
+        a = start + int(np.argmax(areas))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Min/max par bucket : garde le minimum et le maximum de chaque bucket
+    (aucun pic n'est perdu), plus le premier et le dernier point.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+    y = np.where(np.isnan(y), np.nanmean(y) if np.isfinite(np.nanmean(y)) else 0.0, y)
+    n_buckets = (n_out - 2) // 2
+    edges = np.linspace(1, n - 1, n_buckets + 1).astype(np.int64)
+    indices = [0, n - 1]
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end > start:
+            indices.append(start + int(np.argmin(y[start:end])))
+            indices.append(start + int(np.argmax(y[start:end])))
+    return np.unique(indices)
+
+
+def downsample_indices(x, y, max_points: int = CSV_PLOT_MAX_POINTS,
+                       method: str = CSV_PLOT_DOWNSAMPLER) -> Optional[np.ndarray]:
+    """
+    Indices à garder pour tracer (x, y) en au plus `max_points` points,
+    ou None si la série est assez courte ou si `y` n'est pas numérique.
+    """
+    y_values = _numeric_axis(y)
+    if y_values is None or len(y_values) <= max_points:
+        return None
+    if method == "minmax":
+        return minmax_indices(y_values, max_points)
+    x_values = _numeric_axis(x) if x is not None else None
+    if x_values is None or len(x_values) != len(y_values):
+        x_values = np.arange(len(y_values), dtype=np.float64)
+    return lttb_indices(x_values, y_values, max_points)
+
+
+def _group_column(df: pd.DataFrame, max_groups: int = 50) -> Optional[str]:
+    """
+    Colonne catégorielle peu variée (ex. Ticker) qui sépare plusieurs séries entrelacées.
+    """
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype) and df[column].nunique() <= max_groups:
+            return column
+    return None
+
+
+def downsample_dataframe(df: pd.DataFrame, max_points: int = CSV_PLOT_MAX_POINTS,
+                         method: str = CSV_PLOT_DOWNSAMPLER) -> pd.DataFrame:
+    """
+    Réduit une série temporelle dense avant la construction d'une figure : pour chaque
+    colonne numérique (et chaque groupe, ex. par Ticker), au plus `max_points` lignes
+    sont gardées (LTTB ou min/max selon la colonne Date), et l'union de ces lignes est
+    renvoyée dans l'ordre d'origine. Un frame sans colonne Date triée est renvoyé tel quel.
+    """
+    date_column = find_date_column(df)
+    if date_column is None or len(df) <= max_points or not pd.api.types.is_datetime64_any_dtype(df[date_column]):
+        return df
+    numeric_columns = [
+        column for column in df.select_dtypes(include="number").columns
+        if not pd.api.types.is_bool_dtype(df[column])
+    ]
+    if not numeric_columns:
+        return df
+
+    group_column = _group_column(df)
+    groups = df.groupby(group_column, observed=True).indices.values() if group_column else [np.arange(len(df))]
+    keep = []
+    for positions in groups:
+        dates = df[date_column].to_numpy()[positions]
+        # Série non triée par date : rien n'est réduit (la forme ne serait pas préservée)
+        if len(dates) > 1 and np.any(dates[1:] < dates[:-1]):
+            return df
+        for column in numeric_columns:
+            indices = downsample_indices(dates, df[column].to_numpy()[positions], max_points, method)
+            keep.append(positions if indices is None else positions[indices])
+    rows = np.unique(np.concatenate(keep))
+    return df.iloc[rows] if len(rows) < len(df) else df
+
+
+def downsample_figure(fig, max_points: int = CSV_PLOT_MAX_POINTS, method: str = CSV_PLOT_DOWNSAMPLER) -> int:
+    """
+    Sous-échantillonne en place les traces scatter/line d'une figure Plotly trop
+    denses, avant sérialisation vers le navigateur. Les séries triées par x
+    (séries temporelles) gardent leur forme ; les nuages de points non triés
+    sont laissés tels quels. Renvoie le nombre de traces réduites.
+    """
+    reduced = 0
+    for trace in fig.data:
+        if trace.type not in ("scatter", "scattergl") or trace.y is None:
+            continue
+        x = _numeric_axis(trace.x) if trace.x is not None else None
+        if x is not None and len(x) > 1 and np.any(np.diff(x) < 0):
+            continue
+        indices = downsample_indices(trace.x, trace.y, max_points, method)
+        if indices is None:
+            continue
+        updates = {"y": np.asarray(trace.y)[indices]}
+        if trace.x is not None:
+            updates["x"] = np.asarray(trace.x)[indices]
+        for attr in ("text", "hovertext", "customdata"):
+            value = getattr(trace, attr, None)
+            if value is not None and not isinstance(value, str) and len(value) == len(trace.y):
+                updates[attr] = np.asarray(value)[indices]
+        trace.update(updates)
+        reduced += 1
+    return reduced
+
+
+def estimate_payload_bytes(fig, bytes_per_value: int = 24) -> int:
+    """
+    Taille approximative du JSON envoyé au navigateur, d'après le nombre de valeurs
+    des traces (sans sérialiser la figure).
+    """
+    def count(value) -> int:
+        if isinstance(value, dict):
+            return sum(count(v) for v in value.values())
+        if isinstance(value, (list, tuple, np.ndarray)):
+            return len(value)
+        return 0
+
+    return bytes_per_value * sum(count(trace.to_plotly_json()) for trace in fig.data)
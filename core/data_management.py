@@ -1,43 +1,78 @@
 # core/data_management.py
 
 import os
+import json
 import shutil
 import uuid
+import hashlib
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
-from langchain.docstore.document import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.vectorstores import Chroma
 
-from embedding import get_embedding_function
 from config import CHROMA_PATH
+from core.bm25 import reset_bm25_indexes
+from core.vector_store import get_vector_store, reset_vector_stores
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+COLLECTION_VERSION_FILE = "collection_version"
+MANIFEST_FILE = "ingest_manifest.json"
+
+def get_collection_version() -> str:
+    """
+    Renvoie la version courante de la collection Chroma.
+    Elle change à chaque modification (ajout de documents, reset) et sert
+    à invalider les caches de retrieval.
+    """
+    path = os.path.join(CHROMA_PATH, COLLECTION_VERSION_FILE)
+    if not os.path.isfile(path):
+        if os.path.isdir(CHROMA_PATH) and os.listdir(CHROMA_PATH):
+            # Base antérieure au fichier de version : on lui en attribue une,
+            # pour ne pas partager la clé "empty" avec une base vide
+            return _bump_collection_version()
+        return "empty"
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read().strip()
+
+def _bump_collection_version() -> str:
+    os.makedirs(CHROMA_PATH, exist_ok=True)
+    version = uuid.uuid4().hex
+    with open(os.path.join(CHROMA_PATH, COLLECTION_VERSION_FILE), "w", encoding="utf-8") as f:
+        f.write(version)
+    return version
+
 def clear_database():
     """
     Supprime le répertoire CHROMA_PATH pour réinitialiser la base Chroma.
     """
+    # Les stores ouverts (SQLite, segments mmap, index BM25) sont fermés et oubliés :
+    # les agents existants passent à la base neuve au lieu de lire les fichiers supprimés
+    reset_vector_stores()
+    reset_bm25_indexes()
     if os.path.exists(CHROMA_PATH):
         shutil.rmtree(CHROMA_PATH)
         logger.info(f"Répertoire Chroma supprimé: {CHROMA_PATH}")
     else:
         logger.info("Aucune base Chroma à supprimer (répertoire introuvable).")
+    # Nouvelle version (et non "empty") : les entrées de cache de retrieval d'avant le reset ne resservent pas
+    _bump_collection_version()
 
-def list_chroma_documents() -> List[Dict[str, Any]]:
+def list_chroma_documents(offset: int = 0, limit: int = 50, source: Optional[str] = None) -> List[Dict[str, Any]]:
     """
-    Liste tous les documents (chunks) déjà indexés dans la base Chroma.
+    Liste une page de documents (chunks) indexés dans la base vectorielle.
+    Seuls les métadonnées et le texte sont lus (pas les embeddings) ; `source` filtre
+    sur le fichier d'origine.
     """
     if not os.path.exists(CHROMA_PATH):
         logger.warning(f"Aucune base Chroma trouvée dans {CHROMA_PATH}.")
         return []
-    db = Chroma(
-        persist_directory=CHROMA_PATH,
-        embedding_function=get_embedding_function()
+    store = get_vector_store().get(
+        where={"source": source} if source else None,
+        limit=limit,
+        offset=offset,
+        include=["metadatas", "documents"]
     )
-    store = db.get()  # returns dict with keys: ["ids", "embeddings", "metadatas", "documents"]
     docs_info = []
     for i, doc_content in enumerate(store["documents"]):
         doc_id = store["ids"][i]
@@ -50,37 +85,74 @@ def list_chroma_documents() -> List[Dict[str, Any]]:
         })
     return docs_info
 
-def add_custom_documents(file_paths: List[str]):
+def get_source_counts(scan_page_size: int = 5000) -> Dict[str, int]:
     """
-    Ajoute manuellement une liste de fichiers .txt / .md à la base Chroma.
+    Nombre de chunks par source. Lu dans le manifest d'ingestion ; à défaut (base indexée
+    avant le manifest), par un parcours paginé des seules métadonnées.
     """
     if not os.path.exists(CHROMA_PATH):
-        os.makedirs(CHROMA_PATH, exist_ok=True)
-        logger.info("Création du répertoire Chroma...")
+        return {}
+    manifest = load_manifest()
+    if manifest:
+        return {source: len(entry["chunk_ids"]) for source, entry in sorted(manifest.items())}
 
-    db = Chroma(
-        persist_directory=CHROMA_PATH,
-        embedding_function=get_embedding_function()
-    )
+    collection = get_vector_store()
+    counts: Dict[str, int] = {}
+    for offset in range(0, collection.count(), scan_page_size):
+        page = collection.get(limit=scan_page_size, offset=offset, include=["metadatas"])
+        for meta in page["metadatas"]:
+            source = (meta or {}).get("source", "unknown")
+            counts[source] = counts.get(source, 0) + 1
+    return dict(sorted(counts.items()))
+
+def _file_hash(file_path: str) -> str:
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
 
-    # On lit chaque fichier, on le split en chunks, on indexe
-    all_chunks = []
-    for fp in file_paths:
-        if not os.path.isfile(fp):
-            logger.warning(f"Fichier introuvable: {fp}")
-            continue
-        with open(fp, "r", encoding="utf-8") as f:
-            text = f.read()
-        doc = Document(page_content=text, metadata={"source": os.path.basename(fp)})
-        chunks = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100).split_text(text)
-        # ou .split_documents([doc]) selon la version
-        for c in chunks:
-            chunk_doc = Document(page_content=c, metadata={"source": os.path.basename(fp)})
-            all_chunks.append(chunk_doc)
-
-    texts = [d.page_content for d in all_chunks]
-    metadatas = [{"source": d.metadata["source"]} for d in all_chunks]
-    ids = [str(uuid.uuid4()) for _ in all_chunks]
-    db.add_texts(texts=texts, metadatas=metadatas, ids=ids)
-    db.persist()
-    logger.info(f"{len(file_paths)} fichier(s) ajouté(s). Total {len(all_chunks)} chunks insérés.")
+def make_chunk_ids(source: str, chunks: List[str]) -> List[str]:
+    """
+    IDs déterministes des chunks d'une source : hash de (source, hash du contenu, rang).
+    Le rang est celui du chunk parmi les chunks de même contenu dans la source : un chunk
+    inchangé garde le même ID même si des chunks sont ajoutés ou retirés avant lui.
+    """
+    seen = {}
+    ids = []
+    for chunk in chunks:
+        content_hash = hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+        occurrence = seen.get(content_hash, 0)
+        seen[content_hash] = occurrence + 1
+        ids.append(hashlib.sha256(f"{source}|{content_hash}|{occurrence}".encode("utf-8")).hexdigest())
+    return ids
+
+def load_manifest() -> Dict[str, Any]:
+    """
+    Manifest des fichiers déjà indexés : {source: {"file_hash", "chunk_ids", "chunker", "ingested_at"}}.
+    """
+    path = os.path.join(CHROMA_PATH, MANIFEST_FILE)
+    if not os.path.isfile(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_manifest(manifest: Dict[str, Any]):
+    os.makedirs(CHROMA_PATH, exist_ok=True)
+    path = os.path.join(CHROMA_PATH, MANIFEST_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+def add_custom_documents(file_paths: List[str], progress=None) -> Dict[str, Any]:
+    """
+    Ajoute manuellement une liste de fichiers .txt / .md à la base Chroma.
+
+    Ingestion incrémentale : un fichier inchangé (même hash) est ignoré ; pour un fichier
+    modifié, seuls les chunks nouveaux sont embeddés et les chunks disparus sont supprimés.
+    Voir core.ingestion pour le pipeline en lots (et son CLI pour l'ingestion de masse).
+    """
+    from core.ingestion import ingest_documents  # import local : core.ingestion dépend de ce module
+    # Le modèle déjà chargé dans le process (app Streamlit) est réutilisé : pas de pool d'embedding ici
+    return ingest_documents(file_paths, embed_workers=0, progress=progress)
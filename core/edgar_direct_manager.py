@@ -3,9 +3,46 @@
 import logging
 from edgar import *
 
+from config import FILING_CACHE_MAX_SIZE, FILING_CACHE_TTL
+from core.cache import LRUCache
+from core.filing_store import FilingStore, get_filing_store
+from core.tracing import span
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Caches partagés par tout le process (tous les agents, toutes les sessions Streamlit).
+# - _LATEST_FILINGS : (ticker, form) -> (accession, Filing ou None) (évite Company(...) + get_filings(...))
+# - _FILING_CACHE   : (ticker, form, accession) -> objet parsé (TenK) ou StoredFiling lu depuis le disque
+_LATEST_FILINGS = LRUCache(max_size=FILING_CACHE_MAX_SIZE, ttl=FILING_CACHE_TTL, name="latest_filings")
+_FILING_CACHE = LRUCache(max_size=FILING_CACHE_MAX_SIZE, ttl=FILING_CACHE_TTL, name="filings")
+
+
+def get_filing_cache() -> LRUCache:
+    """
+    Renvoie le cache process-wide des filings parsés.
+    """
+    return _FILING_CACHE
+
+
+def clear_filing_caches():
+    """
+    Vide les caches de filings (dernier filing par ticker et filings parsés).
+    """
+    _LATEST_FILINGS.clear()
+    _FILING_CACHE.clear()
+
+
+def get_filing_cache_stats() -> dict:
+    """
+    Renvoie les compteurs hit/miss des caches de filings.
+    """
+    return {
+        "latest_filings": _LATEST_FILINGS.stats(),
+        "filings": _FILING_CACHE.stats(),
+    }
+
+
 class EdgarDirectManager:
     """
     Gère la récupération du dernier 10-K pour un ticker, 
@@ -15,19 +52,89 @@ class EdgarDirectManager:
     def __init__(self, 
                  ticker_symbol: str, 
                  user_agent: str = "Vincent Cotella vincent.cotella@edu.devinci.fr", 
-                 report_type="10-K"):
+                 report_type="10-K",
+                 store: FilingStore = None):
         self.ticker_symbol = ticker_symbol.upper()
         self.report_type = report_type
+        # Store disque des Items déjà parsés (cold-start sans réseau)
+        self.store = store or get_filing_store()
         set_identity(user_agent)
 
-    def _get_full_filing_obj(self):
+    def _fetch_latest_filing(self):
         """
-        Renvoie l'objet subscriptable (par ex. filing_obj["Item 1"]).
+        Interroge EDGAR pour obtenir le dernier filing (appel réseau).
         """
         company = Company(self.ticker_symbol)
         filing = company.get_filings(form=self.report_type).latest(1)
         logger.info(f"Récupération du dernier {self.report_type} pour {self.ticker_symbol}")
-        return filing.obj()  # p. ex. TenK object subscriptable
+        return filing
+
+    def _resolve_latest(self):
+        """
+        Renvoie (accession, filing) du dernier filing.
+        Le store local est consulté d'abord ; filing vaut None si l'accession vient du store.
+        En cas d'échec réseau, on se rabat sur le dernier accession persisté, même ancien.
+        """
+        accession = self.store.latest_accession(self.ticker_symbol, self.report_type)
+        if accession:
+            logger.info(f"Dernier {self.report_type} de {self.ticker_symbol} lu depuis le store local ({accession})")
+            return accession, None
+        try:
+            filing = self._fetch_latest_filing()
+        except Exception as e:
+            accession = self.store.latest_accession(self.ticker_symbol, self.report_type, max_age=None)
+            if accession is None:
+                raise
+            logger.warning(f"EDGAR injoignable ({e}), utilisation du filing persisté {accession}")
+            return accession, None
+        if self.store.has(self.ticker_symbol, self.report_type, filing.accession_no):
+            self.store.set_latest(self.ticker_symbol, self.report_type, filing.accession_no)
+        return filing.accession_no, filing
+
+    def _load_filing_obj(self, accession: str, filing=None):
+        """
+        Charge le filing depuis le store disque si possible, sinon le télécharge,
+        le parse et persiste ses Items pour les prochains démarrages.
+        """
+        stored = self.store.open(self.ticker_symbol, self.report_type, accession)
+        if stored is not None:
+            return stored
+        if filing is None:
+            filing = find(accession)
+        logger.info(f"Parsing du {self.report_type} {accession} pour {self.ticker_symbol}")
+        filing_obj = filing.obj()
+        try:
+            self.store.write_filing_obj(self.ticker_symbol, self.report_type, accession, filing_obj)
+        except OSError as e:
+            logger.warning(f"Impossible de persister le filing {accession}: {e}")
+        return filing_obj
+
+    def get_accession(self) -> str:
+        """
+        Renvoie le numéro d'accession du dernier filing.
+        """
+        accession, _ = _LATEST_FILINGS.get_or_set(
+            (self.ticker_symbol, self.report_type),
+            self._resolve_latest
+        )
+        return accession
+
+    def _get_full_filing_obj(self):
+        """
+        Renvoie l'objet subscriptable (par ex. filing_obj["Item 1"]).
+        Le filing est mis en cache par (ticker, form, accession) : un rapport complet
+        ne télécharge et ne parse le 10-K qu'une seule fois, et un process redémarré
+        relit les Items depuis le store disque.
+        """
+        with span("edgar.get_filing", ticker=self.ticker_symbol, form=self.report_type) as s:
+            accession, filing = _LATEST_FILINGS.get_or_set(
+                (self.ticker_symbol, self.report_type),
+                self._resolve_latest
+            )
+            cache_key = (self.ticker_symbol, self.report_type, accession)
+            s.set_attribute("accession", accession)
+            s.set_attribute("cached", cache_key in _FILING_CACHE)
+            return _FILING_CACHE.get_or_set(cache_key, lambda: self._load_filing_obj(accession, filing))  # p. ex. TenK object subscriptable
 
     def get_item_text(self, item_label: str) -> str:
         """
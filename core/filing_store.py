@@ -0,0 +1,252 @@
+# core/filing_store.py
+
+import os
+import re
+import json
+import mmap
+import time
+import logging
+import argparse
+from typing import Dict, List, Optional
+
+from config import FILING_STORE_PATH, FILING_STORE_LATEST_TTL
+from core.tenk_sections import TENK_ITEMS, split_10k_items
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ITEMS_FILENAME = "items.txt"
+INDEX_FILENAME = "index.json"
+LATEST_FILENAME = "latest.json"
+
+
+def _safe_name(value: str) -> str:
+    """
+    Rend un ticker / form / accession utilisable comme nom de répertoire.
+    """
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", value)
+
+
+def _write_atomic(path: str, data: bytes):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class StoredFiling:
+    """
+    Vue en lecture seule d'un filing persisté sur disque.
+    Subscriptable comme l'objet TenK (filing_obj["Item 1"]), et lève KeyError si l'Item
+    est absent. Chaque Item est lu via mmap à partir de son offset : seuls les Items
+    demandés sont chargés en mémoire.
+    """
+
+    def __init__(self, directory: str, index: dict):
+        self.directory = directory
+        self.accession = index["accession"]
+        self._offsets = index["items"]
+
+    @property
+    def items(self) -> List[str]:
+        return list(self._offsets.keys())
+
+    def __contains__(self, item_label: str) -> bool:
+        return item_label in self._offsets
+
+    def __getitem__(self, item_label: str) -> str:
+        return self.read_items([item_label])[item_label]
+
+    def read_items(self, item_labels: List[str]) -> Dict[str, str]:
+        """
+        Lit plusieurs Items en une seule ouverture du fichier.
+        Lève KeyError si l'un des Items n'existe pas.
+        """
+        missing = [label for label in item_labels if label not in self._offsets]
+        if missing:
+            raise KeyError(missing[0])
+        path = os.path.join(self.directory, ITEMS_FILENAME)
+        texts = {}
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return {label: "" for label in item_labels}
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for label in item_labels:
+                    offset, length = self._offsets[label]
+                    texts[label] = mm[offset:offset + length].decode("utf-8")
+        return texts
+
+
+class FilingStore:
+    """
+    Stockage local des Items parsés de chaque filing.
+
+    Arborescence :
+        <root>/<TICKER>/<form>/latest.json                -> dernier accession connu
+        <root>/<TICKER>/<form>/<accession>/items.txt      -> Items concaténés (UTF-8)
+        <root>/<TICKER>/<form>/<accession>/index.json     -> {label: [offset, length]} en octets
+    """
+
+    def __init__(self, root: str = FILING_STORE_PATH):
+        self.root = root
+
+    def _form_dir(self, ticker: str, form: str) -> str:
+        return os.path.join(self.root, _safe_name(ticker.upper()), _safe_name(form))
+
+    def _filing_dir(self, ticker: str, form: str, accession: str) -> str:
+        return os.path.join(self._form_dir(ticker, form), _safe_name(accession))
+
+    def has(self, ticker: str, form: str, accession: str) -> bool:
+        return os.path.isfile(os.path.join(self._filing_dir(ticker, form, accession), INDEX_FILENAME))
+
+    def latest_accession(self, ticker: str, form: str, max_age: Optional[float] = FILING_STORE_LATEST_TTL) -> Optional[str]:
+        """
+        Renvoie le dernier accession enregistré pour (ticker, form),
+        ou None s'il n'existe pas ou s'il est plus vieux que `max_age` secondes.
+        """
+        path = os.path.join(self._form_dir(ticker, form), LATEST_FILENAME)
+        if not os.path.isfile(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            latest = json.load(f)
+        if max_age is not None and (time.time() - latest.get("fetched_at", 0)) > max_age:
+            return None
+        if not self.has(ticker, form, latest["accession"]):
+            return None
+        return latest["accession"]
+
+    def set_latest(self, ticker: str, form: str, accession: str):
+        form_dir = self._form_dir(ticker, form)
+        os.makedirs(form_dir, exist_ok=True)
+        payload = {"accession": accession, "fetched_at": time.time()}
+        _write_atomic(os.path.join(form_dir, LATEST_FILENAME), json.dumps(payload).encode("utf-8"))
+
+    def write(self, ticker: str, form: str, accession: str, items: Dict[str, str], set_latest: bool = True) -> StoredFiling:
+        """
+        Persiste les Items d'un filing (texte + index d'offsets en octets).
+        L'index est écrit en dernier : un filing incomplet n'est jamais servi.
+        """
+        directory = self._filing_dir(ticker, form, accession)
+        os.makedirs(directory, exist_ok=True)
+
+        offsets = {}
+        parts = []
+        position = 0
+        for label, text in items.items():
+            encoded = (text or "").encode("utf-8")
+            offsets[label] = [position, len(encoded)]
+            parts.append(encoded)
+            position += len(encoded)
+
+        index = {
+            "ticker": ticker.upper(),
+            "form": form,
+            "accession": accession,
+            "items": offsets,
+            "created_at": time.time(),
+        }
+        _write_atomic(os.path.join(directory, ITEMS_FILENAME), b"".join(parts))
+        _write_atomic(os.path.join(directory, INDEX_FILENAME), json.dumps(index).encode("utf-8"))
+        if set_latest:
+            self.set_latest(ticker, form, accession)
+        logger.info(f"Filing {ticker.upper()} {form} {accession} persisté ({len(offsets)} Items).")
+        return StoredFiling(directory, index)
+
+    def write_filing_obj(self, ticker: str, form: str, accession: str, filing_obj, set_latest: bool = True) -> StoredFiling:
+        """
+        Persiste un objet filing parsé par edgar (ex. TenK) en extrayant chacun de ses Items.
+        """
+        labels = getattr(filing_obj, "items", None) or TENK_ITEMS
+        items = {}
+        for label in labels:
+            try:
+                text = filing_obj[label]
+            except KeyError:
+                continue
+            if text:
+                items[label] = str(text)
+        return self.write(ticker, form, accession, items, set_latest=set_latest)
+
+    def open(self, ticker: str, form: str, accession: str) -> Optional[StoredFiling]:
+        """
+        Ouvre un filing persisté, ou renvoie None s'il n'est pas dans le store.
+        """
+        directory = self._filing_dir(ticker, form, accession)
+        index_path = os.path.join(directory, INDEX_FILENAME)
+        if not os.path.isfile(index_path):
+            return None
+        with open(index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        return StoredFiling(directory, index)
+
+
+_DEFAULT_STORE = FilingStore()
+
+
+def get_filing_store() -> FilingStore:
+    """
+    Renvoie le store partagé par le process (répertoire FILING_STORE_PATH).
+    """
+    return _DEFAULT_STORE
+
+
+def import_text_filing(ticker: str, file_path: str, form: str = "10-K", accession: Optional[str] = None,
+                       store: Optional[FilingStore] = None) -> StoredFiling:
+    """
+    Importe un 10-K en texte brut (ex. PDF/aapl.txt) dans le store, sans accès réseau.
+    """
+    store = store or get_filing_store()
+    with open(file_path, "r", encoding="utf-8") as f:
+        text = f.read()
+    items = split_10k_items(text)
+    if not items:
+        raise ValueError(f"Aucun Item 10-K détecté dans {file_path}")
+    accession = accession or f"local-{os.path.splitext(os.path.basename(file_path))[0]}"
+    return store.write(ticker, form, accession, items)
+
+
+def prefetch_tickers(tickers: List[str], form: str = "10-K") -> Dict[str, str]:
+    """
+    Télécharge et persiste le dernier filing de chaque ticker.
+    Renvoie {ticker: accession ou message d'erreur}.
+    """
+    # Import local : edgar_direct_manager dépend lui-même de ce module
+    from core.edgar_direct_manager import EdgarDirectManager
+
+    results = {}
+    for ticker in tickers:
+        try:
+            manager = EdgarDirectManager(ticker_symbol=ticker, report_type=form)
+            manager._get_full_filing_obj()
+            results[ticker.upper()] = manager.get_accession()
+        except Exception as e:
+            logger.error(f"Prefetch impossible pour {ticker}: {e}")
+            results[ticker.upper()] = f"failed: {e}"
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gestion du store local des filings 10-K.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    prefetch_parser = subparsers.add_parser("prefetch", help="Télécharge et persiste le dernier filing de chaque ticker.")
+    prefetch_parser.add_argument("tickers", nargs="+")
+    prefetch_parser.add_argument("--form", default="10-K")
+
+    import_parser = subparsers.add_parser("import", help="Importe un 10-K texte local (ex. PDF/aapl.txt).")
+    import_parser.add_argument("ticker")
+    import_parser.add_argument("file_path")
+    import_parser.add_argument("--form", default="10-K")
+    import_parser.add_argument("--accession", default=None)
+
+    args = parser.parse_args()
+    if args.command == "prefetch":
+        for ticker, status in prefetch_tickers(args.tickers, form=args.form).items():
+            print(f"{ticker}: {status}")
+    else:
+        stored = import_text_filing(args.ticker, args.file_path, form=args.form, accession=args.accession)
+        print(f"{args.ticker.upper()}: {stored.accession} ({', '.join(stored.items)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# core/groq_clients.py
+
+import asyncio
+import threading
+import weakref
+
+import httpx
+from groq import Groq, AsyncGroq
+
+from config import GROQ_HTTP_MAX_CONNECTIONS, GROQ_HTTP_MAX_KEEPALIVE, GROQ_HTTP_TIMEOUT
+
+_limits = httpx.Limits(
+    max_connections=GROQ_HTTP_MAX_CONNECTIONS,
+    max_keepalive_connections=GROQ_HTTP_MAX_KEEPALIVE
+)
+
+_sync_clients = {}
+_async_clients = weakref.WeakKeyDictionary()
+_clients_lock = threading.Lock()
+
+
+def get_groq_client(api_key: str = None) -> Groq:
+    """
+    Renvoie le client Groq synchrone partagé par le process pour cette clé d'API.
+    Le pool HTTP (keep-alive) est réutilisé par tous les appels au lieu d'un client par appel.
+    """
+    with _clients_lock:
+        if api_key not in _sync_clients:
+            _sync_clients[api_key] = Groq(
+                api_key=api_key,
+                max_retries=0,  # retries gérés par core.rate_limiter
+                http_client=httpx.Client(limits=_limits, timeout=GROQ_HTTP_TIMEOUT)
+            )
+        return _sync_clients[api_key]
+
+
+def get_async_groq_client(api_key: str = None) -> AsyncGroq:
+    """
+    Renvoie le client Groq asynchrone partagé pour la boucle d'événements courante.
+    Un pool httpx ne peut pas être partagé entre boucles : on en garde un par boucle.
+    """
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        clients = _async_clients.setdefault(loop, {})
+        if api_key not in clients:
+            clients[api_key] = AsyncGroq(
+                api_key=api_key,
+                max_retries=0,  # retries gérés par core.rate_limiter
+                http_client=httpx.AsyncClient(limits=_limits, timeout=GROQ_HTTP_TIMEOUT)
+            )
+        return clients[api_key]
+
+
+async def aclose_async_groq_clients():
+    """
+    Ferme les clients asynchrones de la boucle courante (et leur pool httpx).
+    À appeler en fin de run asynchrone : asyncio.run() crée une boucle par appel,
+    et un client non fermé garderait ses connexions jusqu'au garbage collector.
+    """
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        clients = list(_async_clients.pop(loop, {}).values())
+    for client in clients:
+        await client.close()
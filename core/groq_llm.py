@@ -1,36 +1,160 @@
 import os
+import time
+import asyncio
+import logging
 from dotenv import load_dotenv
 from langchain.llms.base import LLM
-from typing import Optional, List
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.outputs import GenerationChunk
+from typing import Any, Iterator, Optional, List
 from pydantic import PrivateAttr, Field
 # Hypothèse : vous avez une bibliothèque groq
 from groq import Groq
 
+from config import LLM_CACHE_BACKEND
+from core.groq_clients import get_async_groq_client, get_groq_client
+from core.llm_cache import get_llm_cache, make_llm_cache_key
+from core.rate_limiter import acall_with_retry, call_with_retry, estimate_tokens, get_rate_limiter
+from core.tracing import span
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 class GROQLLM(LLM):
     api_key: str = Field(os.getenv("GROQ_API_KEY"), description="The API key for the GROQ service")
     model: str = Field(os.getenv("MODEL_NAME"), description="The model to use for GROQ")
+    bypass_cache: bool = Field(False, description="Ignore cached responses (forced refresh); fresh responses are still cached")
     _client: Groq = PrivateAttr()
+    _cache: Any = PrivateAttr(default=None)
 
-    def __init__(self, api_key: str, model: str):
+    def __init__(self, api_key: str, model: str, cache_backend: str = LLM_CACHE_BACKEND):
         super().__init__()
         self.api_key = api_key
         self.model = model
-        self._client = Groq(api_key=self.api_key)
+        self._client = get_groq_client(self.api_key)
+        self._cache = get_llm_cache(cache_backend)
 
     @property
     def _llm_type(self) -> str:
         return "GROQLLM"
 
-    def _call(self, prompt: str, stop: Optional[List[str]] = None) -> str:
-        try:
-            chat_completion = self._client.chat.completions.create(
+    def get_cache_stats(self) -> dict:
+        return self._cache.stats() if self._cache is not None else {}
+
+    def _lookup_cache(self, prompt: str, stop: Optional[List[str]], kwargs: dict):
+        """
+        Renvoie (clé de cache, réponse en cache ou None).
+        """
+        cache_key = make_llm_cache_key(self.model, prompt, {"stop": stop})
+        if self._cache is None or kwargs.get("bypass_cache", self.bypass_cache):
+            return cache_key, None
+        return cache_key, self._cache.get(cache_key)
+
+    @staticmethod
+    def _record_usage(current_span, response):
+        """
+        Reporte les tokens consommés (usage Groq) sur le span de l'appel.
+        """
+        usage = getattr(response, "usage", None)
+        for key in ("prompt_tokens", "completion_tokens"):
+            if isinstance(getattr(usage, key, None), int):
+                current_span.set_attribute(key, getattr(usage, key))
+
+    def _complete(self, prompt: str, **create_kwargs: Any):
+        """
+        Appel Groq sous le limiteur partagé du modèle, avec retries (429, réseau, 5xx).
+        Lève l'exception finale au lieu de renvoyer un texte d'erreur.
+        """
+        limiter = get_rate_limiter(self.model)
+        estimated = estimate_tokens(prompt)
+
+        def create():
+            limiter.acquire(estimated)
+            return self._client.chat.completions.create(
                 messages=[{"role": "user", "content": prompt}],
                 model=self.model,
+                **create_kwargs
             )
-            if chat_completion.choices:
-                return chat_completion.choices[0].message.content
-            return ""
-        except Exception as e:
-            return f"Error: {e}"
+
+        response = call_with_retry(create)
+        usage = getattr(response, "usage", None)
+        limiter.record_usage(getattr(usage, "total_tokens", None), estimated)
+        return response
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, **kwargs: Any) -> str:
+        with span("llm.call", model=self.model) as current_span:
+            return self._traced_call(prompt, stop, current_span, **kwargs)
+
+    def _traced_call(self, prompt: str, stop: Optional[List[str]], current_span, **kwargs: Any) -> str:
+        cache_key, cached = self._lookup_cache(prompt, stop, kwargs)
+        current_span.set_attribute("cached", cached is not None)
+        if cached is not None:
+            return cached
+        chat_completion = self._complete(prompt)
+        self._record_usage(current_span, chat_completion)
+        content = chat_completion.choices[0].message.content if chat_completion.choices else ""
+        if self._cache is not None:
+            self._cache.set(cache_key, content)
+        return content
+
+    async def _acall(self, prompt: str, stop: Optional[List[str]] = None,
+                     run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> str:
+        with span("llm.call", model=self.model) as current_span:
+            return await self._traced_acall(prompt, stop, current_span, **kwargs)
+
+    async def _traced_acall(self, prompt: str, stop: Optional[List[str]], current_span, **kwargs: Any) -> str:
+        # Cache SQLite : lecture et écriture hors de la boucle, pour ne pas bloquer les autres appels en vol
+        cache_key, cached = await asyncio.to_thread(self._lookup_cache, prompt, stop, kwargs)
+        current_span.set_attribute("cached", cached is not None)
+        if cached is not None:
+            return cached
+        limiter = get_rate_limiter(self.model)
+        estimated = estimate_tokens(prompt)
+
+        async def create():
+            await limiter.aacquire(estimated)
+            return await get_async_groq_client(self.api_key).chat.completions.create(
+                messages=[{"role": "user", "content": prompt}],
+                model=self.model,
+            )
+
+        chat_completion = await acall_with_retry(create)
+        usage = getattr(chat_completion, "usage", None)
+        limiter.record_usage(getattr(usage, "total_tokens", None), estimated)
+        self._record_usage(current_span, chat_completion)
+        content = chat_completion.choices[0].message.content if chat_completion.choices else ""
+        if self._cache is not None:
+            await asyncio.to_thread(self._cache.set, cache_key, content)
+        return content
+
+    def _stream(self, prompt: str, stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[GenerationChunk]:
+        cache_key, cached = self._lookup_cache(prompt, stop, kwargs)
+        if cached is not None:
+            yield GenerationChunk(text=cached)
+            return
+
+        start = time.perf_counter()
+        first_token_at = None
+        parts = []
+        with span("llm.stream", model=self.model) as current_span:
+            # Le limiteur et les retries ne couvrent que l'ouverture du stream
+            stream = self._complete(prompt, stream=True)
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if not delta:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                    current_span.set_attribute("ttft_s", round(first_token_at - start, 3))
+                    logger.info(f"GROQLLM[{self.model}] time to first token: {first_token_at - start:.2f}s")
+                parts.append(delta)
+                generation_chunk = GenerationChunk(text=delta)
+                if run_manager:
+                    run_manager.on_llm_new_token(delta, chunk=generation_chunk)
+                yield generation_chunk
+
+        logger.info(f"GROQLLM[{self.model}] stream completed in {time.perf_counter() - start:.2f}s")
+        if self._cache is not None:
+            self._cache.set(cache_key, "".join(parts))
@@ -0,0 +1,353 @@
+# core/ingestion.py
+
+import os
+import sys
+import time
+import logging
+import argparse
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+from config import BM25_INDEX_PATH, CHROMA_PATH, DATA_PATH, INGEST_BATCH_SIZE, INGEST_EMBED_WORKERS
+from core.data_management import (
+    _bump_collection_version,
+    _file_hash,
+    load_manifest,
+    make_chunk_ids,
+    save_manifest
+)
+from core.bm25 import BM25Index, get_bm25_index
+from core.vector_store import VectorStore, get_vector_store
+from core.tenk_chunker import CHUNKER_VERSION, split_10k_document
+from core.tracing import span
+from embedding import get_embedding_function
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = (".txt", ".md")
+
+
+def iter_source_files(paths: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """
+    Parcourt les chemins donnés (fichiers ou répertoires, ex. DATA_PATH) et renvoie
+    (chemin, source) pour chaque fichier .txt / .md, dans un ordre stable.
+    La source identifie le fichier dans le manifest et dans les IDs de chunks : c'est
+    son chemin relatif au répertoire parcouru (10K/A/10k.txt et 10K/B/10k.txt restent
+    distincts), ou son nom pour un fichier passé directement.
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in sorted(os.walk(path)):
+                for name in sorted(files):
+                    if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                        file_path = os.path.join(root, name)
+                        yield file_path, os.path.relpath(file_path, path).replace(os.sep, "/")
+        elif os.path.isfile(path):
+            yield path, os.path.basename(path)
+        else:
+            logger.warning(f"Fichier introuvable: {path}")
+
+
+def split_file(file_path: str, source: Optional[str] = None, file_hash: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Lit et découpe un fichier en chunks (fonction de niveau module : utilisable
+    dans un process pool). Renvoie la source, le hash du fichier, les chunks,
+    leurs IDs déterministes et leurs métadonnées.
+    """
+    source = source or os.path.basename(file_path)
+    with open(file_path, "r", encoding="utf-8") as f:
+        text = f.read()
+    # Découpage par Item de 10-K : chaque chunk porte ticker, exercice fiscal et Item
+    chunks, metadatas = split_10k_document(text, source, chunk_size=1000, chunk_overlap=100)
+    return {
+        "source": source,
+        "file_hash": file_hash or _file_hash(file_path),
+        "chunks": chunks,
+        "ids": make_chunk_ids(source, chunks),
+        "metadatas": metadatas,
+    }
+
+
+def iter_split_files(files: Iterable[Tuple[str, str, str]], split_workers: int = 0) -> Iterator[Dict[str, Any]]:
+    """
+    Découpe les fichiers (chemin, source, hash) un par un, ou dans un pool de `split_workers` process.
+    Au plus 2 x split_workers fichiers sont en cours à la fois : la mémoire reste bornée.
+    """
+    if split_workers <= 1:
+        for file_path, source, file_hash in files:
+            yield split_file(file_path, source, file_hash)
+        return
+
+    with ProcessPoolExecutor(max_workers=split_workers) as pool:
+        in_flight = deque()
+        for file_path, source, file_hash in files:
+            in_flight.append(pool.submit(split_file, file_path, source, file_hash))
+            if len(in_flight) >= 2 * split_workers:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+def _init_embedding_worker(threads_per_worker: int):
+    """
+    Initialisation d'un process d'embedding : le modèle est chargé une seule fois par worker.
+    Le nombre de threads torch est borné pour ne pas sur-souscrire les cœurs.
+    """
+    try:
+        import torch
+        torch.set_num_threads(threads_per_worker)
+    except ImportError:
+        pass
+    get_embedding_function()
+
+
+def _embed_texts(texts: List[str]) -> List[List[float]]:
+    return get_embedding_function().embed_documents(texts)
+
+
+class EmbeddingPool:
+    """
+    Pool de process d'embedding (CPU multi-cœurs, sans GPU) : chaque lot est découpé
+    en un shard par worker, et les vecteurs sont renvoyés dans l'ordre des textes.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+        # "spawn" : torch ne supporte pas bien le fork d'un process déjà multi-threadé
+        self._pool = multiprocessing.get_context("spawn").Pool(
+            processes=workers,
+            initializer=_init_embedding_worker,
+            initargs=(threads_per_worker,)
+        )
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        shard_size = max(1, -(-len(texts) // self.workers))
+        shards = [texts[i:i + shard_size] for i in range(0, len(texts), shard_size)]
+        vectors = []
+        # imap conserve l'ordre des shards
+        for shard_vectors in self._pool.imap(_embed_texts, shards):
+            vectors.extend(shard_vectors)
+        return vectors
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
+
+
+class _BatchWriter:
+    """
+    Accumule les chunks à écrire et les envoie à la base vectorielle par lots de `batch_size`
+    (embedding + écriture). Les chunks déjà présents ne sont pas ré-embeddés.
+    Les embeddings sont calculés dans le process courant, ou par les workers d'un
+    EmbeddingPool. L'index BM25 est mis à jour dans le même lot.
+    """
+
+    def __init__(self, store: VectorStore, batch_size: int, embedding_pool: Optional[EmbeddingPool] = None,
+                 bm25_index: Optional[BM25Index] = None):
+        self.store = store
+        self.bm25_index = bm25_index
+        self.batch_size = batch_size
+        self.embedding_pool = embedding_pool
+        self.pending: List[tuple] = []
+        self.chunks_written = 0
+        self.chunks_skipped = 0
+        self.embed_seconds = 0.0
+
+    def add(self, chunk_id: str, text: str, metadata: dict):
+        self.pending.append((chunk_id, text, metadata))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        ids = [chunk_id for chunk_id, _, _ in self.pending]
+        existing = set(self.store.get(ids=ids, include=[])["ids"])
+        new = [entry for entry in self.pending if entry[0] not in existing]
+        kept = [entry for entry in self.pending if entry[0] in existing]
+        if new:
+            texts = [text for _, text, _ in new]
+            start = time.perf_counter()
+            with span("embedding.embed", n_texts=len(texts), pooled=self.embedding_pool is not None):
+                if self.embedding_pool is not None:
+                    embeddings = self.embedding_pool.embed(texts)
+                else:
+                    embeddings = get_embedding_function().embed_documents(texts)
+            self.embed_seconds += time.perf_counter() - start
+            self.store.add(
+                ids=[chunk_id for chunk_id, _, _ in new],
+                embeddings=embeddings,
+                documents=texts,
+                metadatas=[metadata for _, _, metadata in new]
+            )
+            if self.bm25_index is not None:
+                self.bm25_index.add(
+                    [chunk_id for chunk_id, _, _ in new],
+                    [text for _, text, _ in new],
+                    [metadata for _, _, metadata in new]
+                )
+        if kept:
+            # Le rang du chunk a pu changer : mise à jour des métadonnées seulement (pas d'embedding)
+            self.store.update_metadata([e[0] for e in kept], [e[2] for e in kept])
+            if self.bm25_index is not None:
+                self.bm25_index.update_metadata([e[0] for e in kept], [e[2] for e in kept])
+        self.chunks_written += len(new)
+        self.chunks_skipped += len(kept)
+        self.pending = []
+
+
+def ingest_documents(paths: Iterable[str],
+                     batch_size: int = INGEST_BATCH_SIZE,
+                     split_workers: int = 0,
+                     embed_workers: int = INGEST_EMBED_WORKERS,
+                     progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """
+    Pipeline d'ingestion en flux : lecture -> découpage -> embedding par lots -> écriture.
+
+    - Mémoire bornée : un fichier découpé à la fois (ou une petite fenêtre avec le pool),
+      et au plus `batch_size` chunks en attente d'écriture.
+    - Reprise après crash : un fichier n'est inscrit au manifest qu'une fois tous ses chunks
+      écrits ; relancer l'ingestion saute les fichiers terminés et, grâce aux IDs
+      déterministes, ne ré-embedde pas les chunks déjà écrits d'un fichier interrompu.
+    - `embed_workers` > 0 : les embeddings sont calculés dans un pool de process
+      (voir EmbeddingPool) ; le modèle n'est alors pas chargé dans le process courant.
+    - `progress(stats)` est appelé après chaque fichier.
+    """
+    if not os.path.exists(CHROMA_PATH):
+        os.makedirs(CHROMA_PATH, exist_ok=True)
+        logger.info("Création du répertoire Chroma...")
+
+    embedding_pool = EmbeddingPool(embed_workers) if embed_workers > 0 else None
+    store = get_vector_store()
+    manifest = load_manifest()
+    bm25_index = get_bm25_index(BM25_INDEX_PATH)
+    writer = _BatchWriter(store, batch_size, embedding_pool, bm25_index)
+    stats = {
+        "files_indexed": 0, "files_unchanged": 0,
+        "chunks_added": 0, "chunks_kept": 0, "chunks_deleted": 0,
+        "elapsed_s": 0.0, "chunks_per_s": 0.0, "embed_chunks_per_s": 0.0,
+        "embed_workers": embed_workers,
+    }
+    start = time.perf_counter()
+
+    def files_to_index():
+        for fp, source in iter_source_files(paths):
+            # Hash calculé une seule fois : il sert au test d'inchangé puis au manifest
+            file_hash = _file_hash(fp)
+            previous = manifest.get(source)
+            # Fichier inchangé et déjà découpé avec le chunker courant : rien à faire
+            if previous and previous["file_hash"] == file_hash and previous.get("chunker") == CHUNKER_VERSION:
+                logger.info(f"{source} inchangé, rien à indexer.")
+                stats["files_unchanged"] += 1
+                continue
+            yield fp, source, file_hash
+
+    try:
+        for split in iter_split_files(files_to_index(), split_workers=split_workers):
+            source = split["source"]
+            for chunk_id, text, metadata in zip(split["ids"], split["chunks"], split["metadatas"]):
+                writer.add(chunk_id, text, metadata)
+            # Le fichier n'est terminé qu'une fois tous ses chunks écrits
+            writer.flush()
+
+            previous = manifest.get(source)
+            stale_ids = sorted(set(previous["chunk_ids"]) - set(split["ids"])) if previous else []
+            if stale_ids:
+                store.delete(stale_ids)
+                bm25_index.delete(stale_ids)
+
+            # Les chunks sont persistés avant l'inscription au manifest : après un crash,
+            # un fichier marqué terminé a bien tous ses chunks sur disque
+            store.persist()
+            manifest[source] = {
+                "file_hash": split["file_hash"],
+                "chunk_ids": split["ids"],
+                "chunker": CHUNKER_VERSION,
+                "ingested_at": time.time()
+            }
+            save_manifest(manifest)
+            _bump_collection_version()
+
+            elapsed = time.perf_counter() - start
+            stats.update({
+                "files_indexed": stats["files_indexed"] + 1,
+                "chunks_added": writer.chunks_written,
+                "chunks_kept": writer.chunks_skipped,
+                "chunks_deleted": stats["chunks_deleted"] + len(stale_ids),
+                "elapsed_s": round(elapsed, 2),
+                "chunks_per_s": round(writer.chunks_written / elapsed, 1) if elapsed else 0.0,
+                "embed_chunks_per_s": round(writer.chunks_written / writer.embed_seconds, 1) if writer.embed_seconds else 0.0,
+                "last_source": source,
+            })
+            if progress:
+                progress(dict(stats))
+    finally:
+        if embedding_pool is not None:
+            embedding_pool.close()
+
+    logger.info(
+        f"{stats['files_indexed']} fichier(s) indexé(s), {stats['files_unchanged']} inchangé(s). "
+        f"{stats['chunks_added']} chunks insérés, {stats['chunks_kept']} conservés, {stats['chunks_deleted']} supprimés."
+    )
+    return stats
+
+
+def rebuild_bm25_index(page_size: int = 5000) -> int:
+    """
+    Reconstruit l'index BM25 depuis la base vectorielle (index créé avant le retrieval
+    hybride, ou désynchronisé). Renvoie le nombre de chunks indexés.
+    """
+    if not os.path.exists(CHROMA_PATH):
+        return 0
+    collection = get_vector_store()
+    bm25_index = get_bm25_index(BM25_INDEX_PATH)
+    bm25_index.clear()
+    total = collection.count()
+    for offset in range(0, total, page_size):
+        page = collection.get(limit=page_size, offset=offset, include=["documents", "metadatas"])
+        bm25_index.add(page["ids"], page["documents"], page["metadatas"])
+    _bump_collection_version()
+    logger.info(f"Index BM25 reconstruit: {total} chunks.")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingestion en lots de documents .txt / .md dans la base vectorielle.")
+    parser.add_argument("paths", nargs="*", default=[DATA_PATH], help=f"Fichiers ou répertoires (défaut: {DATA_PATH})")
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE)
+    parser.add_argument("--split-workers", type=int, default=0, help="Process de découpage (0 = dans le process courant)")
+    parser.add_argument("--embed-workers", type=int, default=INGEST_EMBED_WORKERS,
+                        help="Process d'embedding, un modèle chargé par process (0 = dans le process courant)")
+    parser.add_argument("--rebuild-bm25", action="store_true",
+                        help="Reconstruit l'index BM25 depuis la base vectorielle, sans ré-ingérer")
+    args = parser.parse_args()
+
+    if args.rebuild_bm25:
+        print(f"{rebuild_bm25_index()} chunks indexés dans {BM25_INDEX_PATH}")
+        return
+
+    def print_progress(stats):
+        print(
+            f"[{stats['files_indexed']} fichiers] {stats['last_source']}: "
+            f"{stats['chunks_added']} chunks insérés ({stats['chunks_per_s']} chunks/s, "
+            f"embedding {stats['embed_chunks_per_s']} chunks/s)",
+            file=sys.stderr
+        )
+
+    stats = ingest_documents(
+        args.paths,
+        batch_size=args.batch_size,
+        split_workers=args.split_workers,
+        embed_workers=args.embed_workers,
+        progress=print_progress
+    )
+    print(stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+# core/llm_cache.py
+
+import json
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from config import LLM_CACHE_BACKEND, LLM_CACHE_PATH, LLM_CACHE_TTL, LLM_CACHE_MAX_SIZE
+from core.cache import LRUCache, SQLiteCache
+
+logger = logging.getLogger(__name__)
+
+_llm_caches: Dict[str, Any] = {}
+_llm_caches_lock = threading.Lock()
+
+
+def make_llm_cache_key(model: str, prompt: str, params: Optional[dict] = None) -> tuple:
+    """
+    Clé de cache d'une réponse LLM : (modèle, hash du prompt, hash des paramètres).
+    """
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    params_hash = hashlib.sha256(json.dumps(params or {}, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    return (model, prompt_hash, params_hash)
+
+
+def get_llm_cache(backend: str = LLM_CACHE_BACKEND):
+    """
+    Renvoie le cache de réponses LLM partagé par le process pour ce backend
+    ("memory" : LRU en mémoire, "sqlite" : persistant sur disque, "none" : pas de cache).
+    """
+    if backend == "none":
+        return None
+    with _llm_caches_lock:
+        if backend not in _llm_caches:
+            if backend == "memory":
+                _llm_caches[backend] = LRUCache(max_size=LLM_CACHE_MAX_SIZE, ttl=LLM_CACHE_TTL, name="llm_responses")
+            elif backend == "sqlite":
+                _llm_caches[backend] = SQLiteCache(LLM_CACHE_PATH, max_size=LLM_CACHE_MAX_SIZE, ttl=LLM_CACHE_TTL, name="llm_responses")
+            else:
+                raise ValueError(f"Backend de cache LLM inconnu: {backend}")
+            logger.info(f"Cache de réponses LLM initialisé (backend={backend}).")
+        return _llm_caches[backend]
@@ -1,5 +1,6 @@
 # core/multi_agentic_rag.py
 
+import asyncio
 import logging
 
 from agents.unstructured_data_agent import UnstructuredDataAgent
@@ -8,6 +9,10 @@ from agents.report_part2_agent import ReportPart2Agent
 from agents.report_part3_agent import ReportPart3Agent
 from agents.report_part4_agent import ReportPart4Agent
 from agents.report_part5_agent import ReportPart5Agent
+from core.edgar_direct_manager import EdgarDirectManager, get_filing_cache_stats
+from core.groq_clients import aclose_async_groq_clients
+from config import LLM_MAX_CONCURRENCY
+from core.report_scheduler import generate_full_report
 
 logger = logging.getLogger(__name__)
 
@@ -20,43 +25,55 @@ class MultiAgenticRAG:
         self.company_name = company_name.upper()
         self.status_placeholder = status_placeholder
 
-        # Unstructured agent (RAG)
-        self.unstructured_agent = UnstructuredDataAgent()
+        # Unstructured agent (RAG), restreint aux chunks de la société
+        self.unstructured_agent = UnstructuredDataAgent(company_name=self.company_name)
 
         # On laisse un context_dict vide ou minimal. 
         # (Certains agents l'ignorent s'ils sont en mode RAW.)
         self.context_dict = {}
 
+        # Un seul EdgarDirectManager pour les 5 agents (mode RAW) :
+        # le 10-K est récupéré et parsé une seule fois grâce au cache de filings.
+        self.edgar_manager = EdgarDirectManager(
+            ticker_symbol=self.company_name,
+            report_type="10-K"
+        )
+
         # Initialize report part agents
         self.report_part1_agent = ReportPart1Agent(
             llm=self.llm,
             unstructured_agent=self.unstructured_agent,
             company_name=self.company_name,
-            status_placeholder=self.status_placeholder
+            status_placeholder=self.status_placeholder,
+            edgar_manager=self.edgar_manager
         )
         self.report_part2_agent = ReportPart2Agent(
             llm=self.llm,
             unstructured_agent=self.unstructured_agent,
             company_name=self.company_name,
-            status_placeholder=self.status_placeholder
+            status_placeholder=self.status_placeholder,
+            edgar_manager=self.edgar_manager
         )
         self.report_part3_agent = ReportPart3Agent(
             llm=self.llm,
             unstructured_agent=self.unstructured_agent,
             company_name=self.company_name,
-            status_placeholder=self.status_placeholder
+            status_placeholder=self.status_placeholder,
+            edgar_manager=self.edgar_manager
         )
         self.report_part4_agent = ReportPart4Agent(
             llm=self.llm,
             unstructured_agent=self.unstructured_agent,
             company_name=self.company_name,
-            status_placeholder=self.status_placeholder
+            status_placeholder=self.status_placeholder,
+            edgar_manager=self.edgar_manager
         )
         self.report_part5_agent = ReportPart5Agent(
             llm=self.llm,
             unstructured_agent=self.unstructured_agent,
             company_name=self.company_name,
-            status_placeholder=self.status_placeholder
+            status_placeholder=self.status_placeholder,
+            edgar_manager=self.edgar_manager
         )
 
     def generate_report_part1(self, use_rag: bool):
@@ -88,3 +105,71 @@ class MultiAgenticRAG:
             use_rag=use_rag,
             context_dict=self.context_dict
         )
+
+    def stream_report_part(self, part_number: int, use_rag: bool):
+        """
+        Génère une partie (1 à 5) en streaming : renvoie les événements (field, texte, done)
+        au fur et à mesure des tokens reçus du LLM.
+        """
+        agent = self.get_report_agents()[part_number - 1]
+        return agent.stream_response(use_rag=use_rag, context_dict=self.context_dict)
+
+    def set_extraction_mode(self, mode: str):
+        """
+        "per_field" : un appel LLM par champ ; "multi_field" : un appel LLM par partie
+        (réponse JSON structurée, avec repli champ par champ si le parsing échoue).
+        """
+        for agent in self.get_report_agents():
+            agent.extraction_mode = mode
+
+    def get_report_agents(self) -> list:
+        """
+        Renvoie les agents des Parts I à V, dans l'ordre du rapport.
+        """
+        return [
+            self.report_part1_agent,
+            self.report_part2_agent,
+            self.report_part3_agent,
+            self.report_part4_agent,
+            self.report_part5_agent
+        ]
+
+    def generate_full_report(self, use_rag: bool, on_part_complete=None) -> dict:
+        """
+        Génère les Parts I à V en une seule passe planifiée (voir ReportScheduler) :
+        contextes dédupliqués, retrievals et appels LLM en parallèle sous une limite globale.
+        `on_part_complete(part_label, résultats)` est appelé dès qu'une partie est prête.
+        """
+        return generate_full_report(
+            self.get_report_agents(),
+            use_rag=use_rag,
+            on_part_complete=on_part_complete,
+            status_placeholder=self.status_placeholder
+        )
+
+    async def agenerate_full_report(self, use_rag: bool) -> dict:
+        """
+        Variante asynchrone de generate_full_report : les 5 parties tournent sur la même
+        boucle d'événements, avec au plus LLM_MAX_CONCURRENCY appels LLM en vol au total.
+        """
+        semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+        agents = self.get_report_agents()
+        try:
+            parts = await asyncio.gather(*[
+                agent.agenerate_response(use_rag=use_rag, context_dict=self.context_dict, semaphore=semaphore)
+                for agent in agents
+            ])
+        finally:
+            # Les pools httpx sont liés à la boucle : on les ferme avant qu'elle ne disparaisse
+            await aclose_async_groq_clients()
+        return {agent.part_label: part for agent, part in zip(agents, parts)}
+
+    def get_cache_stats(self) -> dict:
+        """
+        Renvoie les compteurs hit/miss des caches utilisés par le pipeline.
+        """
+        return {
+            "edgar": get_filing_cache_stats(),
+            "retrieval": self.unstructured_agent.get_cache_stats(),
+            "llm": self.llm.get_cache_stats() if hasattr(self.llm, "get_cache_stats") else {}
+        }
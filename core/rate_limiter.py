@@ -0,0 +1,196 @@
+# core/rate_limiter.py
+
+import time
+import random
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import groq
+from langchain_core.rate_limiters import BaseRateLimiter
+
+from config import (
+    GROQ_RATE_LIMITS,
+    GROQ_MAX_RETRIES,
+    GROQ_BACKOFF_BASE,
+    GROQ_BACKOFF_MAX,
+    GROQ_EXPECTED_COMPLETION_TOKENS
+)
+
+logger = logging.getLogger(__name__)
+
+# Erreurs Groq pour lesquelles un nouvel essai a du sens (429, réseau, timeouts, 5xx)
+RETRYABLE_ERRORS = (groq.RateLimitError, groq.APIConnectionError, groq.InternalServerError)
+
+
+class TokenBucket:
+    """
+    Token bucket thread-safe : `capacity` unités par minute, rechargées en continu.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self, amount: float) -> float:
+        """
+        Consomme `amount` unités si disponibles et renvoie 0,
+        sinon renvoie le temps d'attente estimé (en secondes) sans rien consommer.
+        Une demande plus grande que la capacité est ramenée à la capacité.
+        """
+        amount = min(float(amount), self.capacity)
+        with self._lock:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return 0.0
+            return (amount - self.tokens) / self.rate
+
+    def adjust(self, delta: float):
+        """
+        Corrige le solde après coup (delta > 0 : consommation réelle supérieure à l'estimation).
+        """
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - delta)
+
+    def acquire(self, amount: float):
+        while True:
+            wait = self.reserve(amount)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    async def aacquire(self, amount: float):
+        while True:
+            wait = self.reserve(amount)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+
+class ModelRateLimiter:
+    """
+    Limiteur client d'un modèle Groq : budget de requêtes/min et de tokens/min.
+    """
+
+    def __init__(self, model: str, requests_per_minute: float, tokens_per_minute: float):
+        self.model = model
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+    def acquire(self, estimated_tokens: int = 0):
+        self.requests.acquire(1)
+        if estimated_tokens:
+            self.tokens.acquire(estimated_tokens)
+
+    async def aacquire(self, estimated_tokens: int = 0):
+        await self.requests.aacquire(1)
+        if estimated_tokens:
+            await self.tokens.aacquire(estimated_tokens)
+
+    def record_usage(self, actual_tokens: Optional[int], estimated_tokens: int):
+        """
+        Réajuste le budget de tokens avec la consommation réelle renvoyée par l'API.
+        """
+        if actual_tokens is not None:
+            self.tokens.adjust(actual_tokens - estimated_tokens)
+
+
+_limiters: Dict[str, ModelRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(model: str) -> ModelRateLimiter:
+    """
+    Renvoie le limiteur partagé par tout le process pour ce modèle.
+    """
+    with _limiters_lock:
+        if model not in _limiters:
+            limits = GROQ_RATE_LIMITS.get(model, GROQ_RATE_LIMITS["default"])
+            _limiters[model] = ModelRateLimiter(model, limits["requests_per_minute"], limits["tokens_per_minute"])
+        return _limiters[model]
+
+
+def estimate_tokens(prompt: str, expected_completion_tokens: int = GROQ_EXPECTED_COMPLETION_TOKENS) -> int:
+    """
+    Estimation rapide (~4 caractères par token) du coût d'une requête.
+    """
+    return len(prompt) // 4 + 1 + expected_completion_tokens
+
+
+def _retry_delay(error: Exception, attempt: int) -> float:
+    """
+    Délai avant le prochain essai : l'en-tête Retry-After s'il est présent,
+    sinon un backoff exponentiel avec jitter complet.
+    """
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), GROQ_BACKOFF_MAX)
+        except ValueError:
+            pass
+    return random.uniform(0, min(GROQ_BACKOFF_MAX, GROQ_BACKOFF_BASE * (2 ** attempt)))
+
+
+def call_with_retry(func: Callable[[], Any], max_retries: int = GROQ_MAX_RETRIES) -> Any:
+    """
+    Appelle `func` et réessaie sur les erreurs Groq transitoires (429, réseau, 5xx).
+    L'exception est relevée une fois les essais épuisés.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return func()
+        except RETRYABLE_ERRORS as e:
+            if attempt == max_retries:
+                raise
+            delay = _retry_delay(e, attempt)
+            logger.warning(f"Appel Groq en échec ({type(e).__name__}), nouvel essai dans {delay:.1f}s")
+            time.sleep(delay)
+
+
+async def acall_with_retry(func: Callable[[], Awaitable[Any]], max_retries: int = GROQ_MAX_RETRIES) -> Any:
+    """
+    Variante asynchrone de call_with_retry.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return await func()
+        except RETRYABLE_ERRORS as e:
+            if attempt == max_retries:
+                raise
+            delay = _retry_delay(e, attempt)
+            logger.warning(f"Appel Groq en échec ({type(e).__name__}), nouvel essai dans {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+class GroqLangChainRateLimiter(BaseRateLimiter):
+    """
+    Adaptateur du limiteur partagé pour les modèles LangChain (ex. ChatGroq(rate_limiter=...)).
+    Seul le budget de requêtes est consommé : le prompt n'est pas connu à ce stade.
+    """
+
+    def __init__(self, model: str):
+        self.limiter = get_rate_limiter(model)
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        if blocking:
+            self.limiter.acquire()
+            return True
+        return self.limiter.requests.reserve(1) <= 0
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        if blocking:
+            await self.limiter.aacquire()
+            return True
+        return self.limiter.requests.reserve(1) <= 0
@@ -0,0 +1,181 @@
+# core/report_scheduler.py
+
+import queue
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from config import CONTEXT_MAX_CONCURRENCY, LLM_MAX_CONCURRENCY
+from core.tracing import run_in_context, span
+
+logger = logging.getLogger(__name__)
+
+
+class ReportScheduler:
+    """
+    Exécute toutes les subtasks des Parts I à V comme un seul DAG :
+
+        contexte (retrieval RAG ou Items RAW, dédupliqué) -> appel LLM -> agrégation par partie
+
+    - Les contextes identiques (même requête RAG, ou mêmes Items RAW) ne sont récupérés qu'une fois.
+    - Les retrievals et les appels LLM tournent dans deux pools séparés : la taille du pool LLM
+      est la limite globale d'appels LLM en vol, toutes parties confondues.
+    - Chaque partie est renvoyée dès que tous ses champs sont terminés.
+    """
+
+    def __init__(self, agents: List, context_workers: int = CONTEXT_MAX_CONCURRENCY,
+                 llm_workers: int = LLM_MAX_CONCURRENCY, default: str = "Not Available"):
+        self.agents = agents
+        self.context_workers = context_workers
+        self.llm_workers = llm_workers
+        self.default = default
+
+    def _prefetch_rag_contexts(self, tasks: List[tuple]) -> Dict[tuple, Future]:
+        """
+        Mode RAG : récupère les contextes de toutes les requêtes distinctes du rapport
+        en un seul appel batché (un forward d'embedding + une requête multi-vecteurs par filtre d'Items).
+        """
+        queries: Dict[tuple, tuple] = {}
+        for agent, field, query in tasks:
+            queries.setdefault(agent.context_key(field, query, True), (query, agent.retrieval_filter(field)))
+
+        keys = list(queries.keys())
+        futures: Dict[tuple, Future] = {key: Future() for key in keys}
+        try:
+            unstructured_agent = tasks[0][0].unstructured_agent
+            chunks_per_query = unstructured_agent.retrieve_many(
+                [queries[key][0] for key in keys],
+                [queries[key][1] for key in keys]
+            )
+            for key, chunks in zip(keys, chunks_per_query):
+                futures[key].set_result(" ".join(chunks))
+        except Exception as e:
+            logger.error(f"Retrieval batché en échec: {e}")
+            for future in futures.values():
+                if not future.done():
+                    future.set_exception(e)
+        return futures
+
+    def run(self, use_rag: bool) -> Iterator[Tuple[str, dict]]:
+        """
+        Génère le rapport complet et renvoie (part_label, résultats) au fil de l'eau,
+        dans l'ordre de complétion des parties.
+        """
+        # Les parties en mode multi-champs sont un seul appel LLM : elles sont planifiées d'un bloc
+        multi_field_agents = [agent for agent in self.agents if agent.extraction_mode == "multi_field"]
+        # (agent, field, query) pour chaque subtask des autres parties
+        tasks = [
+            (agent, field, query)
+            for agent in self.agents if agent not in multi_field_agents
+            for field, query in agent.get_subtasks().items()
+        ]
+        total_fields = len(tasks) + sum(len(agent.get_subtasks()) for agent in multi_field_agents)
+        if not total_fields:
+            return
+
+        done_queue: "queue.Queue[Tuple[object, str, str]]" = queue.Queue()
+        contexts: Dict[tuple, Future] = self._prefetch_rag_contexts(tasks) if use_rag and tasks else {}
+        contexts_lock = threading.Lock()
+
+        # Positionné quand le consommateur arrête l'itération : plus rien n'est planifié
+        closing = threading.Event()
+
+        with ThreadPoolExecutor(max_workers=self.context_workers) as context_pool, \
+                ThreadPoolExecutor(max_workers=self.llm_workers) as llm_pool:
+
+            def run_llm(agent, field, context_future):
+                try:
+                    value = agent.answer(field, context_future.result())
+                except Exception as e:
+                    logger.error(f"{agent.name}: échec pour '{field}': {e}")
+                    value = self.default
+                done_queue.put((agent, field, value))
+
+            def submit_llm(traced_llm, agent, field, context_future):
+                if closing.is_set() or context_future.cancelled():
+                    return
+                try:
+                    llm_pool.submit(traced_llm, agent, field, context_future)
+                except RuntimeError:
+                    # Pool fermé entre-temps (itération interrompue)
+                    logger.debug(f"{agent.name}: '{field}' non planifié, scheduler arrêté.")
+
+            def schedule_field(agent, field, query):
+                key = agent.context_key(field, query, use_rag)
+                with contexts_lock:
+                    context_future = contexts.get(key)
+                    if context_future is None:
+                        context_future = context_pool.submit(run_in_context(agent.get_context), field, query, use_rag)
+                        contexts[key] = context_future
+                # L'appel LLM n'est planifié qu'une fois son contexte disponible,
+                # pour ne pas occuper un slot LLM en attendant le retrieval.
+                # Le contexte de trace est capturé ici : le callback s'exécute dans le thread du retrieval.
+                context_future.add_done_callback(
+                    lambda f, agent=agent, field=field, traced_llm=run_in_context(run_llm):
+                        submit_llm(traced_llm, agent, field, f)
+                )
+
+            def run_part(agent):
+                try:
+                    valid, invalid = agent.extract_multi_field(use_rag)
+                except Exception as e:
+                    logger.error(f"{agent.name}: échec de l'extraction multi-champs: {e}")
+                    valid, invalid = {}, list(agent.get_subtasks())
+                for field, value in valid.items():
+                    done_queue.put((agent, field, value))
+                # Repli champ par champ via les pools partagés : la limite globale d'appels LLM s'applique
+                subtasks = agent.get_subtasks()
+                for field in invalid:
+                    if closing.is_set():
+                        return
+                    try:
+                        schedule_field(agent, field, subtasks[field])
+                    except RuntimeError:
+                        return
+
+            for agent in multi_field_agents:
+                llm_pool.submit(run_in_context(run_part), agent)
+
+            for agent, field, query in tasks:
+                schedule_field(agent, field, query)
+
+            logger.info(f"Rapport complet: {len(tasks)} subtasks, {len(contexts)} contextes distincts.")
+
+            pending = {agent.part_label: len(agent.get_subtasks()) for agent in self.agents}
+            partial: Dict[str, dict] = {agent.part_label: {} for agent in self.agents}
+            try:
+                for _ in range(total_fields):
+                    agent, field, value = done_queue.get()
+                    partial[agent.part_label][field] = value
+                    pending[agent.part_label] -= 1
+                    if pending[agent.part_label] == 0:
+                        ordered = {f: partial[agent.part_label][f] for f in agent.get_subtasks()}
+                        yield agent.part_label, ordered
+            finally:
+                # Arrêt anticipé (exception chez le consommateur, rerun Streamlit) : on annule ce qui
+                # n'a pas démarré, et les callbacks encore en attente ne planifient plus rien.
+                closing.set()
+                with contexts_lock:
+                    for context_future in contexts.values():
+                        context_future.cancel()
+                context_pool.shutdown(wait=False, cancel_futures=True)
+                llm_pool.shutdown(wait=False, cancel_futures=True)
+
+def generate_full_report(agents: List, use_rag: bool,
+                         on_part_complete: Optional[Callable[[str, dict], None]] = None,
+                         status_placeholder=None) -> Dict[str, dict]:
+    """
+    Lance le scheduler et renvoie {part_label: résultats} dans l'ordre des agents.
+    `on_part_complete(part_label, résultats)` est appelé dans le thread appelant
+    dès qu'une partie est terminée.
+    """
+    results = {}
+    with span("report.full", use_rag=use_rag, parts=len(agents)):
+        for part_label, part_results in ReportScheduler(agents).run(use_rag):
+            results[part_label] = part_results
+            if status_placeholder:
+                status_placeholder.info(f"Full report: {part_label} completed ({len(results)}/{len(agents)}).")
+            if on_part_complete:
+                on_part_complete(part_label, part_results)
+    return {agent.part_label: results[agent.part_label] for agent in agents if agent.part_label in results}
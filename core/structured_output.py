@@ -0,0 +1,44 @@
+# core/structured_output.py
+
+import re
+import json
+from typing import Dict, List, Tuple
+
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+
+
+def extract_json_object(text: str) -> dict:
+    """
+    Extrait le premier objet JSON d'une réponse LLM (bloc ```json``` ou texte brut).
+    Lève ValueError si aucun objet JSON valide n'est trouvé.
+    """
+    fenced = _FENCE_RE.search(text)
+    candidate = fenced.group(1) if fenced else text
+    start, end = candidate.find("{"), candidate.rfind("}")
+    if start == -1 or end <= start:
+        raise ValueError("Aucun objet JSON dans la réponse.")
+    data = json.loads(candidate[start:end + 1])
+    if not isinstance(data, dict):
+        raise ValueError("La réponse JSON n'est pas un objet.")
+    return data
+
+
+def validate_fields(data: dict, fields: List[str]) -> Tuple[Dict[str, str], List[str]]:
+    """
+    Valide un objet JSON contre le schéma attendu : une valeur texte non vide par champ.
+    Les nombres sont acceptés et convertis en texte.
+    Renvoie (champs valides, champs manquants ou invalides).
+    """
+    valid: Dict[str, str] = {}
+    invalid: List[str] = []
+    for field in fields:
+        value = data.get(field)
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            invalid.append(field)
+            continue
+        value = str(value).strip()
+        if not value:
+            invalid.append(field)
+            continue
+        valid[field] = value
+    return valid, invalid
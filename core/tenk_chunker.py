@@ -0,0 +1,70 @@
+# core/tenk_chunker.py
+
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from core.tenk_sections import find_item_spans
+
+# Change à chaque évolution du découpage : les fichiers indexés avec une autre version sont ré-ingérés
+CHUNKER_VERSION = "10k-items-v1"
+
+# Page de garde : "For the fiscal year ended September 30, 2023"
+_FISCAL_YEAR_RE = re.compile(r"fiscal\s+year\s+ended\s+[A-Za-z]+\s+\d{1,2},\s+(\d{4})", re.IGNORECASE)
+# Page de garde : "... par value per share AAPL The Nasdaq Stock Market LLC"
+_TICKER_RE = re.compile(r"\b([A-Z]{1,5}(?:\.[A-Z])?)\s+(?:The\s+)?(?:Nasdaq|New York Stock Exchange|NYSE)\b")
+_COVER_ITEM = "Cover"
+
+
+def detect_filing_metadata(text: str, source: str) -> Dict[str, Any]:
+    """
+    Repère le ticker et l'exercice fiscal d'un 10-K depuis sa page de garde.
+    À défaut, le ticker est déduit du nom de fichier (ex. "aapl.txt" -> "AAPL").
+    Les valeurs introuvables sont omises (Chroma n'accepte pas les métadonnées None).
+    """
+    metadata: Dict[str, Any] = {}
+    cover = text[:20000]
+
+    ticker_match = _TICKER_RE.search(cover)
+    stem = os.path.splitext(os.path.basename(source))[0]
+    if ticker_match:
+        metadata["ticker"] = ticker_match.group(1)
+    elif stem.isalpha() and len(stem) <= 5:
+        metadata["ticker"] = stem.upper()
+
+    year_match = _FISCAL_YEAR_RE.search(cover)
+    if year_match:
+        metadata["fiscal_year"] = int(year_match.group(1))
+    return metadata
+
+
+def split_10k_document(text: str, source: str, chunk_size: int = 1000,
+                       chunk_overlap: int = 100) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """
+    Découpe un document en chunks sans jamais chevaucher deux Items du 10-K,
+    et renvoie (chunks, métadonnées). Chaque chunk est tagué avec sa source, son rang,
+    le ticker, l'exercice fiscal et l'Item ("Cover" avant le premier Item).
+    Un document sans Item reconnu est découpé comme un texte quelconque, sans tag "item".
+    """
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    filing_metadata = detect_filing_metadata(text, source)
+
+    spans = find_item_spans(text)
+    sections: List[Tuple[Optional[str], str]]
+    if spans:
+        sections = [(_COVER_ITEM, text[:spans[0][1]])] + [(label, text[start:end]) for label, start, end in spans]
+    else:
+        sections = [(None, text)]
+
+    chunks: List[str] = []
+    metadatas: List[Dict[str, Any]] = []
+    for item, section_text in sections:
+        for chunk in splitter.split_text(section_text):
+            metadata = {"source": source, "chunk_index": len(chunks), **filing_metadata}
+            if item:
+                metadata["item"] = item
+            chunks.append(chunk)
+            metadatas.append(metadata)
+    return chunks, metadatas
@@ -0,0 +1,70 @@
+# core/tenk_sections.py
+
+import re
+from typing import Dict, List, Tuple
+
+# Liste canonique des Items d'un 10-K, dans l'ordre du document
+TENK_ITEMS = [
+    "Item 1", "Item 1A", "Item 1B", "Item 1C", "Item 2", "Item 3", "Item 4",
+    "Item 5", "Item 6", "Item 7", "Item 7A", "Item 8",
+    "Item 9", "Item 9A", "Item 9B", "Item 9C",
+    "Item 10", "Item 11", "Item 12", "Item 13", "Item 14",
+    "Item 15", "Item 16",
+]
+
+# Titre d'Item en début de ligne : "Item 1A.  Risk Factors"
+_ITEM_HEADING_RE = re.compile(r"^[ \t]*item[ \t]+(\d{1,2}[a-c]?)\.(.*)$", re.IGNORECASE | re.MULTILINE)
+# Entrée de table des matières : le titre se termine par un numéro de page
+_TOC_ENTRY_RE = re.compile(r"\s\d{1,3}\s*$")
+
+
+def normalize_item_label(raw_number: str) -> str:
+    """
+    "1a" -> "Item 1A"
+    """
+    return f"Item {raw_number.upper()}"
+
+
+def find_item_spans(text: str) -> List[Tuple[str, int, int]]:
+    """
+    Repère les sections "Item X" d'un 10-K en texte brut et renvoie
+    une liste (label, début, fin) d'offsets de caractères, dans l'ordre du document.
+
+    Les entrées de la table des matières sont ignorées : pour chaque Item on garde
+    l'occurrence dont la section est la plus longue, puis on ne conserve que les
+    titres qui respectent l'ordre canonique des Items.
+    """
+    matches = list(_ITEM_HEADING_RE.finditer(text))
+    candidates: Dict[str, Tuple[int, int]] = {}
+    for i, match in enumerate(matches):
+        if _TOC_ENTRY_RE.search(match.group(2)):
+            continue
+        label = normalize_item_label(match.group(1))
+        if label not in TENK_ITEMS:
+            continue
+        start = match.start()
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        best = candidates.get(label)
+        if best is None or (end - start) > (best[1] - best[0]):
+            candidates[label] = (start, end)
+
+    # On garde uniquement les titres dans l'ordre canonique (élimine les renvois isolés)
+    starts = []
+    last_start = -1
+    for label in TENK_ITEMS:
+        if label in candidates and candidates[label][0] > last_start:
+            last_start = candidates[label][0]
+            starts.append((label, last_start))
+
+    spans = []
+    for i, (label, start) in enumerate(starts):
+        end = starts[i + 1][1] if i + 1 < len(starts) else len(text)
+        spans.append((label, start, end))
+    return spans
+
+
+def split_10k_items(text: str) -> Dict[str, str]:
+    """
+    Découpe un 10-K en texte brut en un dict {"Item 1": "...", "Item 1A": "...", ...}.
+    """
+    return {label: text[start:end].strip() for label, start, end in find_item_spans(text)}
@@ -0,0 +1,255 @@
+# core/tracing.py
+
+import os
+import json
+import time
+import atexit
+import uuid
+import logging
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from config import (
+    TRACING_ENABLED,
+    TRACE_EXPORT_PATH,
+    TRACE_MAX_BYTES,
+    TRACE_BACKUP_COUNT,
+    TRACE_FLUSH_EVERY,
+    TRACE_BUFFER_SIZE,
+    METRICS_HOST
+)
+
+logger = logging.getLogger(__name__)
+
+# Span courant : propagé dans les threads via run_in_context (les pools ne copient pas le contexte)
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+# Bornes des histogrammes Prometheus (secondes)
+LATENCY_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Span:
+    """
+    Intervalle chronométré d'une étape (ex. "llm.call"), rattaché à une trace :
+    toutes les étapes d'une génération de rapport partagent le même trace_id.
+    """
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start", "duration_s", "attributes", "error", "thread")
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.start = time.time()
+        self.duration_s: Optional[float] = None
+        self.attributes = dict(attributes)
+        self.error: Optional[str] = None
+        self.thread = threading.current_thread().name
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+class _NoopSpan:
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class SpanCollector:
+    """
+    Reçoit les spans terminés : export JSON-lines, tampon des spans récents
+    (panneau Streamlit) et métriques agrégées au format Prometheus.
+    L'export est écrit par lots (tous les `flush_every` spans, et à la fin de chaque
+    trace) hors du verrou des métriques, avec rotation au-delà de `max_bytes`.
+    """
+
+    def __init__(self, export_path: Optional[str] = TRACE_EXPORT_PATH, buffer_size: int = TRACE_BUFFER_SIZE,
+                 max_bytes: int = TRACE_MAX_BYTES, backup_count: int = TRACE_BACKUP_COUNT,
+                 flush_every: int = TRACE_FLUSH_EVERY):
+        self.export_path = export_path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_every = flush_every
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()
+        self._pending: List[Dict[str, Any]] = []
+        self.recent: "deque[Dict[str, Any]]" = deque(maxlen=buffer_size)
+        # span name -> {"count", "errors", "sum", "buckets"}
+        self.latency: Dict[str, Dict[str, Any]] = {}
+        # (nom de compteur, modèle) -> total
+        self.counters: Dict[tuple, float] = {}
+
+    def _rotate(self):
+        for i in range(self.backup_count - 1, 0, -1):
+            if os.path.exists(f"{self.export_path}.{i}"):
+                os.replace(f"{self.export_path}.{i}", f"{self.export_path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.export_path, f"{self.export_path}.1")
+        else:
+            os.remove(self.export_path)
+
+    def flush(self):
+        """
+        Écrit les spans en attente dans le fichier d'export (créé au premier export).
+        """
+        with self._lock:
+            records, self._pending = self._pending, []
+        if not records or not self.export_path:
+            return
+        lines = "".join(json.dumps(record, default=str) + "\n" for record in records)
+        with self._file_lock:
+            try:
+                os.makedirs(os.path.dirname(self.export_path) or ".", exist_ok=True)
+                if os.path.exists(self.export_path) and os.path.getsize(self.export_path) >= self.max_bytes:
+                    self._rotate()
+                with open(self.export_path, "a", encoding="utf-8") as f:
+                    f.write(lines)
+            except OSError as e:
+                logger.warning(f"Export des spans impossible ({self.export_path}): {e}")
+
+    def export(self, span: Span):
+        record = span.to_dict()
+        with self._lock:
+            self.recent.append(record)
+            stats = self.latency.setdefault(
+                span.name, {"count": 0, "errors": 0, "sum": 0.0, "buckets": [0] * len(LATENCY_BUCKETS)}
+            )
+            stats["count"] += 1
+            stats["sum"] += span.duration_s
+            stats["errors"] += 1 if span.error else 0
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if span.duration_s <= bound:
+                    stats["buckets"][i] += 1
+            for key in ("prompt_tokens", "completion_tokens"):
+                if isinstance(span.attributes.get(key), int):
+                    counter = (f"llm_{key}_total", span.attributes.get("model", ""))
+                    self.counters[counter] = self.counters.get(counter, 0) + span.attributes[key]
+            if self.export_path:
+                self._pending.append(record)
+            flush = len(self._pending) >= self.flush_every or span.parent_id is None
+        if flush:
+            self.flush()
+
+    def get_traces(self, root_prefix: str = "report.") -> List[Dict[str, Any]]:
+        """
+        Traces récentes dont le span racine commence par `root_prefix`, de la plus récente à la plus ancienne.
+        """
+        with self._lock:
+            roots = [s for s in self.recent if s["parent_id"] is None and s["name"].startswith(root_prefix)]
+        return sorted(roots, key=lambda s: s["start"], reverse=True)
+
+    def get_trace_spans(self, trace_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return sorted((s for s in self.recent if s["trace_id"] == trace_id), key=lambda s: s["start"])
+
+    def render_prometheus(self) -> str:
+        """
+        Métriques au format texte Prometheus : histogramme de latence par span, compteurs de tokens LLM.
+        """
+        lines = [
+            "# HELP agentic_rag_span_duration_seconds Duration of traced hot-path spans.",
+            "# TYPE agentic_rag_span_duration_seconds histogram",
+        ]
+        with self._lock:
+            for name, stats in sorted(self.latency.items()):
+                for bound, count in zip(LATENCY_BUCKETS, stats["buckets"]):
+                    lines.append(f'agentic_rag_span_duration_seconds_bucket{{span="{name}",le="{bound}"}} {count}')
+                lines.append(f'agentic_rag_span_duration_seconds_bucket{{span="{name}",le="+Inf"}} {stats["count"]}')
+                lines.append(f'agentic_rag_span_duration_seconds_sum{{span="{name}"}} {stats["sum"]:.6f}')
+                lines.append(f'agentic_rag_span_duration_seconds_count{{span="{name}"}} {stats["count"]}')
+            lines.append("# TYPE agentic_rag_span_errors_total counter")
+            for name, stats in sorted(self.latency.items()):
+                lines.append(f'agentic_rag_span_errors_total{{span="{name}"}} {stats["errors"]}')
+            for (counter, model), value in sorted(self.counters.items()):
+                lines.append(f"# TYPE agentic_rag_{counter} counter")
+                lines.append(f'agentic_rag_{counter}{{model="{model}"}} {int(value)}')
+        return "\n".join(lines) + "\n"
+
+
+_collector = SpanCollector()
+atexit.register(_collector.flush)
+
+
+def get_span_collector() -> SpanCollector:
+    return _collector
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Any]:
+    """
+    Chronomètre un bloc : `with span("retrieval.search", n_queries=3) as s: ... s.set_attribute(...)`.
+    Sans span parent dans le contexte courant, une nouvelle trace est ouverte.
+    """
+    if not TRACING_ENABLED:
+        yield _NOOP_SPAN
+        return
+    current = Span(name, _current_span.get(), attributes)
+    token = _current_span.set(current)
+    start = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.duration_s = time.perf_counter() - start
+        _current_span.reset(token)
+        _collector.export(current)
+
+
+def current_trace_id() -> Optional[str]:
+    current = _current_span.get()
+    return current.trace_id if current else None
+
+
+def run_in_context(func: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Capture le contexte courant (span parent) pour exécuter `func` dans un autre thread
+    sous la même trace : executor.submit(run_in_context(func), ...).
+    """
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(func, *args, **kwargs)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") not in ("", "/metrics"):
+            self.send_error(404)
+            return
+        body = _collector.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int, host: str = METRICS_HOST) -> Optional[ThreadingHTTPServer]:
+    """
+    Sert les métriques Prometheus sur http://<host>:<port>/metrics dans un thread démon.
+    Désactivé si `port` vaut 0 ; `host` vaut 127.0.0.1 par défaut (accès local uniquement).
+    """
+    if not port:
+        return None
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        logger.warning(f"Endpoint de métriques indisponible sur {host}:{port}: {e}")
+        return None
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info(f"Métriques Prometheus exposées sur {host}:{port} (/metrics)")
+    return server
@@ -0,0 +1,530 @@
+# core/vector_store.py
+
+import os
+import glob
+import json
+import logging
+import sqlite3
+import argparse
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import (
+    CHROMA_PATH,
+    VECTOR_STORE_BACKEND,
+    QUANTIZED_STORE_PATH,
+    QUANTIZED_STORE_DTYPE,
+    QUANTIZED_STORE_DIM,
+    QUANTIZED_STORE_NPROBE
+)
+from core.bm25 import where_to_sql
+from core.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class VectorStore(ABC):
+    """
+    Interface commune des bases vectorielles (Chroma, store quantifié).
+    Les embeddings sont calculés par l'appelant ; `where` suit le format de filtre Chroma
+    (égalité, "$in", "$and"), et `get` renvoie un dict {"ids", "documents", "metadatas"}.
+    """
+
+    @abstractmethod
+    def count(self) -> int:
+        pass
+
+    @abstractmethod
+    def add(self, ids: List[str], embeddings: List[List[float]], documents: List[str], metadatas: List[dict]):
+        pass
+
+    @abstractmethod
+    def update_metadata(self, ids: List[str], metadatas: List[dict]):
+        pass
+
+    @abstractmethod
+    def delete(self, ids: List[str]):
+        pass
+
+    @abstractmethod
+    def get(self, ids: Optional[List[str]] = None, where: Optional[dict] = None, limit: Optional[int] = None,
+            offset: int = 0, include: Sequence[str] = ("documents", "metadatas")) -> Dict[str, list]:
+        pass
+
+    @abstractmethod
+    def query(self, query_embeddings: List[List[float]], n_results: int,
+              where: Optional[dict] = None) -> List[List[str]]:
+        """
+        Renvoie, pour chaque vecteur requête, les IDs des `n_results` plus proches voisins.
+        """
+        pass
+
+    def persist(self):
+        pass
+
+    def clear_caches(self):
+        """
+        Vide les caches en mémoire du store (les données ne sont pas touchées).
+        """
+        pass
+
+    def close(self):
+        pass
+
+
+class ChromaVectorStore(VectorStore):
+    """
+    Backend Chroma (par défaut) : fine enveloppe autour de la collection LangChain.
+    """
+
+    def __init__(self, persist_directory: str = CHROMA_PATH):
+        from langchain.vectorstores import Chroma
+
+        self.db = Chroma(persist_directory=persist_directory, embedding_function=None)
+        self.collection = self.db._collection
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def add(self, ids, embeddings, documents, metadatas):
+        self.collection.add(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+
+    def update_metadata(self, ids, metadatas):
+        self.collection.update(ids=ids, metadatas=metadatas)
+
+    def delete(self, ids):
+        self.collection.delete(ids=ids)
+
+    def get(self, ids=None, where=None, limit=None, offset=0, include=("documents", "metadatas")):
+        return self.collection.get(ids=ids, where=where, limit=limit, offset=offset or None, include=list(include))
+
+    def query(self, query_embeddings, n_results, where=None):
+        count = self.count()
+        if count == 0:
+            return [[] for _ in query_embeddings]
+        results = self.collection.query(
+            query_embeddings=query_embeddings,
+            n_results=min(n_results, count),
+            where=where,
+            include=[]
+        )
+        return [list(ids) for ids in results["ids"]]
+
+    def persist(self):
+        self.db.persist()
+
+    def close(self):
+        # chromadb garde un client par répertoire : sans cela, une base recréée au
+        # même chemin réutiliserait le client de la base supprimée
+        try:
+            from chromadb.api.client import SharedSystemClient
+            SharedSystemClient.clear_system_cache()
+        except (ImportError, AttributeError):
+            pass
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class QuantizedVectorStore(VectorStore):
+    """
+    Store vectoriel compact : vecteurs normalisés stockés en float16 ou int8
+    (échelle par ligne), éventuellement tronqués à `dim` dimensions, dans des segments
+    NumPy lus en mmap. Textes, métadonnées et position des vecteurs sont dans SQLite.
+
+    La recherche (similarité cosinus) est exacte par défaut ; après build_ivf(),
+    seules les `nprobe` listes IVF les plus proches de la requête sont parcourues.
+    Une suppression ne retire que la ligne SQLite ; compact() réécrit les segments.
+    """
+
+    MAX_SEGMENTS = 32
+    SEARCH_BLOCK_ROWS = 4096
+    METADATA_COLUMNS = ("source", "ticker", "fiscal_year", "item")
+
+    def __init__(self, path: str = QUANTIZED_STORE_PATH, dtype: str = QUANTIZED_STORE_DTYPE,
+                 dim: Optional[int] = QUANTIZED_STORE_DIM, nprobe: int = QUANTIZED_STORE_NPROBE):
+        self.path = path
+        self.nprobe = nprobe
+        self._lock = threading.RLock()
+        os.makedirs(path, exist_ok=True)
+
+        # Le format d'un store existant l'emporte sur les paramètres demandés
+        config_path = os.path.join(path, "config.json")
+        if os.path.isfile(config_path):
+            with open(config_path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            if (stored["dtype"], stored["dim"]) != (dtype, dim):
+                logger.warning(f"Store {path} existant en {stored['dtype']}/{stored['dim']}: paramètres ignorés.")
+            dtype, dim = stored["dtype"], stored["dim"]
+        else:
+            with open(config_path, "w", encoding="utf-8") as f:
+                json.dump({"dtype": dtype, "dim": dim}, f)
+        if dtype not in ("float32", "float16", "int8"):
+            raise ValueError(f"Type de quantification non supporté: {dtype}")
+        self.dtype = dtype
+        self.dim = dim
+
+        self._conn = sqlite3.connect(os.path.join(path, "index.sqlite"), check_same_thread=False)
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS rows ("
+            "id TEXT PRIMARY KEY, segment INTEGER NOT NULL, offset INTEGER NOT NULL, list_id INTEGER, "
+            "document TEXT, metadata TEXT, source TEXT, ticker TEXT, fiscal_year INTEGER, item TEXT);"
+            "CREATE INDEX IF NOT EXISTS rows_list ON rows (list_id);"
+        )
+        self._conn.commit()
+
+        self._segments: Dict[int, Tuple[np.ndarray, Optional[np.ndarray]]] = {}
+        self._centroids = self._load_centroids()
+        # Candidats (segment, offset, id) par filtre, invalidés à chaque écriture
+        self._generation = 0
+        self._candidates_cache = LRUCache(64, name="quantized_candidates")
+
+    # --- stockage -------------------------------------------------------
+
+    def _segment_path(self, segment: int, suffix: str = "") -> str:
+        return os.path.join(self.path, f"seg_{segment:05d}{suffix}.npy")
+
+    def _segment_ids(self) -> List[int]:
+        paths = glob.glob(os.path.join(self.path, "seg_*[0-9].npy"))
+        return sorted(int(os.path.basename(p)[4:9]) for p in paths)
+
+    def _load_segment(self, segment: int) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        if segment not in self._segments:
+            vectors = np.load(self._segment_path(segment), mmap_mode="r")
+            scales = np.load(self._segment_path(segment, "_scales"), mmap_mode="r") if self.dtype == "int8" else None
+            self._segments[segment] = (vectors, scales)
+        return self._segments[segment]
+
+    def _load_centroids(self) -> Optional[np.ndarray]:
+        path = os.path.join(self.path, "centroids.npy")
+        return np.load(path) if os.path.isfile(path) else None
+
+    def _quantize(self, vectors: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        if self.dim:
+            vectors = vectors[:, :self.dim]
+        vectors = _normalize(vectors.astype(np.float32))
+        if self.dtype == "int8":
+            scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127.0
+            return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+        return vectors.astype(self.dtype), None
+
+    def _dequantize(self, vectors: np.ndarray, scales: Optional[np.ndarray]) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if scales is not None:
+            vectors = vectors * np.asarray(scales, dtype=np.float32)[:, None]
+        return vectors
+
+    def _prepare_queries(self, query_embeddings: List[List[float]]) -> np.ndarray:
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        if self.dim:
+            queries = queries[:, :self.dim]
+        return _normalize(queries)
+
+    def _assign_lists(self, vectors: np.ndarray) -> List[Optional[int]]:
+        if self._centroids is None:
+            return [None] * len(vectors)
+        return [int(i) for i in np.argmax(vectors @ self._centroids.T, axis=1)]
+
+    def _metadata_row(self, metadata: Optional[dict]) -> list:
+        metadata = metadata or {}
+        return [json.dumps(metadata)] + [metadata.get(column) for column in self.METADATA_COLUMNS]
+
+    def _touch(self):
+        self._generation += 1
+
+    def memory_bytes(self) -> int:
+        """
+        Taille des vecteurs sur disque (et en RAM une fois les pages chargées).
+        """
+        return sum(os.path.getsize(p) for p in glob.glob(os.path.join(self.path, "seg_*.npy")))
+
+    # --- VectorStore ----------------------------------------------------
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM rows").fetchone()[0]
+
+    def add(self, ids, embeddings, documents, metadatas):
+        if not ids:
+            return
+        vectors, scales = self._quantize(np.asarray(embeddings, dtype=np.float32))
+        with self._lock:
+            segment = (self._segment_ids() or [-1])[-1] + 1
+            if scales is not None:
+                np.save(self._segment_path(segment, "_scales"), scales)
+            np.save(self._segment_path(segment), vectors)
+            lists = self._assign_lists(self._dequantize(vectors, scales))
+            self._conn.executemany("DELETE FROM rows WHERE id = ?", [(doc_id,) for doc_id in ids])
+            self._conn.executemany(
+                "INSERT INTO rows (id, segment, offset, list_id, document, metadata, source, ticker, fiscal_year, item) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    [doc_id, segment, offset, list_id, document] + self._metadata_row(metadata)
+                    for offset, (doc_id, document, metadata, list_id) in enumerate(zip(ids, documents, metadatas, lists))
+                ]
+            )
+            self._conn.commit()
+            self._touch()
+
+    def update_metadata(self, ids, metadatas):
+        with self._lock:
+            self._conn.executemany(
+                f"UPDATE rows SET metadata = ?, {', '.join(f'{c} = ?' for c in self.METADATA_COLUMNS)} WHERE id = ?",
+                [self._metadata_row(metadata) + [doc_id] for doc_id, metadata in zip(ids, metadatas)]
+            )
+            self._conn.commit()
+            self._touch()
+
+    def delete(self, ids):
+        with self._lock:
+            self._conn.executemany("DELETE FROM rows WHERE id = ?", [(doc_id,) for doc_id in ids])
+            self._conn.commit()
+            self._touch()
+
+    def get(self, ids=None, where=None, limit=None, offset=0, include=("documents", "metadatas")):
+        clause, params = where_to_sql(where, self.METADATA_COLUMNS)
+        sql = f"SELECT id, document, metadata FROM rows WHERE {clause}"
+        if ids is not None:
+            if not ids:
+                return {"ids": [], "documents": [], "metadatas": []}
+            sql += f" AND id IN ({', '.join('?' * len(ids))})"
+            params = params + list(ids)
+        sql += " ORDER BY rowid"
+        if limit is not None or offset:
+            sql += " LIMIT ? OFFSET ?"
+            params = params + [limit if limit is not None else -1, offset or 0]
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        result = {"ids": [row[0] for row in rows]}
+        if "documents" in include:
+            result["documents"] = [row[1] for row in rows]
+        if "metadatas" in include:
+            result["metadatas"] = [json.loads(row[2]) for row in rows]
+        return result
+
+    def _candidates(self, where: Optional[dict], lists: Optional[Tuple[int, ...]]):
+        """
+        Lignes vivantes qui satisfont le filtre (et appartiennent aux listes IVF sondées),
+        groupées par segment : {segment: (offsets, ids)}.
+        """
+        def load():
+            clause, params = where_to_sql(where, self.METADATA_COLUMNS)
+            if lists is not None:
+                clause += f" AND list_id IN ({', '.join('?' * len(lists))})"
+                params = params + list(lists)
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT segment, offset, id FROM rows WHERE {clause} ORDER BY segment, offset", params
+                ).fetchall()
+            grouped: Dict[int, Tuple[list, list]] = {}
+            for segment, offset, doc_id in rows:
+                offsets, doc_ids = grouped.setdefault(segment, ([], []))
+                offsets.append(offset)
+                doc_ids.append(doc_id)
+            return {segment: (np.asarray(o), d) for segment, (o, d) in grouped.items()}
+
+        # Version de collection sur disque : les écritures d'un autre process (CLI d'ingestion)
+        # invalident aussi le cache ; _generation couvre celles du process courant
+        from core.data_management import get_collection_version  # import local : data_management importe ce module
+        cache_key = (get_collection_version(), self._generation, repr(where), lists)
+        return self._candidates_cache.get_or_set(cache_key, load)
+
+    def _search(self, queries: np.ndarray, n_results: int, where: Optional[dict],
+                lists: Optional[Tuple[int, ...]]) -> List[List[str]]:
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_ids: List[list] = [[] for _ in queries]
+        for segment, (segment_offsets, segment_ids) in self._candidates(where, lists).items():
+            vectors, scales = self._load_segment(segment)
+            for start in range(0, len(segment_offsets), self.SEARCH_BLOCK_ROWS):
+                offsets = segment_offsets[start:start + self.SEARCH_BLOCK_ROWS]
+                doc_ids = segment_ids[start:start + self.SEARCH_BLOCK_ROWS]
+                # Lecture des seules lignes candidates dans le mmap, par blocs (RAM bornée) ;
+                # une plage contiguë est lue par tranche, sans copie par indexation
+                if offsets[-1] - offsets[0] + 1 == len(offsets):
+                    rows = slice(int(offsets[0]), int(offsets[-1]) + 1)
+                else:
+                    rows = offsets
+                scores = queries @ np.asarray(vectors[rows], dtype=np.float32).T
+                if scales is not None:
+                    # int8 : l'échelle par ligne s'applique aux scores, pas au bloc
+                    scores *= np.asarray(scales[rows], dtype=np.float32)
+                best_scores, best_ids = self._merge_top(best_scores, best_ids, scores, doc_ids, n_results)
+        order = np.argsort(-best_scores, axis=1)
+        return [[best_ids[q][i] for i in order[q]] for q in range(len(queries))]
+
+    @staticmethod
+    def _merge_top(best_scores: np.ndarray, best_ids: List[list], scores: np.ndarray, doc_ids: list,
+                   n_results: int) -> Tuple[np.ndarray, List[list]]:
+        """
+        Fusionne un bloc de scores dans le top-n courant de chaque requête.
+        """
+        scores = np.concatenate([best_scores, scores], axis=1)
+        ids = [best + doc_ids for best in best_ids]
+        keep = min(n_results, scores.shape[1])
+        top = np.argpartition(-scores, keep - 1, axis=1)[:, :keep]
+        return np.take_along_axis(scores, top, axis=1), [[ids[q][i] for i in top[q]] for q in range(len(ids))]
+
+    def query(self, query_embeddings, n_results, where=None):
+        if not query_embeddings:
+            return []
+        queries = self._prepare_queries(query_embeddings)
+        if self._centroids is None or self.nprobe >= len(self._centroids):
+            return self._search(queries, n_results, where, None)
+        # IVF : une recherche par requête, restreinte à ses nprobe listes les plus proches
+        probes = np.argsort(-(queries @ self._centroids.T), axis=1)[:, :self.nprobe]
+        return [
+            self._search(query[None, :], n_results, where, tuple(sorted(int(i) for i in probe)))[0]
+            for query, probe in zip(queries, probes)
+        ]
+
+    def persist(self):
+        if len(self._segment_ids()) > self.MAX_SEGMENTS:
+            self.compact()
+
+    def clear_caches(self):
+        with self._lock:
+            self._segments.clear()
+            self._candidates_cache.clear()
+
+    def close(self):
+        with self._lock:
+            self.clear_caches()
+            self._conn.close()
+
+    # --- maintenance ------------------------------------------------------
+
+    def _iter_live_vectors(self, batch_size: int = 10000):
+        """
+        Parcourt les vecteurs vivants par lots : (ids, vecteurs float32, (segment, offset)).
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT id, segment, offset FROM rows ORDER BY segment, offset").fetchall()
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            parts = []
+            for segment in sorted({row[1] for row in batch}):
+                offsets = np.asarray([row[2] for row in batch if row[1] == segment])
+                vectors, scales = self._load_segment(segment)
+                parts.append(self._dequantize(vectors[offsets], scales[offsets] if scales is not None else None))
+            yield [row[0] for row in batch], np.concatenate(parts), [(row[1], row[2]) for row in batch]
+
+    def compact(self):
+        """
+        Réécrit tous les vecteurs vivants dans un seul segment (supprime les lignes mortes).
+        """
+        with self._lock:
+            old_segments = self._segment_ids()
+            new_segment = (old_segments or [-1])[-1] + 1
+            ids, parts, scale_parts = [], [], []
+            for batch_ids, vectors, _ in self._iter_live_vectors():
+                quantized, scales = self._quantize(vectors)
+                ids.extend(batch_ids)
+                parts.append(quantized)
+                if scales is not None:
+                    scale_parts.append(scales)
+            if not parts:
+                return
+            if scale_parts:
+                np.save(self._segment_path(new_segment, "_scales"), np.concatenate(scale_parts))
+            np.save(self._segment_path(new_segment), np.concatenate(parts))
+            self._conn.executemany(
+                "UPDATE rows SET segment = ?, offset = ? WHERE id = ?",
+                [(new_segment, offset, doc_id) for offset, doc_id in enumerate(ids)]
+            )
+            self._conn.commit()
+            self._segments.clear()
+            for segment in old_segments:
+                for suffix in ("", "_scales"):
+                    if os.path.exists(self._segment_path(segment, suffix)):
+                        os.remove(self._segment_path(segment, suffix))
+            self._touch()
+            logger.info(f"Store {self.path} compacté: {len(ids)} vecteurs, {len(old_segments)} segments fusionnés.")
+
+    def build_ivf(self, n_lists: int, iterations: int = 10, sample_size: int = 50000, seed: int = 0):
+        """
+        Entraîne `n_lists` centroïdes (k-means sphérique sur un échantillon)
+        et range chaque vecteur dans la liste de son centroïde le plus proche.
+        """
+        with self._lock:
+            batches = list(self._iter_live_vectors())
+            if not batches:
+                return
+            all_vectors = np.concatenate([vectors for _, vectors, _ in batches])
+            rng = np.random.default_rng(seed)
+            n_lists = min(n_lists, len(all_vectors))
+            sample = all_vectors[rng.choice(len(all_vectors), min(sample_size, len(all_vectors)), replace=False)]
+            centroids = sample[rng.choice(len(sample), n_lists, replace=False)]
+            for _ in range(iterations):
+                assignment = np.argmax(sample @ centroids.T, axis=1)
+                for i in range(n_lists):
+                    members = sample[assignment == i]
+                    if len(members):
+                        centroids[i] = members.mean(axis=0)
+                centroids = _normalize(centroids)
+            np.save(os.path.join(self.path, "centroids.npy"), centroids.astype(np.float32))
+            self._centroids = centroids.astype(np.float32)
+
+            updates = []
+            for ids, vectors, _ in batches:
+                updates.extend(zip(self._assign_lists(vectors), ids))
+            self._conn.executemany("UPDATE rows SET list_id = ? WHERE id = ?", updates)
+            self._conn.commit()
+            self._touch()
+            logger.info(f"Index IVF construit: {n_lists} listes sur {len(all_vectors)} vecteurs.")
+
+
+_stores: Dict[str, VectorStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_vector_store(backend: str = VECTOR_STORE_BACKEND) -> VectorStore:
+    """
+    Renvoie la base vectorielle configurée ("chroma" ou "quantized"), partagée par
+    tout le process. Elle est recréée après reset_vector_stores() (reset de la base),
+    ou si son répertoire a été supprimé par un autre process.
+    """
+    if backend not in ("chroma", "quantized"):
+        raise ValueError(f"Backend de base vectorielle inconnu: {backend}")
+    path = CHROMA_PATH if backend == "chroma" else QUANTIZED_STORE_PATH
+    with _stores_lock:
+        store = _stores.get(backend)
+        if store is None or not os.path.isdir(path):
+            store = ChromaVectorStore(CHROMA_PATH) if backend == "chroma" else QuantizedVectorStore(path)
+            _stores[backend] = store
+        return store
+
+
+def reset_vector_stores():
+    """
+    Oublie (et ferme) les stores ouverts, avant la suppression de la base :
+    les appels suivants à get_vector_store() repartent d'une base neuve.
+    """
+    with _stores_lock:
+        for store in _stores.values():
+            store.close()
+        _stores.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintenance du store vectoriel quantifié.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ivf = subparsers.add_parser("build-ivf", help="Entraîne l'index IVF du store quantifié")
+    ivf.add_argument("--lists", type=int, default=256)
+    subparsers.add_parser("compact", help="Réécrit les segments du store quantifié")
+
+    args = parser.parse_args()
+    store = get_vector_store("quantized")
+    if args.command == "build-ivf":
+        store.build_ivf(args.lists)
+    elif args.command == "compact":
+        store.compact()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,78 @@
 # embedding.py
 
+import os
+import time
+import logging
+import threading
+
 from langchain_community.embeddings.huggingface import HuggingFaceEmbeddings
 
+from config import EMBEDDING_MODEL_NAME
+
+logger = logging.getLogger(__name__)
+
+# Instance unique du modèle d'embedding pour tout le process (toutes sessions Streamlit confondues)
+_embeddings = None
+_embeddings_lock = threading.Lock()
+_embedding_stats = {"model_name": EMBEDDING_MODEL_NAME, "loaded": False}
+
+
+def _current_rss_bytes() -> int:
+    """
+    Mémoire résidente du process (0 si indisponible sur la plateforme).
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except ImportError:
+        return 0
+
+
+def _parameters_bytes(embeddings) -> int:
+    """
+    Taille des poids du modèle sentence-transformers sous-jacent (0 si inaccessible).
+    """
+    try:
+        return sum(p.numel() * p.element_size() for p in embeddings.client.parameters())
+    except Exception:
+        return 0
+
+
 def get_embedding_function():
     """
     Initialise la fonction d'embedding pour transformer les documents en vecteurs
     utilisables par la base de données Chroma.
+    Le modèle n'est chargé qu'une seule fois par process puis partagé.
+    """
+    global _embeddings
+    if _embeddings is not None:
+        return _embeddings
+    with _embeddings_lock:
+        if _embeddings is None:
+            rss_before = _current_rss_bytes()
+            start = time.perf_counter()
+            embeddings = HuggingFaceEmbeddings(
+                model_name=EMBEDDING_MODEL_NAME
+            )
+            load_time = time.perf_counter() - start
+            _embedding_stats.update({
+                "loaded": True,
+                "load_time_s": round(load_time, 3),
+                "rss_delta_mb": round((_current_rss_bytes() - rss_before) / 1024 ** 2, 1),
+                "parameters_mb": round(_parameters_bytes(embeddings) / 1024 ** 2, 1),
+            })
+            logger.info(f"Modèle d'embedding {EMBEDDING_MODEL_NAME} chargé en {load_time:.1f}s.")
+            _embeddings = embeddings
+    return _embeddings
+
+
+def get_embedding_stats() -> dict:
+    """
+    Renvoie le temps de chargement et l'empreinte mémoire du modèle d'embedding.
     """
-    embeddings = HuggingFaceEmbeddings(
-        model_name="BAAI/bge-large-en-v1.5"
-    )
-    return embeddings
\ No newline at end of file
+    return dict(_embedding_stats)
@@ -0,0 +1,57 @@
+# tests/test_ingestion.py
+
+import hashlib
+
+import pytest
+
+from core import data_management, ingestion
+from core.bm25 import BM25Index
+from core.vector_store import QuantizedVectorStore
+
+
+class FakeEmbeddings:
+    """Embeddings déterministes (hash du texte), sans modèle."""
+
+    def embed_documents(self, texts):
+        return [[b / 255 for b in hashlib.sha256(text.encode("utf-8")).digest()[:16]] for text in texts]
+
+
+FILING = (
+    "{company} annual report.\n\n"
+    "Item 1. Business\n\n" + "The company designs and sells products. " * 60 + "\n\n"
+    "Item 7. Management's Discussion and Analysis\n\n" + "Revenue grew compared to last year. " * 60
+)
+
+
+@pytest.fixture
+def isolated_store(tmp_path, monkeypatch):
+    chroma_path = str(tmp_path / "chroma")
+    store = QuantizedVectorStore(str(tmp_path / "chroma" / "quantized"), dtype="float32")
+    bm25_index = BM25Index(str(tmp_path / "chroma" / "bm25.sqlite"))
+    monkeypatch.setattr(data_management, "CHROMA_PATH", chroma_path)
+    monkeypatch.setattr(ingestion, "CHROMA_PATH", chroma_path)
+    monkeypatch.setattr(ingestion, "get_vector_store", lambda: store)
+    monkeypatch.setattr(ingestion, "get_bm25_index", lambda path: bm25_index)
+    monkeypatch.setattr(ingestion, "get_embedding_function", lambda: FakeEmbeddings())
+    return store
+
+
+def test_duplicate_basenames_are_distinct_sources(tmp_path, isolated_store):
+    root = tmp_path / "10K"
+    for company in ("A", "B"):
+        (root / company).mkdir(parents=True)
+        (root / company / "10k.txt").write_text(FILING.format(company=company), encoding="utf-8")
+
+    stats = ingestion.ingest_documents([str(root)], embed_workers=0)
+    manifest = data_management.load_manifest()
+
+    assert sorted(manifest) == ["A/10k.txt", "B/10k.txt"]
+    assert stats["chunks_deleted"] == 0
+    total_ids = sum(len(entry["chunk_ids"]) for entry in manifest.values())
+    assert isolated_store.count() == total_ids == stats["chunks_added"]
+
+    # Deuxième passe sur des fichiers inchangés : rien n'est supprimé ni ré-ajouté
+    stats = ingestion.ingest_documents([str(root)], embed_workers=0)
+    assert stats["files_unchanged"] == 2
+    assert stats["files_indexed"] == 0
+    assert isolated_store.count() == total_ids
@@ -0,0 +1,141 @@
+# tests/test_vector_store.py
+
+import numpy as np
+import pytest
+
+from core import data_management
+from core.vector_store import QuantizedVectorStore
+
+DIM = 32
+
+
+def random_vectors(n, seed=0):
+    return np.random.default_rng(seed).normal(size=(n, DIM)).astype(np.float32)
+
+
+def add_vectors(store, vectors, prefix="doc", tickers=("AAPL", "MSFT")):
+    ids = [f"{prefix}-{i}" for i in range(len(vectors))]
+    metadatas = [{"source": f"{prefix}.txt", "ticker": tickers[i % len(tickers)], "item": "Item 1"}
+                 for i in range(len(vectors))]
+    store.add(ids, vectors.tolist(), [f"text {doc_id}" for doc_id in ids], metadatas)
+    return ids
+
+
+@pytest.fixture(autouse=True)
+def isolated_collection_version(tmp_path, monkeypatch):
+    # Le cache de candidats lit la version de collection : on l'isole du répertoire du repo
+    monkeypatch.setattr(data_management, "CHROMA_PATH", str(tmp_path / "chroma"))
+
+
+@pytest.fixture
+def make_store(tmp_path):
+    stores = []
+
+    def make(dtype="float32", name=None, **kwargs):
+        store = QuantizedVectorStore(str(tmp_path / (name or dtype)), dtype=dtype, dim=None, **kwargs)
+        stores.append(store)
+        return store
+
+    yield make
+    for store in stores:
+        store.close()
+
+
+@pytest.mark.parametrize("dtype", ["int8", "float16"])
+def test_add_query_round_trip(make_store, dtype):
+    store = make_store(dtype)
+    vectors = random_vectors(50)
+    ids = add_vectors(store, vectors)
+
+    assert store.count() == 50
+    results = store.query(vectors[:10].tolist(), n_results=3)
+    # Chaque vecteur est son propre plus proche voisin malgré la quantification
+    assert [hits[0] for hits in results] == ids[:10]
+    assert all(len(hits) == 3 for hits in results)
+
+    fetched = store.get(ids=ids[:2])
+    assert fetched["ids"] == ids[:2]
+    assert fetched["documents"] == ["text doc-0", "text doc-1"]
+    assert fetched["metadatas"][0]["ticker"] == "AAPL"
+
+
+def test_upsert_replaces_previous_vector(make_store):
+    store = make_store("int8")
+    vectors = random_vectors(20)
+    ids = add_vectors(store, vectors)
+
+    replacement = random_vectors(1, seed=1)
+    store.add([ids[0]], replacement.tolist(), ["new text"], [{"ticker": "AAPL"}])
+
+    assert store.count() == 20
+    assert store.query(replacement.tolist(), n_results=1) == [[ids[0]]]
+    # L'ancien vecteur ne renvoie plus l'ID remplacé
+    assert ids[0] not in store.query(vectors[:1].tolist(), n_results=5)[0]
+    assert store.get(ids=[ids[0]])["documents"] == ["new text"]
+
+
+def test_delete(make_store):
+    store = make_store()
+    vectors = random_vectors(20)
+    ids = add_vectors(store, vectors)
+
+    store.delete(ids[:5])
+
+    assert store.count() == 15
+    assert store.get(ids=ids[:5])["ids"] == []
+    hits = store.query(vectors[:5].tolist(), n_results=20)
+    assert all(not set(ids[:5]) & set(h) for h in hits)
+
+
+def test_where_filtering(make_store):
+    store = make_store()
+    vectors = random_vectors(40)
+    ids = add_vectors(store, vectors)
+    aapl = {doc_id for i, doc_id in enumerate(ids) if i % 2 == 0}
+
+    hits = store.query(vectors[:4].tolist(), n_results=10, where={"ticker": "AAPL"})
+    assert all(set(h) <= aapl and len(h) == 10 for h in hits)
+
+    in_filter = {"$and": [{"ticker": {"$in": ["AAPL", "MSFT"]}}, {"item": "Item 1"}]}
+    assert store.query(vectors[1:2].tolist(), n_results=1, where=in_filter) == [[ids[1]]]
+    assert store.query(vectors[:1].tolist(), n_results=5, where={"ticker": "GOOG"}) == [[]]
+    assert set(store.get(where={"ticker": "MSFT"})["ids"]) == set(ids) - aapl
+
+
+def test_compact_preserves_results(make_store):
+    store = make_store("int8")
+    batches = [random_vectors(30, seed=seed) for seed in range(3)]
+    for i, vectors in enumerate(batches):
+        add_vectors(store, vectors, prefix=f"batch{i}")
+    store.delete([f"batch1-{i}" for i in range(10)])
+    queries = np.concatenate(batches)[::7].tolist()
+    before = store.query(queries, n_results=5, where={"ticker": "AAPL"})
+
+    store.compact()
+
+    assert len(store._segment_ids()) == 1
+    assert store.count() == 80
+    assert store.query(queries, n_results=5, where={"ticker": "AAPL"}) == before
+
+
+def test_ivf_probe_recall(make_store):
+    # Données groupées en clusters : c'est le cas où l'IVF doit garder un bon rappel
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(8, DIM))
+    vectors = (centers[rng.integers(0, 8, 800)] + 0.3 * rng.normal(size=(800, DIM))).astype(np.float32)
+    queries = (centers[rng.integers(0, 8, 40)] + 0.3 * rng.normal(size=(40, DIM))).tolist()
+
+    exact = make_store(name="exact")
+    add_vectors(exact, vectors)
+    expected = exact.query(queries, n_results=10)
+
+    ivf = make_store(name="ivf", nprobe=3)
+    add_vectors(ivf, vectors)
+    ivf.build_ivf(n_lists=8)
+    found = ivf.query(queries, n_results=10)
+
+    recall = np.mean([len(set(e) & set(f)) / len(e) for e, f in zip(expected, found)])
+    assert recall >= 0.9
+    # Toutes les listes sondées : la recherche redevient exacte
+    ivf.nprobe = 8
+    assert ivf.query(queries, n_results=10) == expected